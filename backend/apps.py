@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class BackendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend'
+
+    def ready(self):
+        from .db import configure_sqlite
+        from .metrics import install_query_recorder
+        connection_created.connect(configure_sqlite, dispatch_uid='backend.configure_sqlite')
+        connection_created.connect(install_query_recorder, dispatch_uid='backend.install_query_recorder')
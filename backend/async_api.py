@@ -0,0 +1,54 @@
+from functools import wraps
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from users.authentication import BearerTokenAuthentication
+from .metrics import render_timer
+
+
+def render(data, status=status.HTTP_200_OK):
+    with render_timer():
+        content = JSONRenderer().render(data)
+    return HttpResponse(content, content_type='application/json', status=status)
+
+
+def _error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    response = render(detail, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = BearerTokenAuthentication.keyword
+    return response
+
+
+# Async counterpart of @api_view for the read endpoints served under ASGI.
+# DRF's APIView is synchronous, so this covers the parts those endpoints use:
+# method checks, bearer authentication, DRF permission classes and APIException
+# handling. The view receives a DRF Request (for query_params and user) and
+# returns an HttpResponse, usually built with render().
+def async_api_view(http_method_names, permission_classes=()):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                return _error_response(exceptions.MethodNotAllowed(request.method))
+
+            api_request = Request(request)
+            try:
+                credentials = await BearerTokenAuthentication().aauthenticate(request)
+                api_request.user, api_request.auth = credentials or (AnonymousUser(), None)
+
+                for permission in (permission_class() for permission_class in permission_classes):
+                    if not permission.has_permission(api_request, None):
+                        if credentials is None:
+                            raise exceptions.NotAuthenticated()
+                        raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+                return await view(api_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error_response(exc)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+FORMATS = ('csv', 'jsonl')
+
+# DRF reserves ?format= for renderer selection
+FORMAT_PARAM = 'file_format'
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+MAX_REPORTED_ERRORS = 100
+
+
+def guess_format(filename, default='csv'):
+    for fmt in FORMATS:
+        if filename and filename.lower().endswith(f'.{fmt}'):
+            return fmt
+    return default
+
+
+# Parsing is lazy: records are read from the stream as the caller consumes them,
+# so memory stays flat however large the file is. Yields (line number, record).
+def iter_records(stream, fmt):
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                record = exc
+            yield line_number, record
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# Validates records with serializer_class in chunks and writes each chunk with
+# one bulk_create for new rows and one bulk_update per set of columns changed.
+# A record with an "id" updates that existing row, and only the columns the
+# record carries. A serializer_class with an import_context(ids) classmethod
+# gets its result, computed once per chunk for the ids it updates, as
+# serializer context.
+def import_records(records, serializer_class, batch_size=1000):
+    model = serializer_class.Meta.model
+    import_context = getattr(serializer_class, 'import_context', None)
+    imported = 0
+    error_count = 0
+    errors = []
+
+    def report(line_number, record_errors):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line_number, 'errors': record_errors})
+
+    for chunk in chunked(records, batch_size):
+        parsed = []
+        for line_number, record in chunk:
+            if not isinstance(record, dict):
+                report(line_number, {'record': ['Malformed record.']})
+                continue
+
+            # CSV leaves the id of a new row empty
+            record_id = record.get('id')
+            try:
+                record_id = int(record_id) if record_id not in (None, '') else None
+            except (TypeError, ValueError):
+                report(line_number, {'id': ['A valid integer is required.']})
+                continue
+            parsed.append((line_number, record, record_id))
+
+        existing = model.objects.in_bulk({record_id for _, _, record_id in parsed if record_id is not None})
+        context = import_context(existing.keys()) if import_context is not None else {}
+
+        created = []
+        # An id repeated within a chunk gets the columns of all its records,
+        # later values winning
+        updated = {}
+        for line_number, record, record_id in parsed:
+            if record_id is not None and record_id not in existing:
+                report(line_number, {'id': ['Must be the id of an existing row.']})
+                continue
+
+            instance = existing.get(record_id)
+            serializer = serializer_class(instance, data=record, partial=instance is not None, context=context)
+            if not serializer.is_valid():
+                report(line_number, serializer.errors)
+            elif instance is None:
+                created.append(model(**serializer.validated_data))
+            else:
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                updated.setdefault(record_id, (instance, set()))[1].update(serializer.validated_data)
+
+        by_fields = {}
+        for instance, fields in updated.values():
+            if fields:
+                by_fields.setdefault(frozenset(fields), []).append(instance)
+        with transaction.atomic():
+            model.objects.bulk_create(created)
+            for fields, instances in by_fields.items():
+                model.objects.bulk_update(instances, sorted(fields))
+        imported += len(created) + len(updated)
+
+    return {
+        'imported': imported,
+        'error_count': error_count,
+        'errors': errors,
+    }
+
+
+# Deletes the rows of queryset batch_size at a time, each batch by primary
+# key, so no single statement holds the write lock for long. The queryset's
+# ordering decides which rows go first. Returns the number of rows deleted,
+# including cascades.
+def delete_in_batches(queryset, batch_size):
+    total = 0
+    while batch := list(queryset.values_list('pk', flat=True)[:batch_size]):
+        total += queryset.model.objects.filter(pk__in=batch).delete()[0]
+    return total
+
+
+def export_fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+# Serialises rows (dicts, e.g. from QuerySet.values().iterator()) as CSV or
+# JSON Lines, yielding one string per rows_per_chunk rows so a streaming
+# response flushes regularly without holding the whole export in memory.
+def stream_records(rows, fields, fmt, rows_per_chunk=500):
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write = lambda row: writer.writerow([row[field] for field in fields])
+    else:
+        write = lambda row: buffer.write(json.dumps({field: row[field] for field in fields}, cls=DjangoJSONEncoder) + '\n')
+
+    for chunk in chunked(rows, rows_per_chunk):
+        for row in chunk:
+            write(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
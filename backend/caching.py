@@ -0,0 +1,105 @@
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+from backend.models import CatalogVersion
+
+
+# Read-through cache for public catalog listings. Each namespace has a version
+# token in the CatalogVersion table, which writers replace in their own
+# transaction, whichever process they run in (a server worker or a management
+# command). Payloads are cached per version, so a bump invalidates them
+# without deleting anything. Processes keep the token in their cache for
+# CATALOG_VERSION_TTL seconds, which bounds how long another process's bump
+# goes unseen; a bump drops the local copy once it commits.
+def _version_key(namespace):
+    return f'catalog:{namespace}:version'
+
+
+# Rows are created with the first version of each namespace (migration 0020
+# creates the ones in use); a missing row is created on first read
+def _load_versions(namespaces):
+    rows = {row.namespace: row for row in CatalogVersion.objects.filter(namespace__in=namespaces)}
+    missing = [namespace for namespace in namespaces if namespace not in rows]
+    if missing:
+        CatalogVersion.objects.bulk_create([CatalogVersion(namespace=namespace) for namespace in missing], ignore_conflicts=True)
+        rows.update((row.namespace, row) for row in CatalogVersion.objects.filter(namespace__in=missing))
+    return {namespace: (row.version.hex, int(row.updated_at.timestamp())) for namespace, row in rows.items()}
+
+
+# (version, last modified) of each namespace, in the order given; tokens not
+# cached locally are read together in one query
+def get_catalog_versions(*namespaces):
+    cached = cache.get_many([_version_key(namespace) for namespace in namespaces])
+    versions = {namespace: cached[_version_key(namespace)] for namespace in namespaces if _version_key(namespace) in cached}
+    missing = [namespace for namespace in namespaces if namespace not in versions]
+    if missing:
+        loaded = _load_versions(missing)
+        cache.set_many({_version_key(namespace): version for namespace, version in loaded.items()}, settings.CATALOG_VERSION_TTL)
+        versions.update(loaded)
+    return [versions[namespace] for namespace in namespaces]
+
+
+def get_catalog_version(namespace):
+    return get_catalog_versions(namespace)[0]
+
+
+async def aget_catalog_versions(*namespaces):
+    return await sync_to_async(get_catalog_versions)(*namespaces)
+
+
+async def aget_catalog_version(namespace):
+    return (await aget_catalog_versions(namespace))[0]
+
+
+def bump_catalog_version(namespace):
+    CatalogVersion.objects.bulk_create(
+        [CatalogVersion(namespace=namespace, version=uuid.uuid4(), updated_at=timezone.now())],
+        update_conflicts=True, unique_fields=['namespace'], update_fields=['version', 'updated_at'],
+    )
+    transaction.on_commit(lambda: cache.delete(_version_key(namespace)))
+
+
+def cached_catalog_response(request, namespace, build_payload):
+    version, last_modified = get_catalog_version(namespace)
+    etag = quote_etag(f'{namespace}-{version}')
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload_key = f'catalog:{namespace}:payload:{version}'
+        content = cache.get(payload_key)
+        if content is None:
+            content = JSONRenderer().render(build_payload())
+            cache.set(payload_key, content, settings.CATALOG_CACHE_TIMEOUT)
+        response = HttpResponse(content, content_type='application/json')
+
+    return _with_validators(response, etag, last_modified)
+
+
+# Async variant for the ASGI views; build_payload is a coroutine function
+async def acached_catalog_response(request, namespace, build_payload):
+    version, last_modified = await aget_catalog_version(namespace)
+    etag = quote_etag(f'{namespace}-{version}')
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload_key = f'catalog:{namespace}:payload:{version}'
+        content = await cache.aget(payload_key)
+        if content is None:
+            content = JSONRenderer().render(await build_payload())
+            await cache.aset(payload_key, content, settings.CATALOG_CACHE_TIMEOUT)
+        response = HttpResponse(content, content_type='application/json')
+
+    return _with_validators(response, etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,57 @@
+import hashlib
+from functools import wraps
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+# Conditional GET for @api_view function views. Apply it below the
+# authentication/permission decorators so that request.user is the
+# authenticated user. etag_func(request, *args, **kwargs) returns cheap
+# validators (aggregates, version numbers) for the data behind the response;
+# they are hashed together with the user and the full path (pagination cursor
+# included), and a matching If-None-Match is answered with 304 before the view
+# runs.
+def conditional_get(etag_func):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            validators = (request.user.pk, request.get_full_path(), etag_func(request, *args, **kwargs))
+            etag = quote_etag(hashlib.sha1(repr(validators).encode()).hexdigest())
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response['ETag'] = etag
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# Same as conditional_get for the async views in backend.async_api, where
+# etag_func is a coroutine function.
+def aconditional_get(etag_func):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            validators = (request.user.pk, request.get_full_path(), await etag_func(request, *args, **kwargs))
+            etag = quote_etag(hashlib.sha1(repr(validators).encode()).hexdigest())
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response['ETag'] = etag
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def user_validators(user):
+    return (user.pk, user.username, user.email, user.first_name, user.last_name, user.is_superuser)
@@ -0,0 +1,13 @@
+from django.conf import settings
+
+
+# Runs for every new database connection (connected in BackendConfig.ready).
+# Only per-connection PRAGMAs belong here; journal_mode=WAL is stored in the
+# database file, so enable_wal sets it once rather than every connection
+# rewriting the file header.
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,75 @@
+from django.db import connections
+from django.db.utils import OperationalError
+
+
+# Full-text index for event names/descriptions, using SQLite FTS5 when the
+# SQLite build provides it. It is an external-content table kept in sync by
+# triggers. SQLite table rebuilds (some AlterField/AddField operations on
+# backend_event) drop those triggers, so migrations that rebuild the table
+# must call install_event_fts() again.
+EVENT_FTS_TABLE = 'backend_event_fts'
+
+EVENT_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {EVENT_FTS_TABLE}
+        USING fts5(name, description, content='backend_event', content_rowid='id')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {EVENT_FTS_TABLE}_ai AFTER INSERT ON backend_event BEGIN
+        INSERT INTO {EVENT_FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {EVENT_FTS_TABLE}_ad AFTER DELETE ON backend_event BEGIN
+        INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {EVENT_FTS_TABLE}_au AFTER UPDATE OF name, description ON backend_event BEGIN
+        INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {EVENT_FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {EVENT_FTS_TABLE}({EVENT_FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def fts5_available(db_connection):
+    if db_connection.vendor != 'sqlite':
+        return False
+    with db_connection.cursor() as cursor:
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(value)')
+            cursor.execute('DROP TABLE temp.fts5_probe')
+        except OperationalError:
+            return False
+    return True
+
+
+def install_event_fts(schema_editor):
+    if not fts5_available(schema_editor.connection):
+        return
+    for statement in EVENT_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall_event_fts(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('_ai', '_ad', '_au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {EVENT_FTS_TABLE}{suffix}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {EVENT_FTS_TABLE}')
+
+
+_fts_installed = {}
+
+
+def event_fts_installed(using='default'):
+    if using not in _fts_installed:
+        db_connection = connections[using]
+        _fts_installed[using] = (
+            db_connection.vendor == 'sqlite'
+            and EVENT_FTS_TABLE in db_connection.introspection.table_names()
+        )
+    return _fts_installed[using]
+
+
+def fts_match_query(text):
+    # Every term must match, as a prefix; terms are quoted so user input cannot
+    # inject FTS5 query syntax
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms)
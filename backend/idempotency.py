@@ -0,0 +1,97 @@
+import hashlib
+import json
+from functools import wraps
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from backend.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+MAX_KEY_LENGTH = 255
+
+
+def _hash(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return _hash(f'{request.method} {request.path}\n{body}')
+
+
+# Claims the key with a short transaction of its own, so that a concurrent
+# duplicate sees the claim straight away. Returns (record, created); a stale
+# record (expired, or abandoned mid-request) is removed and claimed afresh.
+def claim(user, key_hash, fingerprint):
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key_hash=key_hash, request_hash=fingerprint), True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=user, key_hash=key_hash).first()
+        if record is None:
+            continue
+        if not record.is_stale():
+            return record, False
+        IdempotencyKey.objects.filter(pk=record.pk, created=record.created).delete()
+
+    raise IntegrityError('Could not claim idempotency key.')
+
+
+# Idempotency-Key support for @api_view function views that move money. Apply
+# it below the authentication/permission decorators. The first request with a
+# key runs the view; its response is stored in the same transaction as the
+# view's own writes, and retries with the same key and body get that response
+# back without running the view again. A duplicate that arrives while the
+# first is still running is answered with 409 instead of waiting on a lock.
+# Requests without the header are not affected.
+def idempotent(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, created = claim(request.user, _hash(key), fingerprint)
+
+        if not created:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {'detail': f'This {HEADER} was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status_code is None:
+                return Response(
+                    {'detail': f'A request with this {HEADER} is still being processed.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            response = Response(record.response_body, status=record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if response.status_code < 500:
+                    IdempotencyKey.objects.filter(pk=record.pk).update(
+                        status_code=response.status_code, response_body=response.data
+                    )
+        except Exception:
+            record.delete()
+            raise
+
+        # Server errors are not replayed; release the key so the client can retry
+        if response.status_code >= 500:
+            record.delete()
+        return response
+
+    return wrapper
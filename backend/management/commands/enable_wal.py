@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = 'Switch the SQLite database file to write-ahead logging. The mode is stored in the file, so this runs once per deployment.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Write-ahead logging only applies to SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            mode = cursor.fetchone()[0]
+        if mode != 'wal':
+            raise CommandError(f'SQLite kept journal_mode={mode}.')
+        self.stdout.write(f"{connection.settings_dict['NAME']} now uses journal_mode=wal.")
@@ -0,0 +1,31 @@
+import sys
+from django.core.management.base import BaseCommand
+from backend.bulk import FORMATS, export_fields, stream_records
+from backend.models import Category, Equipment
+
+MODELS = {
+    'categories': Category,
+    'equipment': Equipment,
+}
+
+
+class Command(BaseCommand):
+    help = 'Write all categories or equipment as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(MODELS))
+        parser.add_argument('--output', help='Defaults to standard output.')
+        parser.add_argument('--file-format', choices=FORMATS, default='csv')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['catalog']]
+        fields = export_fields(model)
+        rows = model.objects.order_by('id').values(*fields).iterator(chunk_size=2000)
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in stream_records(rows, fields, options['file_format']):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
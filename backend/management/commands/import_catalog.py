@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend.bulk import FORMATS, guess_format, import_records, iter_records
+from backend.caching import bump_catalog_version
+from category.serializers import CategorySerializer
+from equipment.serializers import EquipmentSerializer
+
+SERIALIZERS = {
+    'categories': CategorySerializer,
+    'equipment': EquipmentSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = 'Create or update categories or equipment from a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(SERIALIZERS))
+        parser.add_argument('path')
+        parser.add_argument('--file-format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or guess_format(options['path'])
+        try:
+            stream = open(options['path'], 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        with stream:
+            result = import_records(
+                iter_records(stream, file_format), SERIALIZERS[options['catalog']], batch_size=options['batch_size']
+            )
+
+        if result['imported']:
+            bump_catalog_version(options['catalog'])
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(f"Imported {result['imported']} record(s), rejected {result['error_count']}.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from backend.bulk import delete_in_batches
+from backend.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = IdempotencyKey.objects.filter(created__lte=IdempotencyKey.expiry_cutoff()).order_by('created')
+        total = delete_in_batches(expired, options['batch_size'])
+        self.stdout.write(f"Deleted {total} expired idempotency key(s).")
@@ -0,0 +1,141 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds of the histogram buckets, Prometheus style (each bucket counts
+# observations <= its bound; +Inf is implied)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = (
+    ('ems_request_duration_seconds', 'Wall time spent handling the request.', SECONDS_BUCKETS),
+    ('ems_request_db_queries', 'Database queries executed for the request.', QUERY_BUCKETS),
+    ('ems_request_db_duration_seconds', 'Time spent executing database queries.', SECONDS_BUCKETS),
+    ('ems_request_render_seconds', 'Time spent rendering (serializing) the response body.', SECONDS_BUCKETS),
+)
+
+# Metrics of the request being handled in the current thread or task
+current_sample = ContextVar('request_metrics_sample', default=None)
+
+
+class RequestSample:
+    __slots__ = ('queries', 'db_time', 'render_time', '_render_started')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self._render_started = None
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# In-memory aggregates per (view name, method). Every process keeps its own,
+# so with several workers each scrape sees the worker that answered it.
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+
+    def record(self, view, method, status_code, duration, sample):
+        labels = (view, method)
+        values = (duration, sample.queries, sample.db_time, sample.render_time)
+        with self._lock:
+            histograms = self._histograms.get(labels)
+            if histograms is None:
+                histograms = self._histograms[labels] = [Histogram(bounds) for _, _, bounds in HISTOGRAMS]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+            key = (view, method, str(status_code))
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+    def render(self, extra=()):
+        with self._lock:
+            histograms = {labels: [self._copy(h) for h in values] for labels, values in self._histograms.items()}
+            responses = dict(self._responses)
+
+        lines = [
+            '# HELP ems_requests_total Requests handled, by view, method and status code.',
+            '# TYPE ems_requests_total counter',
+        ]
+        for (view, method, status_code), value in sorted(responses.items()):
+            lines.append(f'ems_requests_total{{view="{view}",method="{method}",status="{status_code}"}} {value}')
+
+        for index, (name, help_text, bounds) in enumerate(HISTOGRAMS):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (view, method), values in sorted(histograms.items()):
+                histogram = values[index]
+                labels = f'view="{view}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(bounds + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6g}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        for name, metric_type, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _copy(histogram):
+        copy = Histogram(histogram.bounds)
+        copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+        return copy
+
+
+registry = MetricsRegistry()
+
+
+# Installed on every database connection (see BackendConfig.ready); outside a
+# sampled request it only costs a context variable lookup
+def record_query(execute, sql, params, many, context):
+    sample = current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db_time += time.perf_counter() - started
+        sample.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# For responses rendered outside the template response cycle, e.g. by the
+# async views
+@contextmanager
+def render_timer():
+    sample = current_sample.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if sample is not None:
+            sample.render_time += time.perf_counter() - started
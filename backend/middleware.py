@@ -0,0 +1,68 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .metrics import RequestSample, current_sample, registry
+
+
+# Records wall time, query count, query time and render time for every
+# request, labelled with the URL name (see backend.metrics for the storage and
+# /api/metrics/ for the Prometheus endpoint). List it first in MIDDLEWARE so
+# that the other middleware is included in the wall time. With
+# METRICS['SERVER_TIMING'] the numbers are also sent as a Server-Timing header.
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.METRICS.get('SERVER_TIMING', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, response, sample, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, response, sample, time.perf_counter() - started)
+
+    # Runs just before a DRF (template) response is rendered
+    def process_template_response(self, request, response):
+        sample = current_sample.get()
+        if sample is not None:
+            sample._render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(sample))
+        return response
+
+    @staticmethod
+    def rendered(sample):
+        sample.render_time += time.perf_counter() - sample._render_started
+
+    def finish(self, request, response, sample, duration):
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+        registry.record(view, request.method, response.status_code, duration, sample)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'total;dur={duration * 1000:.1f}, '
+                f'db;dur={sample.db_time * 1000:.1f};desc="{sample.queries} queries", '
+                f'render;dur={sample.render_time * 1000:.1f}'
+            )
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+from backend.fts import install_event_fts, uninstall_event_fts
+
+
+def create_event_fts(apps, schema_editor):
+    install_event_fts(schema_editor)
+
+
+def drop_event_fts(apps, schema_editor):
+    uninstall_event_fts(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_event_updated_at_wallet_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', '-date', 'id'], name='event_status_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', '-date', 'id'], name='event_category_date_id_idx'),
+        ),
+        migrations.RunPython(create_event_fts, drop_event_fts),
+    ]
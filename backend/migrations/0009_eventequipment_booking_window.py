@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:32
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_event_windows(apps, schema_editor):
+    Event = apps.get_model('backend', 'Event')
+    EventEquipment = apps.get_model('backend', 'EventEquipment')
+    event = Event.objects.filter(pk=OuterRef('event_id'))
+    EventEquipment.objects.update(
+        date=Subquery(event.values('date')[:1]),
+        start_time=Subquery(event.values('start_time')[:1]),
+        end_time=Subquery(event.values('end_time')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0008_event_status_index_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventequipment',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='eventequipment',
+            name='start_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='eventequipment',
+            name='end_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.RunPython(copy_event_windows, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='eventequipment',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='eventequipment',
+            name='start_time',
+            field=models.TimeField(),
+        ),
+        migrations.AlterField(
+            model_name='eventequipment',
+            name='end_time',
+            field=models.TimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='eventequipment',
+            index=models.Index(fields=['date', 'equipment', 'start_time'], name='booking_date_equipment_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0011_walletsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('capacity', models.IntegerField(default=0)),
+                ('events', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transactionlog',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='backend.event'),
+        ),
+        migrations.CreateModel(
+            name='EquipmentRentalStats',
+            fields=[
+                ('equipment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rental_stats', serialize=False, to='backend.equipment')),
+                ('rentals', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-rentals', 'equipment'], name='rental_stats_rentals_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refunds', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('purchase_count', models.IntegerField(default=0)),
+                ('refund_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='daily_revenue_date_category_uniq')],
+            },
+        ),
+    ]
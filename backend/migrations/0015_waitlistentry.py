@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0014_ticketing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('joined_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attendee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='backend.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', '-priority', 'joined_at', 'id'], name='waitlist_head_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'attendee'), name='waitlist_one_entry_per_attendee')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from backend.fts import install_event_fts
+
+
+# Adding item_count rebuilds backend_event on SQLite, which drops the
+# full-text triggers (see backend.fts)
+def reinstall_event_fts(apps, schema_editor):
+    install_event_fts(schema_editor)
+
+
+# Repeated bookings of one item become a single row with a quantity. Existing
+# bookings get the equipment's current price, the best record there is of
+# what was charged, and events get their item counts.
+def snapshot_bookings(apps, schema_editor):
+    Equipment = apps.get_model('backend', 'Equipment')
+    Event = apps.get_model('backend', 'Event')
+    EventEquipment = apps.get_model('backend', 'EventEquipment')
+
+    repeated = (
+        EventEquipment.objects.values('event_id', 'equipment_id')
+        .annotate(rows=Count('id'), keep=Min('id'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in repeated.iterator():
+        EventEquipment.objects.filter(pk=row['keep']).update(quantity=row['rows'])
+        EventEquipment.objects.filter(event_id=row['event_id'], equipment_id=row['equipment_id']).exclude(
+            pk=row['keep']
+        ).delete()
+
+    EventEquipment.objects.update(
+        unit_price=Subquery(Equipment.objects.filter(pk=OuterRef('equipment_id')).values('rental_price')[:1])
+    )
+    units = (
+        EventEquipment.objects.filter(event=OuterRef('pk')).values('event')
+        .annotate(units=Sum('quantity')).values('units')
+    )
+    Event.objects.update(item_count=Coalesce(Subquery(units), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0015_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_event_fts),
+        migrations.AddField(
+            model_name='event',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='eventequipment',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='eventequipment',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_bookings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='eventequipment',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='eventequipment',
+            name='equipment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='backend.equipment'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventequipment',
+            constraint=models.UniqueConstraint(fields=('event', 'equipment'), name='booking_one_row_per_item'),
+        ),
+        migrations.RunPython(reinstall_event_fts, migrations.RunPython.noop),
+    ]
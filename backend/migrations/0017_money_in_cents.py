@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+import backend.money
+from backend.fts import install_event_fts
+
+
+# (model, field, max_digits, default) for every amount of money
+MONEY_FIELDS = [
+    ('event', 'total_price', 10, 0),
+    ('event', 'ticket_price', 10, 0),
+    ('ticket', 'price', 10, None),
+    ('equipment', 'rental_price', 10, None),
+    ('eventequipment', 'unit_price', 10, None),
+    ('wallet', 'balance', 10, 0),
+    ('transactionlog', 'amount', 10, None),
+    ('walletsnapshot', 'balance', 12, None),
+    ('walletsnapshot', 'drift', 12, 0),
+    ('dailyrevenue', 'revenue', 14, 0),
+    ('dailyrevenue', 'refunds', 14, 0),
+]
+
+
+# Making the columns NOT NULL rebuilds backend_event on SQLite, which drops
+# the full-text triggers (see backend.fts)
+def reinstall_event_fts(apps, schema_editor):
+    install_event_fts(schema_editor)
+
+
+def by_model():
+    fields = {}
+    for model_name, name, _, _ in MONEY_FIELDS:
+        fields.setdefault(model_name, []).append(name)
+    return fields.items()
+
+
+# One UPDATE per table; the scaling and rounding happen in the database
+def decimal_to_cents(apps, schema_editor):
+    for model_name, names in by_model():
+        apps.get_model('backend', model_name).objects.update(**{
+            f'{name}_cents': Cast(Round(F(name) * 100), models.BigIntegerField()) for name in names
+        })
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, names in by_model():
+        apps.get_model('backend', model_name).objects.update(**{
+            name: Cast(F(f'{name}_cents'), models.DecimalField(max_digits=16, decimal_places=2)) * Decimal('0.01')
+            for name in names
+        })
+
+
+def money_field(max_digits, default, **kwargs):
+    if default is not None:
+        kwargs['default'] = default
+    return backend.money.MoneyField(decimal_places=2, max_digits=max_digits, **kwargs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0016_booking_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_event_fts),
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name=f'{name}_cents',
+                field=money_field(max_digits, None, null=True),
+            )
+            for model_name, name, max_digits, _ in MONEY_FIELDS
+        ],
+        # Lets the old columns be added back empty and refilled when migrating backwards
+        *[
+            migrations.AlterField(
+                model_name=model_name,
+                name=name,
+                field=models.DecimalField(decimal_places=2, max_digits=max_digits, null=True),
+            )
+            for model_name, name, max_digits, _ in MONEY_FIELDS
+        ],
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        *[
+            operation
+            for model_name, name, max_digits, default in MONEY_FIELDS
+            for operation in (
+                migrations.RemoveField(model_name=model_name, name=name),
+                migrations.RenameField(model_name=model_name, old_name=f'{name}_cents', new_name=name),
+                migrations.AlterField(model_name=model_name, name=name, field=money_field(max_digits, default)),
+            )
+        ],
+        migrations.RunPython(reinstall_event_fts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:31
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of the slot arithmetic at the time of this migration (15-minute
+# slots; a window reserves every slot it touches), so that replaying it does
+# not depend on equipment.availability
+SLOT_SECONDS = 15 * 60
+
+
+def seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def occupancy_from_bookings(bookings):
+    occupancy = Counter()
+    for equipment_id, date, start_time, end_time, quantity in bookings:
+        first = seconds(start_time) // SLOT_SECONDS
+        last = max(-(-seconds(end_time) // SLOT_SECONDS), first + 1)
+        for slot in range(first, last):
+            occupancy[equipment_id, date, slot] += quantity
+    return occupancy
+
+
+# Occupancy is built from the existing bookings of events that are not
+# canceled, and stock starts at each item's peak reservation (at least one
+# unit) so that all of them still fit
+def fill_occupancy(apps, schema_editor):
+    Equipment = apps.get_model('backend', 'Equipment')
+    EquipmentOccupancy = apps.get_model('backend', 'EquipmentOccupancy')
+    EventEquipment = apps.get_model('backend', 'EventEquipment')
+
+    bookings = EventEquipment.objects.exclude(event__status='canceled').values_list(
+        'equipment_id', 'date', 'start_time', 'end_time', 'quantity'
+    )
+    occupancy = occupancy_from_bookings(bookings.iterator())
+    EquipmentOccupancy.objects.bulk_create(
+        (
+            EquipmentOccupancy(equipment_id=equipment_id, date=date, slot=slot, reserved=reserved)
+            for (equipment_id, date, slot), reserved in occupancy.items()
+        ),
+        batch_size=5000,
+    )
+
+    peaks = {}
+    for (equipment_id, _, _), reserved in occupancy.items():
+        peaks[equipment_id] = max(peaks.get(equipment_id, 0), reserved)
+    for equipment_id, peak in peaks.items():
+        if peak > 1:
+            Equipment.objects.filter(pk=equipment_id).update(stock=peak)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0017_money_in_cents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='eventequipment',
+            name='booking_date_equipment_idx',
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='stock',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='equipmentoccupancy',
+            name='equipment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='backend.equipment'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentoccupancy',
+            constraint=models.UniqueConstraint(fields=('date', 'equipment', 'slot'), name='occupancy_date_equipment_slot_uniq'),
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
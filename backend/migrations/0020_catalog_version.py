@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:55
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+# Namespaces whose listings are cached (see backend.caching)
+def create_versions(apps, schema_editor):
+    CatalogVersion = apps.get_model('backend', 'CatalogVersion')
+    CatalogVersion.objects.bulk_create(
+        [CatalogVersion(namespace=namespace) for namespace in ('categories', 'equipment', 'users')]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_five_minute_occupancy_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('namespace', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.UUIDField(default=uuid.uuid4)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,15 @@
+import hashlib
+import secrets
+import uuid
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from backend.money import MoneyField
 
 
 class Category(models.Model):
@@ -10,6 +20,70 @@ class Category(models.Model):
         return self.name
 
 
+class EventQuerySet(models.QuerySet):
+    # Status is derived from the event's date and times, so the same predicates
+    # drive both the read-time annotation and the periodic bulk transition.
+    @staticmethod
+    def status_conditions(now=None):
+        now = timezone.localtime(now)
+        today, current_time = now.date(), now.time()
+        upcoming = Q(date__gt=today) | Q(date=today, start_time__gt=current_time)
+        ongoing = Q(date=today, start_time__lte=current_time, end_time__gte=current_time)
+        return {
+            'upcoming': upcoming,
+            'ongoing': ongoing,
+            'completed': ~(upcoming | ongoing),
+        }
+
+    def with_current_status(self, now=None):
+        conditions = self.status_conditions(now)
+        return self.annotate(current_status=Case(
+            When(status='canceled', then=Value('canceled')),
+            When(conditions['upcoming'], then=Value('upcoming')),
+            When(conditions['ongoing'], then=Value('ongoing')),
+            default=Value('completed'),
+            output_field=models.CharField(),
+        ))
+
+    def with_listing_relations(self):
+        return self.select_related('user', 'category').prefetch_related(
+            models.Prefetch('eventequipment_set', queryset=EventEquipment.objects.select_related('equipment'))
+        )
+
+    def validators(self, now=None):
+        # Cheap HTTP validators for a listing: the latest edit and insert, plus
+        # the next instant at which an event changes its time-derived status
+        # (a start or end later today, otherwise the next date with events).
+        # Each is a single MIN/MAX that SQLite answers from an index. Deletions
+        # only happen through user/category cascades, which callers track.
+        now = timezone.localtime(now)
+        active = self.exclude(status='canceled')
+        later_today = active.filter(date=now.date()).aggregate(
+            next_start=models.Min('start_time', filter=Q(start_time__gt=now.time())),
+            next_end=models.Min('end_time', filter=Q(end_time__gte=now.time())),
+        )
+        return (
+            self.aggregate(value=models.Max('updated_at'))['value'],
+            self.aggregate(value=models.Max('id'))['value'],
+            later_today['next_start'],
+            later_today['next_end'],
+            active.filter(date__gt=now.date()).aggregate(value=models.Min('date'))['value'],
+        )
+
+    async def avalidators(self, now=None):
+        return await sync_to_async(self.validators)(now)
+
+    def transition_statuses(self, now=None):
+        updated = {}
+        for status, condition in self.status_conditions(now).items():
+            updated[status] = (
+                self.filter(condition)
+                .exclude(status__in=[status, 'canceled'])
+                .update(status=status)
+            )
+        return updated
+
+
 class Event(models.Model):
     STATUS_CHOICES = [
         ('upcoming', 'Upcoming'),
@@ -28,18 +102,90 @@ class Event(models.Model):
     capacity = models.PositiveIntegerField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='upcoming')
-    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    total_price = MoneyField(default=0)
+    ticket_price = MoneyField(default=0)
+    # Units of equipment booked (the sum of the booking quantities), kept up
+    # to date on write alongside total_price
+    item_count = models.PositiveIntegerField(default=0)
+    # Only changed by the conditional UPDATEs in events.ticketing
+    tickets_sold = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = EventQuerySet.as_manager()
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(tickets_sold__lte=F('capacity')), name='event_tickets_within_capacity'),
+        ]
+        indexes = [
+            models.Index(fields=['-date', 'id'], name='event_date_id_idx'),
+            models.Index(fields=['user', '-date', 'id'], name='event_user_date_id_idx'),
+            models.Index(fields=['status', '-date', 'id'], name='event_status_date_id_idx'),
+            models.Index(fields=['category', '-date', 'id'], name='event_category_date_id_idx'),
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+            models.Index(fields=['user', 'updated_at'], name='event_user_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class Ticket(models.Model):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('canceled', 'Canceled'),
+    ]
+
+    event = models.ForeignKey(Event, related_name='tickets', on_delete=models.CASCADE)
+    attendee = models.ForeignKey(User, related_name='tickets', on_delete=models.CASCADE)
+    price = MoneyField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'attendee'], condition=Q(status='active'), name='ticket_one_active_per_attendee'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['attendee', '-created', 'id'], name='ticket_attendee_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ticket #{self.id} - Event: {self.event_id} - Attendee: {self.attendee_id}"
+
+
+class WaitlistEntry(models.Model):
+    event = models.ForeignKey(Event, related_name='waitlist', on_delete=models.CASCADE)
+    attendee = models.ForeignKey(User, related_name='waitlist_entries', on_delete=models.CASCADE)
+    # Higher tiers are promoted first; within a tier, in order of joining
+    priority = models.SmallIntegerField(default=0)
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    # Order in which entries are promoted; waitlist_head_idx serves it as a
+    # range scan from the head of one event's queue
+    PROMOTION_ORDER = ('-priority', 'joined_at', 'id')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'attendee'], name='waitlist_one_entry_per_attendee'),
+        ]
+        indexes = [
+            models.Index(fields=['event', '-priority', 'joined_at', 'id'], name='waitlist_head_idx'),
+        ]
+
+    def __str__(self):
+        return f"Waitlist entry #{self.id} - Event: {self.event_id} - Attendee: {self.attendee_id}"
+
+
 class Equipment(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     type = models.CharField(max_length=100)
-    rental_price = models.DecimalField(max_digits=10, decimal_places=2)
+    rental_price = MoneyField()
+    # Units owned; bookings reserve them per time window (see EquipmentOccupancy)
+    stock = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return self.name
@@ -47,15 +193,55 @@ class Equipment(models.Model):
 
 class EventEquipment(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
-    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE)
+    # Booked equipment cannot be deleted out from under its events
+    equipment = models.ForeignKey(Equipment, on_delete=models.PROTECT)
+    # Price per unit at booking time; adjustments and refunds use this, never
+    # the current catalog price
+    unit_price = MoneyField()
+    quantity = models.PositiveIntegerField(default=1)
+    # The window the units are reserved for, copied from the event
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'equipment'], name='booking_one_row_per_item'),
+        ]
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
 
     def __str__(self):
         return f"{self.event.name} - {self.equipment.name}"
 
 
+# Units of each item reserved per day and time slot, summed over the bookings
+# whose window touches the slot. Maintained by equipment.availability with
+# conditional UPDATEs that keep reserved within the item's stock, and
+# rebuilt from the bookings by the rebuild_reports command.
+class EquipmentOccupancy(models.Model):
+    equipment = models.ForeignKey(Equipment, related_name='occupancy', on_delete=models.CASCADE)
+    date = models.DateField()
+    # Slot of the day, numbered from midnight (see equipment.availability)
+    slot = models.PositiveSmallIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'equipment', 'slot'], name='occupancy_date_equipment_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Equipment #{self.equipment_id} on {self.date}, slot {self.slot} - Reserved: {self.reserved}"
+
+
 class Wallet(models.Model):
     customer = models.OneToOneField(User, on_delete=models.CASCADE)
-    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    balance = MoneyField(default=0)
+    # Incremented on every balance change, used as a cheap HTTP validator
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Wallet of {self.customer.username} - Balance: S.P{self.balance}"
@@ -63,15 +249,166 @@ class Wallet(models.Model):
 
 class TransactionLog(models.Model):
     customer = models.ForeignKey(User, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Set for purchases and refunds tied to an event; used by the revenue reports
+    event = models.ForeignKey(Event, related_name='transactions', on_delete=models.SET_NULL, blank=True, null=True)
+    amount = MoneyField()
     TRANSACTION_TYPES = [
         ('deposit', 'Deposit'),
         ('purchase', 'Purchase'),
         ('refund', 'Refund'),
+        ('ticket', 'Ticket'),
+        ('ticket_refund', 'Ticket refund'),
     ]
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     description = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-timestamp', 'id'], name='txn_customer_ts_id_idx'),
+            models.Index(fields=['timestamp', 'id'], name='txn_ts_id_idx'),
+        ]
+
     def __str__(self):
         return f"Transaction #{self.id} - User: {self.customer.username} - Type: {self.transaction_type} - Amount: {self.amount}"
+
+    # Purchases and tickets take money out of the wallet; deposits and refunds add to it
+    DEBIT_TYPES = ('purchase', 'ticket')
+
+    @classmethod
+    def signed_amount(cls):
+        return Case(
+            When(transaction_type__in=cls.DEBIT_TYPES, then=-F('amount')),
+            default=F('amount'),
+            output_field=MoneyField(max_digits=12),
+        )
+
+
+class WalletSnapshot(models.Model):
+    customer = models.ForeignKey(User, related_name='wallet_snapshots', on_delete=models.CASCADE)
+    as_of = models.DateTimeField(default=timezone.now)
+    # Balance derived from the ledger up to and including last_transaction_id
+    balance = MoneyField(max_digits=12)
+    last_transaction_id = models.PositiveBigIntegerField()
+    # Wallet.balance minus the ledger balance when the snapshot was taken
+    drift = MoneyField(max_digits=12, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-last_transaction_id'], name='snapshot_customer_txn_idx'),
+            models.Index(fields=['last_transaction_id'], name='snapshot_txn_idx'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.customer.username} at #{self.last_transaction_id} - Balance: S.P{self.balance}"
+
+
+# Reporting rollups. They are maintained incrementally by reports.rollups as
+# transactions and bookings are written, and can be rebuilt from the raw
+# tables with the rebuild_reports management command.
+class DailyRevenue(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    revenue = MoneyField(max_digits=14, default=0)
+    refunds = MoneyField(max_digits=14, default=0)
+    purchase_count = models.IntegerField(default=0)
+    refund_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='daily_revenue_date_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Revenue on {self.date} - Category: {self.category_id} - S.P{self.revenue}"
+
+
+class EquipmentRentalStats(models.Model):
+    equipment = models.OneToOneField(Equipment, related_name='rental_stats', on_delete=models.CASCADE, primary_key=True)
+    # Current bookings of the item; bookings of canceled events are removed
+    rentals = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rentals', 'equipment'], name='rental_stats_rentals_idx'),
+        ]
+
+    def __str__(self):
+        return f"Equipment #{self.equipment_id} - Rentals: {self.rentals}"
+
+
+class DailyCapacity(models.Model):
+    date = models.DateField(unique=True)
+    # Capacity of the events held that day, canceled events excluded
+    capacity = models.IntegerField(default=0)
+    events = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Capacity on {self.date} - {self.capacity} across {self.events} event(s)"
+
+
+# Version token of a cached catalog listing (see backend.caching); replaced
+# whenever the catalog changes, by any process
+class CatalogVersion(models.Model):
+    namespace = models.CharField(max_length=50, primary_key=True)
+    version = models.UUIDField(default=uuid.uuid4)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Catalog {self.namespace} - Version: {self.version}"
+
+
+class AuthToken(models.Model):
+    user = models.ForeignKey(User, related_name='auth_tokens', on_delete=models.CASCADE)
+    # Only a SHA-256 digest of the key is stored; the key itself is shown once at login
+    key_hash = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used = models.DateTimeField(blank=True, null=True)
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        key = secrets.token_hex(20)
+        return cls.objects.create(user=user, key_hash=cls.hash_key(key)), key
+
+    @staticmethod
+    def expiry_cutoff(now=None):
+        return (now or timezone.now()) - timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+    def is_expired(self, now=None):
+        return self.created <= self.expiry_cutoff(now)
+
+    def __str__(self):
+        return f"Token #{self.id} - User: {self.user.username}"
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, related_name='idempotency_keys', on_delete=models.CASCADE)
+    key_hash = models.CharField(max_length=64)
+    # SHA-256 of the method, path and body; reusing a key for another request is rejected
+    request_hash = models.CharField(max_length=64)
+    # Both stay null while the first request is still being processed
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key_hash'], name='idempotency_user_key_uniq'),
+        ]
+
+    @staticmethod
+    def expiry_cutoff(now=None):
+        return (now or timezone.now()) - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+    def is_stale(self, now=None):
+        now = now or timezone.now()
+        if self.status_code is None:
+            return self.created <= now - timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT)
+        return self.created <= self.expiry_cutoff(now)
+
+    def __str__(self):
+        return f"Idempotency key #{self.id} - User: {self.user.username}"
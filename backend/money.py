@@ -0,0 +1,44 @@
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import models
+
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    return int(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+# Amounts of money, stored as an integer number of cents. Python code, forms
+# and serializers see a DecimalField with two decimal places, while the column
+# is a BIGINT, so SUM() and the arithmetic in UPDATEs stay exact integer math
+# (SQLite stores decimal columns as REAL).
+#
+# Inside expressions, plain Decimals are sent to the database as decimal
+# strings; wrap them in Money() so they are converted to cents as well.
+class MoneyField(models.DecimalField):
+    def __init__(self, *args, max_digits=10, decimal_places=2, **kwargs):
+        super().__init__(*args, max_digits=max_digits, decimal_places=decimal_places, **kwargs)
+
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return to_cents(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return from_cents(value)
+
+
+def Money(amount):
+    return models.Value(amount, output_field=MoneyField())
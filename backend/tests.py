@@ -1,3 +1,392 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.test import APIClient, APITestCase
+from event_management.db_profiles import database_profile
+from users.token_cache import token_cache
+from wallets import services as wallet_services
+from .metrics import registry
+from .models import AuthToken, Category, Equipment, Event, EventEquipment, Ticket, TransactionLog, WaitlistEntry, Wallet
 
-# Create your tests here.
+
+class DatabaseProfileTests(SimpleTestCase):
+    def profile(self, **env):
+        with mock.patch.dict(os.environ, env, clear=True):
+            return database_profile(Path('/srv/ems'))
+
+    def test_sqlite_is_the_default(self):
+        profile = self.profile()
+        self.assertEqual(profile['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(profile['NAME'], Path('/srv/ems/db.sqlite3'))
+
+    def test_postgres_keeps_connections_open_unless_pooled(self):
+        persistent = self.profile(DJANGO_DB_PROFILE='postgres', DB_NAME='ems', DB_CONN_MAX_AGE='120')
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['OPTIONS']), (120, {}))
+
+        pooled = self.profile(DJANGO_DB_PROFILE='postgres', DB_POOL='1', DB_POOL_MAX_SIZE='20')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20})
+
+    def test_unknown_profile_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.profile(DJANGO_DB_PROFILE='oracle')
+
+
+# Not wrapped in a transaction, which SQLite refuses to change the journal mode in
+class SqlitePragmaTests(SimpleTestCase):
+    databases = {'default'}
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        # synchronous=NORMAL is reported as 1
+        self.assertEqual((self.pragma('synchronous'), self.pragma('busy_timeout')), (1, 5000))
+
+    def test_enable_wal_switches_the_database_file(self):
+        call_command('enable_wal', stdout=io.StringIO())
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+
+
+class MoneyFieldTests(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='pass')
+        Wallet.objects.create(customer=self.customer, balance=Decimal('0.30'))
+
+    def test_amounts_are_stored_as_integer_cents(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT balance, typeof(balance) FROM backend_wallet')
+            self.assertEqual(cursor.fetchone(), (30, 'integer'))
+        self.assertEqual(Wallet.objects.get().balance, Decimal('0.30'))
+
+    def test_sums_and_balance_updates_are_exact(self):
+        for _ in range(1000):
+            wallet_services.credit(self.customer, Decimal('0.10'))
+        wallet_services.debit(self.customer, Decimal('0.20'))
+
+        self.assertEqual(Wallet.objects.get().balance, Decimal('100.10'))
+        deposits = TransactionLog.objects.filter(transaction_type='deposit')
+        self.assertEqual(deposits.aggregate(total=Sum('amount'))['total'], Decimal('100.00'))
+        self.assertEqual(
+            TransactionLog.objects.aggregate(net=Sum(TransactionLog.signed_amount()))['net'], Decimal('99.80')
+        )
+
+    def test_api_output_stays_decimal_strings(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(reverse('viewWallet'))
+
+        self.assertEqual(response.data['balance'], '0.30')
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        registry.clear()
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        Category.objects.create(name='Wedding')
+        self.client.force_authenticate(user=self.admin)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_named_url(self):
+        self.client.get(reverse('list_all_events'))
+        self.client.get(reverse('list_all_events'))
+        self.client.get('/api/no-such-endpoint/')
+
+        metrics = self.scrape()
+        self.assertIn('ems_requests_total{view="list_all_events",method="GET",status="200"} 2', metrics)
+        self.assertIn('ems_requests_total{view="unmatched",method="GET",status="404"} 1', metrics)
+        self.assertIn('ems_request_duration_seconds_count{view="list_all_events",method="GET"} 2', metrics)
+        self.assertIn('ems_request_db_queries_bucket{view="list_all_events",method="GET",le="+Inf"} 2', metrics)
+        self.assertIn('ems_token_cache_hits_total', metrics)
+
+    def test_query_count_and_render_time_are_measured(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('list_categories'))
+        executed = len(queries)
+        sample = self.scrape().split('ems_request_db_queries_sum{view="list_categories",method="GET"} ')[1]
+        self.assertEqual(int(sample.split()[0]), executed)
+
+        self.client.get(reverse('list_all_events'))
+        render_sum = self.scrape().split('ems_request_render_seconds_sum{view="list_all_events",method="GET"} ')[1]
+        self.assertGreater(float(render_sum.split()[0]), 0)
+
+    def test_server_timing_header_is_optional(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('list_categories')))
+
+        with override_settings(METRICS={'SERVER_TIMING': True}):
+            client = APIClient()
+            response = client.get(reverse('list_categories'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+$')
+
+    def test_metrics_endpoint_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='pass'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+
+# Query and latency budgets, (max queries, max milliseconds), for every named
+# route in event_management.urls, measured against the volumes seeded by
+# QueryBudgetTests with cold caches. A new route fails the suite until it is
+# given a budget here. Query counts are always enforced; wall-clock time
+# depends on the machine, so latency is only enforced with
+# QUERY_BUDGET_LATENCY=1. Run with QUERY_BUDGET_REPORT=<path> to write the
+# measured numbers as JSON for CI to diff between commits.
+QUERY_BUDGETS = {
+    'metrics': (2, 100),
+    'register': (4, 100),
+    'login': (3, 100),
+    'password_reset_request': (1, 100),
+    'password_reset_code_check': (1, 100),
+    'password_reset_confirm': (3, 100),
+    'my_profile': (1, 100),
+    'updateUserInfo': (5, 100),
+    'create_category': (3, 100),
+    'update_category': (4, 100),
+    'delete_category': (16, 100),
+    'list_categories': (2, 100),
+    'import_categories': (5, 100),
+    'export_categories': (2, 100),
+    'create_equipment': (3, 100),
+    'update_equipment': (4, 100),
+    'delete_equipment': (7, 100),
+    'list_equipment': (2, 100),
+    'list_available_equipment': (2, 100),
+    'import_equipment': (5, 100),
+    'export_equipment': (2, 100),
+    'create_event': (23, 200),
+    'update_event': (6, 100),
+    'cancel_event': (19, 200),
+    'list_all_events': (8, 300),
+    'list_my_events': (8, 300),
+    'register_for_event': (12, 100),
+    'cancel_ticket': (15, 100),
+    'list_my_tickets': (2, 100),
+    'leave_waitlist': (2, 100),
+    'set_waitlist_priority': (2, 100),
+    'viewWallet': (4, 100),
+    'addFunds': (6, 100),
+    'myTransactions': (3, 100),
+    'exportTransactionLogs': (2, 300),
+    'revenue_report': (2, 100),
+    'refund_rate_report': (2, 100),
+    'top_equipment_report': (2, 100),
+    'capacity_report': (2, 100),
+    'logout': (3, 100),
+}
+
+
+# A fast hasher keeps PBKDF2 from dominating the auth routes' timings
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTests(APITestCase):
+    CUSTOMERS = 50
+    EVENTS = 400
+    EQUIPMENT = 60
+    EQUIPMENT_PER_EVENT = 3
+    TRANSACTIONS = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password('pass')
+        cls.admin = User.objects.create(
+            username='admin', email='admin@example.com', password=password, is_staff=True, is_superuser=True
+        )
+        User.objects.bulk_create([
+            User(username=f'customer{i}', email=f'customer{i}@example.com', password=password)
+            for i in range(cls.CUSTOMERS)
+        ])
+        customers = list(User.objects.filter(username__startswith='customer').order_by('id'))
+        cls.customer = customers[0]
+        Wallet.objects.bulk_create([Wallet(customer=user, balance=Decimal('100000.00')) for user in customers])
+
+        categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(10)])
+        cls.unused_category = Category.objects.create(name='Unused')
+        equipment = Equipment.objects.bulk_create([
+            Equipment(name=f'Item {i}', type='audio', rental_price=Decimal('25.00')) for i in range(cls.EQUIPMENT)
+        ])
+        cls.unused_equipment = Equipment.objects.create(name='Unused', type='audio', rental_price=Decimal('5.00'))
+
+        # A quarter of the events, and most of the ledger, belong to the
+        # customer whose endpoints are measured
+        events = Event.objects.bulk_create([
+            Event(
+                user=customers[i % 4], category=categories[i % len(categories)], name=f'Event {i}', location='Hall',
+                capacity=100, date=datetime.date(2030, 1, 1) + datetime.timedelta(days=i // 4),
+                start_time=datetime.time(10), end_time=datetime.time(12),
+                total_price=Decimal('25.00') * cls.EQUIPMENT_PER_EVENT,
+            )
+            for i in range(cls.EVENTS)
+        ])
+        EventEquipment.objects.bulk_create([
+            EventEquipment(
+                event=event, equipment=equipment[(i * cls.EQUIPMENT_PER_EVENT + k) % len(equipment)],
+                unit_price=Decimal('25.00'), date=event.date, start_time=event.start_time, end_time=event.end_time,
+            )
+            for i, event in enumerate(events) for k in range(cls.EQUIPMENT_PER_EVENT)
+        ])
+        TransactionLog.objects.bulk_create(
+            [
+                TransactionLog(customer=event.user, event=event, amount=event.total_price, transaction_type='purchase')
+                for event in events
+            ] + [
+                TransactionLog(customer=cls.customer, amount=Decimal('10.00'), transaction_type='deposit')
+                for _ in range(cls.TRANSACTIONS)
+            ]
+        )
+        call_command('rebuild_reports', stdout=io.StringIO())
+
+        cls.event = Event.objects.filter(user=cls.customer).order_by('id').first()
+        cls.ticketed_events = list(Event.objects.exclude(user=cls.customer).order_by('id')[:3])
+        Event.objects.filter(pk__in=[event.pk for event in cls.ticketed_events]).update(ticket_price=Decimal('20.00'))
+        cls.ticket = Ticket.objects.create(event=cls.ticketed_events[1], attendee=cls.customer, price=Decimal('20.00'))
+        Event.objects.filter(pk=cls.ticketed_events[1].pk).update(tickets_sold=1)
+        cls.waitlist_entries = WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(event=cls.ticketed_events[2], attendee=attendee) for attendee in customers[:20]
+        ])
+        cls.free_equipment = [item.id for item in equipment[:cls.EQUIPMENT_PER_EVENT]]
+        cls.admin_key = AuthToken.issue(cls.admin)[1]
+        cls.customer_key = AuthToken.issue(cls.customer)[1]
+        cls.logout_key = AuthToken.issue(cls.customer)[1]
+
+    # (method, path, client kwargs, bearer key) per route; writes come after
+    # the reads they would disturb and logout comes last
+    def endpoint_requests(self):
+        category_csv = SimpleUploadedFile('categories.csv', b'name,description\nImported,From a file\n')
+        equipment_csv = SimpleUploadedFile(
+            'equipment.csv', b'name,description,type,rental_price\nImported,From a file,audio,12.50\n'
+        )
+        new_user = {
+            'first_name': 'New', 'last_name': 'User', 'email': 'new@example.com', 'username': 'newuser',
+            'password': 'pass', 'confirm_password': 'pass', 'role': 'customer',
+        }
+        reset = {'email': self.customer.email, 'code': '135246'}
+        new_event = {
+            'name': 'Launch', 'description': 'Product launch', 'date': '2035-06-01', 'start_time': '10:00',
+            'end_time': '12:00', 'location': 'Hall', 'capacity': 50, 'category': self.unused_category.id,
+            'equipment': self.free_equipment,
+        }
+        admin, customer = self.admin_key, self.customer_key
+        return {
+            'metrics': ('get', reverse('metrics'), {}, admin),
+            'my_profile': ('get', reverse('my_profile'), {}, customer),
+            'list_categories': ('get', reverse('list_categories'), {}, None),
+            'export_categories': ('get', reverse('export_categories'), {}, admin),
+            'list_equipment': ('get', reverse('list_equipment'), {}, None),
+            'list_available_equipment': (
+                'get', reverse('list_available_equipment'),
+                {'data': {'date': '2030-01-05', 'start_time': '09:00', 'end_time': '11:00'}}, None,
+            ),
+            'export_equipment': ('get', reverse('export_equipment'), {}, admin),
+            'list_all_events': ('get', reverse('list_all_events'), {}, admin),
+            'list_my_events': ('get', reverse('list_my_events'), {}, customer),
+            'viewWallet': ('get', reverse('viewWallet'), {}, customer),
+            'myTransactions': ('get', reverse('myTransactions'), {}, customer),
+            'exportTransactionLogs': ('get', reverse('exportTransactionLogs'), {}, admin),
+            'revenue_report': ('get', reverse('revenue_report'), {}, admin),
+            'refund_rate_report': ('get', reverse('refund_rate_report'), {}, admin),
+            'top_equipment_report': ('get', reverse('top_equipment_report'), {}, admin),
+            'capacity_report': ('get', reverse('capacity_report'), {}, admin),
+            'register': ('post', reverse('register'), {'data': new_user}, None),
+            'login': ('post', reverse('login'), {'data': {'username_or_email': 'customer1', 'password': 'pass'}}, None),
+            'password_reset_request': ('post', reverse('password_reset_request'), {'data': {'email': self.customer.email}}, None),
+            'password_reset_code_check': ('post', reverse('password_reset_code_check'), {'data': reset}, None),
+            'password_reset_confirm': (
+                'post', reverse('password_reset_confirm'),
+                {'data': {**reset, 'password': 'pass', 'confirm_password': 'pass'}}, None,
+            ),
+            'updateUserInfo': ('put', reverse('updateUserInfo'), {'data': {'first_name': 'Renamed'}}, customer),
+            'create_category': ('post', reverse('create_category'), {'data': {'name': 'New'}}, admin),
+            'update_category': (
+                'put', reverse('update_category', args=[self.unused_category.id]), {'data': {'name': 'Renamed'}}, admin,
+            ),
+            'import_categories': ('post', reverse('import_categories'), {'data': {'file': category_csv}, 'format': 'multipart'}, admin),
+            'create_equipment': (
+                'post', reverse('create_equipment'), {'data': {'name': 'New', 'type': 'audio', 'rental_price': '9.00'}}, admin,
+            ),
+            'update_equipment': (
+                'put', reverse('update_equipment', args=[self.unused_equipment.id]), {'data': {'name': 'Renamed'}}, admin,
+            ),
+            'import_equipment': ('post', reverse('import_equipment'), {'data': {'file': equipment_csv}, 'format': 'multipart'}, admin),
+            'create_event': ('post', reverse('create_event'), {'data': new_event}, customer),
+            'update_event': ('put', reverse('update_event', args=[self.event.id]), {'data': {'name': 'Renamed'}}, customer),
+            'cancel_event': ('post', reverse('cancel_event', args=[self.event.id]), {}, customer),
+            'register_for_event': ('post', reverse('register_for_event', args=[self.ticketed_events[0].id]), {}, customer),
+            'list_my_tickets': ('get', reverse('list_my_tickets'), {}, customer),
+            'cancel_ticket': ('post', reverse('cancel_ticket', args=[self.ticket.id]), {}, customer),
+            'set_waitlist_priority': (
+                'put', reverse('set_waitlist_priority', args=[self.waitlist_entries[-1].id]), {'data': {'priority': 1}}, admin,
+            ),
+            'leave_waitlist': ('post', reverse('leave_waitlist', args=[self.waitlist_entries[0].id]), {}, customer),
+            'addFunds': ('post', reverse('addFunds'), {'data': {'username': self.customer.username, 'amount': '50.00'}}, admin),
+            'delete_category': ('delete', reverse('delete_category', args=[self.unused_category.id]), {}, admin),
+            'delete_equipment': ('delete', reverse('delete_equipment', args=[self.unused_equipment.id]), {}, admin),
+            'logout': ('post', reverse('logout'), {}, self.logout_key),
+        }
+
+    # Caches are cleared first, so every request pays for its cold path,
+    # including the token lookup. Streamed bodies are consumed inside the
+    # measurement, since their queries run while the body is iterated.
+    def measure(self, method, path, kwargs, key):
+        cache.clear()
+        token_cache.clear()
+        self.client.credentials(**({'HTTP_AUTHORIZATION': f'Bearer {key}'} if key else {}))
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return response, len(queries), elapsed * 1000
+
+    def test_every_named_url_has_a_budget(self):
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        self.assertEqual(set(QUERY_BUDGETS), names)
+        self.assertEqual(set(self.endpoint_requests()), names)
+
+    def test_endpoints_stay_within_budget(self):
+        # Warm up imports and URL resolution so the first route is not charged for them
+        self.measure('get', reverse('my_profile'), {}, self.customer_key)
+
+        enforce_latency = os.environ.get('QUERY_BUDGET_LATENCY') == '1'
+        report = {}
+        for name, (method, path, kwargs, key) in self.endpoint_requests().items():
+            response, queries, elapsed = self.measure(method, path, kwargs, key)
+            max_queries, max_ms = QUERY_BUDGETS[name]
+            report[name] = {
+                'method': method.upper(),
+                'status': response.status_code,
+                'queries': queries,
+                'max_queries': max_queries,
+                'ms': round(elapsed),
+                'max_ms': max_ms,
+                'over_ms': elapsed > max_ms,
+            }
+            with self.subTest(endpoint=name):
+                self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+                self.assertLessEqual(queries, max_queries)
+                if enforce_latency:
+                    self.assertLessEqual(elapsed, max_ms)
+
+        report_path = os.environ.get('QUERY_BUDGET_REPORT')
+        if report_path:
+            Path(report_path).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
@@ -1,3 +1,20 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from users.authentication import BearerTokenAuthentication
+from users.token_cache import token_cache
+from .metrics import registry
 
-# Create your views here.
+
+# Request metrics in Prometheus text format (Admin only)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def metrics(request):
+    stats = token_cache.stats()
+    extra = [
+        ('ems_token_cache_hits_total', 'counter', 'Bearer token lookups served from the cache.', stats['hits']),
+        ('ems_token_cache_misses_total', 'counter', 'Bearer token lookups that went to the database.', stats['misses']),
+        ('ems_token_cache_size', 'gauge', 'Tokens held in the in-process cache.', stats['size']),
+    ]
+    return HttpResponse(registry.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
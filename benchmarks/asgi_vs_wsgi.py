@@ -0,0 +1,150 @@
+"""Throughput of the read endpoints under uvicorn (async views) and gunicorn (WSGI).
+
+    python -m benchmarks.asgi_vs_wsgi --connections 500 --duration 20
+
+Needs uvicorn, gunicorn and httpx. Seeds a scratch SQLite database with one
+customer's events and transactions, starts each server in turn on the same
+database, and drives it with --connections concurrent keep-alive clients that
+each issue requests back to back. The load generator runs in this process, so
+on small machines it competes with the server for CPU; compare the two rows
+rather than reading the absolute numbers.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.utils import BASE_DIR, print_table, setup_django
+
+ENDPOINTS = ['/api/my-profile/', '/api/events/my-events/', '/api/wallets/my-wallet/', '/api/wallets/my-transactions/']
+
+
+def seed(events=200, transactions=500):
+    from django.contrib.auth.models import User
+    from backend.models import Category, Event, TransactionLog, Wallet
+
+    user = User.objects.create_user(username='bench-customer', password='bench')
+    category = Category.objects.create(name='Bench')
+    Event.objects.bulk_create([
+        Event(
+            user=user, category=category, name=f'Event {i}', location='Hall', capacity=10,
+            date=datetime.date(2030, 1, 1) + datetime.timedelta(days=i),
+            start_time=datetime.time(10), end_time=datetime.time(12),
+        )
+        for i in range(events)
+    ])
+    Wallet.objects.create(customer=user, balance=Decimal('100.00'))
+    TransactionLog.objects.bulk_create([
+        TransactionLog(customer=user, amount=Decimal('1.00'), transaction_type='deposit') for _ in range(transactions)
+    ])
+
+
+def issue_token():
+    from django.contrib.auth.models import User
+    from backend.models import AuthToken
+
+    return AuthToken.issue(User.objects.get(username='bench-customer'))[1]
+
+
+def start_server(kind, port, workers, threads, db_path):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.server_settings', 'EMS_BENCH_DB': str(db_path)}
+    address = f'127.0.0.1:{port}'
+    if kind == 'asgi':
+        command = [
+            sys.executable, '-m', 'uvicorn', 'event_management.asgi:application', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'gunicorn', 'event_management.wsgi:application', '--bind', address,
+            '--workers', str(workers), '--threads', str(threads), '--worker-class', 'gthread', '--log-level', 'warning',
+        ]
+    return subprocess.Popen(command, cwd=BASE_DIR, env=env)
+
+
+async def wait_until_ready(client, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'server at {url} did not start')
+
+
+async def drive(base_url, key, connections, duration):
+    import httpx
+
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    headers = {'Authorization': f'Bearer {key}'}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        await wait_until_ready(client, ENDPOINTS[0])
+        latencies = []
+        errors = 0
+        deadline = time.monotonic() + duration
+
+        async def worker(index):
+            nonlocal errors
+            position = index
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(ENDPOINTS[position % len(ENDPOINTS)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                position += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i) for i in range(connections)))
+        return latencies, errors, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default='/tmp/ems_bench_asgi.sqlite3')
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+    if fresh:
+        seed()
+    key = issue_token()
+
+    rows = []
+    for kind in ('wsgi', 'asgi'):
+        server = start_server(kind, args.port, args.workers, args.threads, args.db)
+        try:
+            latencies, errors, elapsed = asyncio.run(
+                drive(f'http://127.0.0.1:{args.port}', key, args.connections, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        rows.append([
+            'gunicorn gthread (sync views)' if kind == 'wsgi' else 'uvicorn (async views)',
+            f'{len(latencies) / elapsed:.0f}', f'{quantiles[49] * 1000:.0f} ms', f'{quantiles[98] * 1000:.0f} ms', errors,
+        ])
+
+    print(f'{args.connections} connections, {args.duration:.0f} s per server, {args.workers} worker process(es)')
+    print_table(rows, ['server', 'req/s', 'p50', 'p99', 'errors'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Concurrent booking throughput for each database profile.
+
+    python -m benchmarks.booking_throughput --threads 8 --bookings 25
+    DB_USER=... DB_PASSWORD=... python -m benchmarks.booking_throughput --profiles sqlite-tuned postgres
+
+Each profile runs in its own process against a fresh scratch database:
+
+sqlite-default  SQLite with no PRAGMAs (rollback journal, synchronous=FULL)
+sqlite-tuned    SQLite in WAL mode (enable_wal) with settings.SQLITE_PRAGMAS
+postgres        DJANGO_DB_PROFILE=postgres against the database named by
+                --pg-db, which is created/migrated; the DB_* variables
+                configure the connection and pooling (see event_management.db_profiles)
+
+--threads customers book events through the create_event view at the same
+time, each booking its own equipment, so every request should succeed; a
+failed booking is usually a lock timeout. --readers threads page through
+list_my_events meanwhile, which is where the journal mode matters most.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.utils import BASE_DIR, print_table, setup_django
+
+PROFILES = ('sqlite-default', 'sqlite-tuned', 'postgres')
+
+
+def run_profile(profile, threads, bookings, readers, pg_db):
+    if profile == 'postgres':
+        setup_django(pg_db, migrate=False)
+    else:
+        db_path = Path(f'/tmp/ems_bench_booking_{profile}.sqlite3')
+        for suffix in ('', '-wal', '-shm'):
+            Path(f'{db_path}{suffix}').unlink(missing_ok=True)
+        setup_django(db_path, migrate=False)
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import close_old_connections, connection
+
+    if profile == 'sqlite-default':
+        settings.SQLITE_PRAGMAS = {}
+    call_command('migrate', verbosity=0)
+    if profile == 'sqlite-tuned':
+        call_command('enable_wal', stdout=open(os.devnull, 'w'))
+
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from backend.models import Category, Equipment, Wallet
+    from events.views import create_event, list_my_events
+
+    category = Category.objects.create(name='Bench')
+    customers = []
+    for index in range(threads):
+        customer = User.objects.create(username=f'bench-{index}')
+        Wallet.objects.create(customer=customer, balance=Decimal('1000000.00'))
+        equipment = Equipment.objects.create(name=f'Item {index}', type='bench', rental_price=Decimal('1.00'))
+        customers.append((customer, equipment))
+    connection.close()
+
+    factory = APIRequestFactory()
+    barrier = threading.Barrier(threads + readers)
+    done = threading.Event()
+    latencies = []
+    failures = []
+    reads = []
+
+    def book(index):
+        customer, equipment = customers[index]
+        try:
+            barrier.wait()
+            for day in range(bookings):
+                request = factory.post('/api/events/create/', {
+                    'name': 'Bench event', 'date': f'2030-{1 + day // 28:02d}-{1 + day % 28:02d}',
+                    'start_time': '10:00', 'end_time': '12:00', 'location': 'Hall', 'capacity': 10,
+                    'category': category.id, 'equipment': [equipment.id],
+                }, format='json')
+                force_authenticate(request, user=customer)
+                started = time.perf_counter()
+                try:
+                    response = create_event(request)
+                    if response.status_code != 201:
+                        failures.append(str(response.data))
+                except Exception as exc:
+                    failures.append(repr(exc))
+                latencies.append(time.perf_counter() - started)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def read(index):
+        customer, _ = customers[index % threads]
+        try:
+            barrier.wait()
+            while not done.is_set():
+                request = factory.get('/api/events/my-events/')
+                force_authenticate(request, user=customer)
+                try:
+                    reads.append(list_my_events(request).status_code == 200)
+                except Exception:
+                    reads.append(False)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    bookers = [threading.Thread(target=book, args=(index,)) for index in range(threads)]
+    readers = [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+    started = time.perf_counter()
+    for worker in bookers + readers:
+        worker.start()
+    for worker in bookers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for worker in readers:
+        worker.join()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'profile': profile,
+        'bookings': len(latencies) - len(failures),
+        'failed': len(failures),
+        'per_second': (len(latencies) - len(failures)) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'reads_per_second': sum(reads) / elapsed,
+        'failed_reads': reads.count(False),
+        'first_failure': failures[0] if failures else '',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=['sqlite-default', 'sqlite-tuned'])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=25, help='Bookings per thread.')
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--pg-db', default='ems_bench')
+    parser.add_argument('--run-one', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_profile(args.run_one, args.threads, args.bookings, args.readers, args.pg_db)))
+        return
+
+    rows = []
+    for profile in args.profiles:
+        env = {**os.environ, 'DJANGO_DB_PROFILE': 'postgres' if profile == 'postgres' else 'sqlite'}
+        command = [
+            sys.executable, '-m', 'benchmarks.booking_throughput', '--run-one', profile,
+            '--threads', str(args.threads), '--bookings', str(args.bookings), '--readers', str(args.readers),
+            '--pg-db', args.pg_db,
+        ]
+        completed = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            rows.append([profile, '-', '-', '-', '-', '-', '-', '-', completed.stderr.strip().splitlines()[-1][:60]])
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        rows.append([
+            profile, result['bookings'], result['failed'], f"{result['per_second']:.1f}",
+            f"{result['p50_ms']:.0f} ms", f"{result['p99_ms']:.0f} ms", f"{result['reads_per_second']:.1f}",
+            result['failed_reads'], result['first_failure'][:60],
+        ])
+
+    print(f'{args.threads} threads x {args.bookings} bookings, {args.readers} reader(s)')
+    print_table(rows, ['profile', 'booked', 'failed', 'bookings/s', 'p50', 'p99', 'reads/s', 'failed reads', 'first failure'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Latency of equipment availability checks with a large booking table.
+
+    python -m benchmarks.equipment_availability --bookings 300000
+
+Seeds a scratch SQLite database (reused on later runs) with events, their
+equipment bookings and the occupancy table built from them, then times a
+20-item reservation (the conditional UPDATE of a booking, rolled back) and
+the queries behind /api/equipment/available/ for a window and a whole day.
+"""
+import argparse
+import datetime
+import random
+from pathlib import Path
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def seed(bookings, equipment_count, per_event=3, batch_size=10000):
+    from django.contrib.auth.models import User
+    from backend.models import Category, Equipment, EquipmentOccupancy, Event, EventEquipment
+    from equipment.availability import occupancy_from_bookings
+
+    rng = random.Random(7)
+    user = User.objects.create(username='bench-owner')
+    category = Category.objects.create(name='Bench')
+    equipment = Equipment.objects.bulk_create([
+        Equipment(name=f'Item {i}', type='bench', rental_price=10, stock=10) for i in range(equipment_count)
+    ])
+    first_day = datetime.date(2030, 1, 1)
+
+    for offset in range(0, bookings, batch_size):
+        events = []
+        for _ in range(batch_size // per_event):
+            start = rng.randrange(6, 20)
+            events.append(Event(
+                user=user, category=category, name='Bench event', location='Hall', capacity=10,
+                date=first_day + datetime.timedelta(days=rng.randrange(730)),
+                start_time=datetime.time(start), end_time=datetime.time(start + rng.randrange(1, 4)),
+            ))
+        events = Event.objects.bulk_create(events)
+        EventEquipment.objects.bulk_create([
+            EventEquipment(
+                event=event, equipment=item, unit_price=item.rental_price,
+                date=event.date, start_time=event.start_time, end_time=event.end_time
+            )
+            for event in events
+            for item in rng.sample(equipment, per_event)
+        ])
+        print(f'seeded {offset + batch_size} bookings', end='\r', flush=True)
+    print()
+
+    bookings = EventEquipment.objects.values_list('equipment_id', 'date', 'start_time', 'end_time', 'quantity')
+    EquipmentOccupancy.objects.bulk_create(
+        (
+            EquipmentOccupancy(equipment_id=equipment_id, date=date, slot=slot, reserved=reserved)
+            for (equipment_id, date, slot), reserved in occupancy_from_bookings(bookings.iterator()).items()
+        ),
+        batch_size=batch_size,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bookings', type=int, default=300_000)
+    parser.add_argument('--equipment', type=int, default=2000)
+    parser.add_argument('--db', default='/tmp/ems_bench_availability.sqlite3')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+
+    from django.db import transaction
+    from backend.models import Equipment, EquipmentOccupancy, EventEquipment
+    from equipment.availability import available_equipment, reserve
+
+    if fresh:
+        seed(args.bookings, args.equipment)
+
+    date = datetime.date(2030, 6, 15)
+    start, end = datetime.time(10), datetime.time(13)
+    ids = list(Equipment.objects.order_by('?').values_list('id', flat=True)[:20])
+
+    def reserve_and_roll_back():
+        with transaction.atomic():
+            reserve(ids, date, start, end)
+            transaction.set_rollback(True)
+
+    rows = []
+    seconds, _ = measure(reserve_and_roll_back, args.repeat)
+    rows.append(['reserve (20 items)', f'{seconds * 1000:.3f} ms', len(ids)])
+    seconds, free = measure(lambda: available_equipment(date, start, end), args.repeat)
+    rows.append(['available equipment, window', f'{seconds * 1000:.3f} ms', len(free)])
+    seconds, free = measure(lambda: available_equipment(date), args.repeat)
+    rows.append(['available equipment, whole day', f'{seconds * 1000:.3f} ms', len(free)])
+
+    print(
+        f'{EventEquipment.objects.count()} bookings, {EquipmentOccupancy.objects.count()} occupancy rows, '
+        f'{Equipment.objects.count()} equipment items'
+    )
+    print_table(rows, ['query', 'median', 'rows'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Latency of the admin event listing with filters and search on a seeded database.
+
+    python -m benchmarks.event_filters --events 1000000
+
+Seeds a scratch SQLite database (reused on later runs) and times the first page
+of /api/events/list/ for each filter, plus the FTS5 and LIKE search paths.
+"""
+import argparse
+import datetime
+import random
+from pathlib import Path
+from unittest import mock
+
+from benchmarks.utils import measure, print_table, setup_django
+
+WORDS = [
+    'jazz', 'rock', 'summer', 'winter', 'charity', 'gala', 'tech', 'startup', 'marathon', 'yoga',
+    'wedding', 'birthday', 'conference', 'workshop', 'expo', 'film', 'poetry', 'chess', 'food', 'wine',
+]
+CITIES = ['Damascus', 'Aleppo', 'Homs', 'Latakia', 'Tartus', 'Hama', 'Daraa', 'Idlib']
+
+
+def seed(events, batch_size=20000):
+    from django.contrib.auth.models import User
+    from backend.models import Category, Event
+
+    rng = random.Random(42)
+    users = User.objects.bulk_create([User(username=f'bench{i}') for i in range(1000)])
+    categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(20)])
+    first_day = datetime.date(2022, 1, 1)
+
+    for offset in range(0, events, batch_size):
+        batch = []
+        for _ in range(min(batch_size, events - offset)):
+            start = rng.randrange(8, 20)
+            batch.append(Event(
+                user=rng.choice(users),
+                category=rng.choice(categories),
+                name=' '.join(rng.sample(WORDS, 3)),
+                # A rare term makes the selective-search case measurable
+                description=' '.join(rng.choices(WORDS, k=12)) + (' philharmonic' if rng.random() < 0.001 else ''),
+                date=first_day + datetime.timedelta(days=rng.randrange(365 * 6)),
+                start_time=datetime.time(start),
+                end_time=datetime.time(start + 3),
+                location=f'{rng.choice(CITIES)} hall {rng.randrange(100)}',
+                capacity=rng.randrange(10, 500),
+                status='canceled' if rng.random() < 0.05 else 'upcoming',
+            ))
+        Event.objects.bulk_create(batch)
+        print(f'seeded {offset + len(batch)} events', end='\r', flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--db', default='/tmp/ems_bench_event_filters.sqlite3')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from backend.models import Category
+    from events.views import list_all_events
+
+    if fresh:
+        seed(args.events)
+
+    admin, _ = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True})
+    owner = User.objects.filter(username__startswith='bench').exclude(pk=admin.pk).first()
+    category = Category.objects.first()
+    factory = APIRequestFactory()
+
+    def request(params):
+        def run():
+            req = factory.get('/api/events/list/', params)
+            force_authenticate(req, user=admin)
+            response = list_all_events(req)
+            assert response.status_code == 200, response.data
+            return len(response.data['results'])
+        return run
+
+    scenarios = [
+        ('no filters', {}),
+        ('status=canceled', {'status': 'canceled'}),
+        ('status=upcoming', {'status': 'upcoming'}),
+        ('category', {'category': category.id}),
+        ('owner', {'owner': owner.id}),
+        ('date range (1 month)', {'date_from': '2024-03-01', 'date_to': '2024-03-31'}),
+        ('location substring', {'location': 'latakia hall 7'}),
+    ]
+    searches = [('common terms', 'charity gala'), ('rare term', 'philharmonic')]
+
+    rows = []
+    for name, params in scenarios:
+        seconds, count = measure(request(params), args.repeat)
+        rows.append([name, f'{seconds * 1000:.1f} ms', count])
+
+    for label, text in searches:
+        seconds, count = measure(request({'search': text}), args.repeat)
+        rows.append([f'search, {label} (FTS5)', f'{seconds * 1000:.1f} ms', count])
+        with mock.patch('events.filters.event_fts_installed', return_value=False):
+            seconds, count = measure(request({'search': text}), args.repeat)
+        rows.append([f'search, {label} (LIKE)', f'{seconds * 1000:.1f} ms', count])
+
+    print_table(rows, ['scenario', 'median', 'rows'])
+
+
+if __name__ == '__main__':
+    main()
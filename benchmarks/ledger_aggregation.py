@@ -0,0 +1,113 @@
+"""Ledger aggregates with decimal amounts versus integer cents.
+
+    python -m benchmarks.ledger_aggregation --rows 10000000
+
+Seeds a scratch SQLite database at migration backend 0016, where amounts are
+DecimalFields (stored by SQLite as REAL), with --rows transaction log rows and
+times the wallet total and the per-customer net balance that reconciliation
+computes. It then applies 0017, which converts every amount to integer cents
+in place, and repeats the same queries against the current models. Each
+result is compared with the exact total, summed over integer cents.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from benchmarks.utils import measure, print_table, setup_django
+
+BEFORE = [('backend', '0016_booking_price_snapshot')]
+
+
+def seed(rows, customers):
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+
+    User.objects.bulk_create([User(username=f'customer{i}') for i in range(customers)])
+    first_id = User.objects.order_by('id').values_list('id', flat=True).first()
+    # Amounts are spread over 0.00-999.99; every third row is a purchase
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+            INSERT INTO backend_transactionlog (customer_id, amount, transaction_type, timestamp)
+            SELECT %s + n %% %s, ((n * 7919) %% 100000) / 100.0,
+                   CASE WHEN n %% 3 = 0 THEN 'purchase' ELSE 'deposit' END, '2030-01-01 00:00:00'
+            FROM seq
+            """,
+            [rows, first_id, customers],
+        )
+        cursor.execute(
+            """
+            SELECT SUM(CASE WHEN transaction_type = 'purchase' THEN -1 ELSE 1 END
+                       * CAST(ROUND(amount * 100) AS INTEGER))
+            FROM backend_transactionlog
+            """
+        )
+        return cursor.fetchone()[0]
+
+
+def signed_amount(model):
+    from django.db.models import Case, F, When
+
+    return Case(
+        When(transaction_type__in=('purchase', 'ticket'), then=-F('amount')),
+        default=F('amount'),
+        output_field=model._meta.get_field('amount'),
+    )
+
+
+def run_queries(model, exact_cents, repeat):
+    from decimal import Decimal
+    from django.db.models import Sum
+
+    exact = Decimal(exact_cents).scaleb(-2)
+    total_time, total = measure(lambda: model.objects.aggregate(total=Sum(signed_amount(model)))['total'], repeat)
+    per_customer_time, per_customer = measure(
+        lambda: dict(
+            model.objects.values('customer_id').annotate(net=Sum(signed_amount(model))).values_list('customer_id', 'net')
+        ),
+        repeat,
+    )
+    return [
+        ['net total', f'{total_time:.2f} s', Decimal(total) - exact],
+        ['net per customer', f'{per_customer_time:.2f} s', sum(map(Decimal, per_customer.values())) - exact],
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--customers', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--db', default='/tmp/ems_bench_ledger_aggregation.sqlite3')
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(args.db + suffix).unlink(missing_ok=True)
+    setup_django(args.db, migrate=False)
+
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+    from backend.models import TransactionLog
+
+    executor = MigrationExecutor(connection)
+    before = [node for node in executor.loader.graph.leaf_nodes() if node[0] != 'backend'] + BEFORE
+    executor.migrate(before)
+    decimal_model = executor.loader.project_state(before).apps.get_model('backend', 'TransactionLog')
+
+    started = time.perf_counter()
+    exact_cents = seed(args.rows, args.customers)
+    print(f'seeded {args.rows} rows in {time.perf_counter() - started:.1f} s')
+    rows = [['decimal', *row] for row in run_queries(decimal_model, exact_cents, args.repeat)]
+
+    started = time.perf_counter()
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+    print(f'converted to cents in {time.perf_counter() - started:.1f} s\n')
+    rows += [['cents', *row] for row in run_queries(TransactionLog, exact_cents, args.repeat)]
+
+    print_table(rows, ['amounts', 'query', 'time', 'error vs exact'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Overhead of the request metrics middleware (backend.middleware).
+
+    python -m benchmarks.metrics_overhead --requests 500 --rounds 7
+
+Seeds a scratch SQLite database (see benchmarks.asgi_vs_wsgi), then drives the
+read endpoints in-process through the test client, alternating rounds with
+the middleware and query recorder installed and removed so that both
+configurations see the same machine noise. Reports the median time per
+request and the relative overhead, which should stay under 2%.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.asgi_vs_wsgi import ENDPOINTS, issue_token, seed
+from benchmarks.utils import print_table, setup_django
+
+MIDDLEWARE = 'backend.middleware.RequestMetricsMiddleware'
+
+
+def run_round(requests, token, enabled):
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client, override_settings
+    from backend.metrics import record_query
+
+    middleware = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+    if enabled:
+        middleware.insert(0, MIDDLEWARE)
+
+    connection.ensure_connection()
+    if not enabled:
+        connection.execute_wrappers.remove(record_query)
+    try:
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            client.get(ENDPOINTS[0])
+            started = time.perf_counter()
+            for i in range(requests):
+                client.get(ENDPOINTS[i % len(ENDPOINTS)])
+            return (time.perf_counter() - started) / requests
+    finally:
+        if not enabled:
+            connection.execute_wrappers.append(record_query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--db', default='/tmp/ems_bench_metrics_overhead.sqlite3')
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+    if fresh:
+        seed()
+    token = issue_token()
+
+    timings = {False: [], True: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            timings[enabled].append(run_round(args.requests, token, enabled))
+
+    baseline = statistics.median(timings[False])
+    measured = statistics.median(timings[True])
+    print_table(
+        [
+            ['off', f'{baseline * 1000:.3f} ms', ''],
+            ['on', f'{measured * 1000:.3f} ms', f'{(measured - baseline) / baseline:+.2%}'],
+        ],
+        ['metrics', 'per request', 'overhead'],
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+# Settings for servers started by the benchmarks: the project settings with
+# the database pointed at the benchmark's scratch file.
+import os
+
+from event_management.settings import *  # noqa: F401,F403
+
+DATABASES['default']['NAME'] = os.environ['EMS_BENCH_DB']  # noqa: F405
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
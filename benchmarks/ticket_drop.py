@@ -0,0 +1,125 @@
+"""A "ticket drop": many buyers racing for the seats of one event.
+
+    python -m benchmarks.ticket_drop --capacity 1000 --buyers 5000 --threads 32
+
+Seeds a scratch SQLite database with one ticketed event and --buyers funded
+customers, then has --threads workers push every buyer through
+events.ticketing.purchase_ticket as fast as they can. Reports attempts per
+second before and after the event sells out, and fails unless exactly
+--capacity tickets were sold, the event's counter agrees, and the buyers were
+charged for exactly those tickets.
+"""
+import argparse
+import datetime
+import queue
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.utils import print_table, setup_django
+
+PRICE = Decimal('15.00')
+
+
+def seed(capacity, buyers):
+    from django.contrib.auth.models import User
+    from backend.models import Category, Event, Wallet
+
+    organizer = User.objects.create_user(username='organizer', password='bench')
+    event = Event.objects.create(
+        user=organizer, category=Category.objects.create(name='Concert'), name='Drop', location='Arena',
+        capacity=capacity, ticket_price=PRICE, date=datetime.date(2030, 6, 1),
+        start_time=datetime.time(20), end_time=datetime.time(23),
+    )
+    User.objects.bulk_create([User(username=f'buyer{i}') for i in range(buyers)])
+    users = list(User.objects.filter(username__startswith='buyer'))
+    Wallet.objects.bulk_create([Wallet(customer=user, balance=Decimal('100.00')) for user in users])
+    return event, users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--capacity', type=int, default=1000)
+    parser.add_argument('--buyers', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--db', default='/tmp/ems_bench_ticket_drop.sqlite3')
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(args.db + suffix).unlink(missing_ok=True)
+    setup_django(args.db)
+
+    from django.db import close_old_connections, connection
+    from backend.models import Event, Ticket, Wallet
+    from events import ticketing
+
+    event, buyers = seed(args.capacity, args.buyers)
+    pending = queue.Queue()
+    for buyer in buyers:
+        pending.put(buyer)
+
+    lock = threading.Lock()
+    outcomes = {'sold': [], 'sold_out': [], 'error': []}
+    start_barrier = threading.Barrier(args.threads + 1)
+
+    def worker():
+        start_barrier.wait()
+        try:
+            while True:
+                try:
+                    buyer = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    ticketing.purchase_ticket(Event.objects.get(pk=event.pk), buyer)
+                    outcome = 'sold'
+                except ticketing.SoldOut:
+                    outcome = 'sold_out'
+                except Exception as exc:
+                    outcome = 'error'
+                    print(f'{buyer.username}: {exc!r}')
+                with lock:
+                    outcomes[outcome].append(time.perf_counter())
+        finally:
+            close_old_connections()
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    finished = time.perf_counter()
+
+    # Attempts answered after the last sale only had to read the event
+    sold_out_at = max(outcomes['sold'], default=started)
+    turned_away_after = sum(1 for at in outcomes['sold_out'] if at > sold_out_at)
+    phases = [
+        ('selling', args.buyers - turned_away_after, sold_out_at - started),
+        ('sold out', turned_away_after, finished - sold_out_at),
+        ('total', args.buyers, finished - started),
+    ]
+    rows = [[name, attempts, f'{elapsed:.2f} s', f'{attempts / max(elapsed, 1e-9):.0f}'] for name, attempts, elapsed in phases]
+    print_table(rows, ['phase', 'attempts', 'time', 'attempts/s'])
+
+    event.refresh_from_db()
+    tickets = Ticket.objects.filter(event=event, status='active').count()
+    spent = sum(Decimal('100.00') - balance for balance in Wallet.objects.filter(customer__in=buyers).values_list('balance', flat=True))
+    print(
+        f"\nsold {len(outcomes['sold'])}, turned away {len(outcomes['sold_out'])}, errors {len(outcomes['error'])}; "
+        f"tickets {tickets}, counter {event.tickets_sold}, charged {spent}"
+    )
+    consistent = (
+        tickets == event.tickets_sold == len(outcomes['sold']) == min(args.capacity, args.buyers)
+        and spent == tickets * PRICE and not outcomes['error']
+    )
+    print(f'oversold: {max(max(tickets, event.tickets_sold) - args.capacity, 0)}')
+    if not consistent:
+        raise SystemExit('ticket counts or charges do not agree')
+
+
+if __name__ == '__main__':
+    main()
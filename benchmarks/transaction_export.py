@@ -0,0 +1,88 @@
+"""Time and peak Python memory of the streaming transaction log export.
+
+    python -m benchmarks.transaction_export --rows 1000000
+
+Seeds a scratch SQLite database (reused on later runs) with transaction log
+rows, then consumes /api/wallets/transactions/export/ for growing slices of
+the ledger. Peak memory should stay flat as the row count grows.
+"""
+import argparse
+import datetime
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.utils import print_table, setup_django
+
+
+def seed(rows, customers=5000, batch_size=50000):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from backend.models import TransactionLog
+
+    rng = random.Random(3)
+    users = User.objects.bulk_create([User(username=f'bench{i}') for i in range(customers)])
+    started = timezone.now() - datetime.timedelta(days=365)
+
+    for offset in range(0, rows, batch_size):
+        batch = TransactionLog.objects.bulk_create([
+            TransactionLog(
+                customer=rng.choice(users),
+                amount=rng.randrange(100, 100000) / 100,
+                transaction_type=rng.choice(['deposit', 'purchase', 'refund']),
+                description='Bench transaction',
+            )
+            for _ in range(min(batch_size, rows - offset))
+        ])
+        # auto_now_add ignores explicit values, so spread the timestamps afterwards
+        started += datetime.timedelta(days=365) * len(batch) / rows
+        TransactionLog.objects.filter(id__gte=batch[0].id, id__lte=batch[-1].id).update(timestamp=started)
+        print(f'seeded {offset + len(batch)} rows', end='\r', flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--db', default='/tmp/ems_bench_transaction_export.sqlite3')
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from wallets.views import exportTransactionLogs
+
+    if fresh:
+        seed(args.rows)
+
+    admin, _ = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True})
+    factory = APIRequestFactory()
+    today = timezone.localdate()
+
+    rows = []
+    for days in (30, 120, 365):
+        request = factory.get('/api/wallets/transactions/export/', {'date_from': today - datetime.timedelta(days=days)})
+        force_authenticate(request, user=admin)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = exportTransactionLogs(request)
+        size = lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        rows.append([f'last {days} days', lines - 1, f'{size / 2**20:.1f} MiB', f'{elapsed:.2f} s', f'{peak / 2**20:.1f} MiB'])
+
+    print_table(rows, ['range', 'rows', 'output', 'time', 'peak memory'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Promoting a large waitlist when an event gains seats.
+
+    python -m benchmarks.waitlist_promotion --entries 1000
+
+Seeds a scratch SQLite database with a sold-out event whose waitlist holds
+--entries funded customers, raises the capacity by that much and times
+events.ticketing.promote_waitlist. For comparison, the same customers are
+then pushed one by one through purchase_ticket on a second event, the way
+promotion would work without the batch path (one transaction each).
+"""
+import argparse
+import datetime
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.utils import print_table, setup_django
+
+PRICE = Decimal('15.00')
+
+
+def seed(entries):
+    from django.contrib.auth.models import User
+    from backend.models import Category, Event, WaitlistEntry, Wallet
+
+    organizer = User.objects.create_user(username='organizer', password='bench')
+    category = Category.objects.create(name='Concert')
+    events = [
+        Event.objects.create(
+            user=organizer, category=category, name=f'Show {i}', location='Arena', capacity=0, ticket_price=PRICE,
+            date=datetime.date(2030, 6, 1), start_time=datetime.time(20), end_time=datetime.time(23),
+        )
+        for i in range(2)
+    ]
+    User.objects.bulk_create([User(username=f'fan{i}') for i in range(entries)])
+    fans = list(User.objects.filter(username__startswith='fan').order_by('id'))
+    Wallet.objects.bulk_create([Wallet(customer=fan, balance=Decimal('100.00')) for fan in fans])
+    WaitlistEntry.objects.bulk_create([WaitlistEntry(event=events[0], attendee=fan) for fan in fans])
+    return events, fans
+
+
+def count_statements(func):
+    from django.db import connection
+
+    statements = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal statements
+        statements += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+    return result, statements, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--db', default='/tmp/ems_bench_waitlist_promotion.sqlite3')
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        Path(args.db + suffix).unlink(missing_ok=True)
+    setup_django(args.db)
+
+    from backend.models import Event, Ticket
+    from events import ticketing
+
+    (batched, one_by_one), fans = seed(args.entries)
+    Event.objects.filter(pk__in=[batched.pk, one_by_one.pk]).update(capacity=args.entries)
+
+    promoted, batched_queries, batched_time = count_statements(lambda: ticketing.promote_waitlist(batched))
+
+    def buy_one_by_one():
+        for fan in fans:
+            ticketing.purchase_ticket(Event.objects.get(pk=one_by_one.pk), fan)
+
+    _, single_queries, single_time = count_statements(buy_one_by_one)
+
+    print_table(
+        [
+            ['promote_waitlist (one transaction)', promoted, batched_queries, f'{batched_time * 1000:.0f} ms'],
+            ['purchase_ticket per entry', args.entries, single_queries, f'{single_time * 1000:.0f} ms'],
+        ],
+        ['path', 'tickets', 'queries', 'time'],
+    )
+
+    batched.refresh_from_db()
+    tickets = Ticket.objects.filter(event=batched, status='active').count()
+    if not promoted == tickets == batched.tickets_sold == args.entries:
+        raise SystemExit(f'expected {args.entries} promotions, got {promoted} (tickets {tickets}, counter {batched.tickets_sold})')
+
+
+if __name__ == '__main__':
+    main()
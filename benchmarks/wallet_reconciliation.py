@@ -0,0 +1,57 @@
+"""Cost of the incremental wallet reconciliation as the ledger grows.
+
+    python -m benchmarks.wallet_reconciliation --rows 1000000
+
+Seeds a scratch SQLite database with transaction log rows (see
+benchmarks.transaction_export), takes the baseline snapshot, then times
+runs that follow a fixed amount of new activity. Those runs should cost the
+same however large the history is.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from benchmarks.transaction_export import seed
+from benchmarks.utils import print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--new-rows', type=int, default=1000)
+    parser.add_argument('--db', default='/tmp/ems_bench_wallet_reconciliation.sqlite3')
+    args = parser.parse_args()
+
+    fresh = not Path(args.db).exists()
+    setup_django(args.db)
+
+    from django.contrib.auth.models import User
+    from backend.models import TransactionLog, WalletSnapshot
+    from wallets import services
+    from wallets.reconciliation import reconcile
+
+    if fresh:
+        seed(args.rows)
+
+    rows = []
+    if not WalletSnapshot.objects.exists():
+        started = time.perf_counter()
+        reconcile(settle_seconds=0)
+        rows.append(['baseline (whole ledger)', TransactionLog.objects.count(), f'{time.perf_counter() - started:.2f} s'])
+
+    rng = random.Random()
+    customers = list(User.objects.filter(username__startswith='bench')[:500])
+    for _ in range(3):
+        for _ in range(args.new_rows):
+            services.credit(rng.choice(customers), Decimal('1.00'))
+        started = time.perf_counter()
+        reconcile(settle_seconds=0)
+        rows.append([f'after {args.new_rows} new rows', TransactionLog.objects.count(), f'{time.perf_counter() - started:.3f} s'])
+
+    print_table(rows, ['run', 'ledger rows', 'time'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+from rest_framework.permissions import AllowAny
+from backend.async_api import async_api_view
+from backend.caching import acached_catalog_response
+from backend.models import Category
+from .serializers import CategorySerializer
+
+
+# List all categories (Accessible to all users)
+@async_api_view(['GET'], permission_classes=[AllowAny])
+async def list_categories(request):
+    async def payload():
+        return CategorySerializer([category async for category in Category.objects.all()], many=True).data
+
+    return await acached_catalog_response(request, 'categories', payload)
@@ -1,3 +1,56 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from backend.models import Category
 
-# Create your tests here.
+
+class CategoryListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name='Concert')
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+
+    def test_cache_hit_skips_the_database(self):
+        self.client.get(reverse('list_categories'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list_categories'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.json()[0]['name'], 'Concert')
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get(reverse('list_categories'))['ETag']
+        response = self.client.get(reverse('list_categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_the_cached_listing(self):
+        etag = self.client.get(reverse('list_categories'))['ETag']
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_category'), {'name': 'Workshop'})
+
+        response = self.client.get(reverse('list_categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()], ['Concert', 'Workshop'])
+
+    # The version token lives in the database, so a bump from another process,
+    # whose cache this one cannot see, shows once the local token expires
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_imports_from_another_process_invalidate_the_listing(self):
+        etag = self.client.get(reverse('list_categories'))['ETag']
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as upload:
+            upload.write('name,description\nWorkshop,Hands-on\n')
+            upload.flush()
+            with mock.patch.object(cache, 'set'), mock.patch.object(cache, 'delete'), self.captureOnCommitCallbacks(execute=True):
+                call_command('import_catalog', 'categories', upload.name, stdout=open('/dev/null', 'w'))
+
+        response = self.client.get(reverse('list_categories'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()], ['Concert', 'Workshop'])
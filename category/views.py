@@ -1,9 +1,12 @@
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from backend.models import Category
 from users.authentication import BearerTokenAuthentication
+from backend.caching import bump_catalog_version, cached_catalog_response
+from backend.bulk import CONTENT_TYPES, FORMAT_PARAM, FORMATS, export_fields, guess_format, import_records, iter_records, stream_records
 from .serializers import CategorySerializer
 
 
@@ -15,6 +18,7 @@ def create_category(request):
     serializer = CategorySerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_catalog_version('categories')
         return Response({"detail": "Category created successfully."}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -32,6 +36,7 @@ def update_category(request, pk):
     serializer = CategorySerializer(category, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        bump_catalog_version('categories')
         return Response({"detail": "Category updated successfully."}, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -47,6 +52,7 @@ def delete_category(request, pk):
         return Response({'detail': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
 
     category.delete()
+    bump_catalog_version('categories')
     return Response({'detail': 'Category deleted successfully.'}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -55,7 +61,41 @@ def delete_category(request, pk):
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([AllowAny])
 def list_categories(request):
-    categories = Category.objects.all()
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    return cached_catalog_response(
+        request, 'categories', lambda: CategorySerializer(Category.objects.all(), many=True).data
+    )
 
+
+# Bulk create/update categories from a CSV or JSON Lines upload (Admin only)
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def import_categories(request):
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': 'A CSV or JSON Lines file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    file_format = request.data.get(FORMAT_PARAM) or guess_format(upload.name)
+    if file_format not in FORMATS:
+        return Response({'detail': f"Unsupported file format: {file_format}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = import_records(iter_records(upload.file, file_format), CategorySerializer)
+    if result['imported']:
+        bump_catalog_version('categories')
+    return Response(result, status=status.HTTP_200_OK)
+
+
+# Export all categories as CSV or JSON Lines (Admin only)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def export_categories(request):
+    file_format = request.query_params.get(FORMAT_PARAM, 'csv')
+    if file_format not in FORMATS:
+        return Response({'detail': f"Unsupported file format: {file_format}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = export_fields(Category)
+    rows = Category.objects.order_by('id').values(*fields).iterator(chunk_size=2000)
+    response = StreamingHttpResponse(stream_records(rows, fields, file_format), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="categories.{file_format}"'
+    return response
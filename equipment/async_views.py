@@ -0,0 +1,14 @@
+from rest_framework.permissions import AllowAny
+from backend.async_api import async_api_view
+from backend.caching import acached_catalog_response
+from backend.models import Equipment
+from .serializers import EquipmentSerializer
+
+
+# List all equipment (Accessible to all users)
+@async_api_view(['GET'], permission_classes=[AllowAny])
+async def list_equipment(request):
+    async def payload():
+        return EquipmentSerializer([item async for item in Equipment.objects.all()], many=True).data
+
+    return await acached_catalog_response(request, 'equipment', payload)
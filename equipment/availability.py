@@ -0,0 +1,137 @@
+import datetime
+from collections import Counter
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from backend.models import Equipment, EquipmentOccupancy
+
+# Occupancy is kept per equipment item, day and slot of SLOT_MINUTES. Event
+# times are on the slot grid (see validate_slot_time), so a booking reserves
+# exactly the slots its window covers: windows that only meet at a boundary
+# (10:00-10:20, 10:20-10:40) do not compete for units, overlapping ones do.
+SLOT_MINUTES = 5
+SLOT_SECONDS = SLOT_MINUTES * 60
+
+
+class InsufficientStock(serializers.ValidationError):
+    def __init__(self, equipment_ids):
+        super().__init__(
+            {'equipment': f"Not enough units free in this time window for equipment: {', '.join(map(str, equipment_ids))}."}
+        )
+        self.equipment_ids = equipment_ids
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def validate_slot_time(value):
+    if value.second or value.microsecond or value.minute % SLOT_MINUTES:
+        raise serializers.ValidationError(f"Must be on a {SLOT_MINUTES}-minute boundary.")
+
+
+# The slots a window touches, as a half-open range of slot numbers. Windows
+# that do not start or end on a slot boundary, such as availability queries
+# or the whole day, are widened to one; since bookings cover whole slots,
+# that does not change which bookings they overlap.
+def slot_range(start_time=None, end_time=None):
+    first = _seconds(start_time or datetime.time.min) // SLOT_SECONDS
+    last = -(-_seconds(end_time or datetime.time.max) // SLOT_SECONDS)
+    return first, max(last, first + 1)
+
+
+# Reserved units per (equipment_id, date, slot) for (equipment_id, date,
+# start_time, end_time, quantity) booking tuples; used to rebuild the table
+def occupancy_from_bookings(bookings):
+    occupancy = Counter()
+    for equipment_id, date, start_time, end_time, quantity in bookings:
+        for slot in range(*slot_range(start_time, end_time)):
+            occupancy[equipment_id, date, slot] += quantity
+    return occupancy
+
+
+def _window(date, start_time, end_time):
+    first, last = slot_range(start_time, end_time)
+    return EquipmentOccupancy.objects.filter(date=date, slot__gte=first, slot__lt=last)
+
+
+def _by_quantity(units):
+    groups = {}
+    for equipment_id, quantity in Counter(units).items():
+        if quantity:
+            groups.setdefault(quantity, []).append(equipment_id)
+    return groups
+
+
+# Equipment with units left in the window (the whole day when no times are
+# given), each with the number of free units set as item.available. The peak
+# per item is one grouped range read of that day's occupancy rows; bookings
+# are not read.
+def available_equipment(date, start_time=None, end_time=None):
+    peaks = dict(
+        _window(date, start_time, end_time).values('equipment_id').annotate(peak=Max('reserved'))
+        .values_list('equipment_id', 'peak')
+    )
+    available = []
+    for item in Equipment.objects.all():
+        item.available = item.stock - peaks.get(item.id, 0)
+        if item.available > 0:
+            available.append(item)
+    return available
+
+
+# Reserves units (equipment id -> number of units, or ids repeated) for the
+# window. Items booked in the same number of units share one conditional
+# UPDATE of their slots, which only applies where reserved + units stays
+# within stock; if any slot is short, the whole reservation is undone and
+# InsufficientStock names the items that did not fit.
+def reserve(units, date, start_time, end_time):
+    groups = _by_quantity(units)
+    if not groups:
+        return
+
+    slots = range(*slot_range(start_time, end_time))
+    EquipmentOccupancy.objects.bulk_create(
+        [
+            EquipmentOccupancy(equipment_id=equipment_id, date=date, slot=slot)
+            for ids in groups.values() for equipment_id in ids for slot in slots
+        ],
+        ignore_conflicts=True,
+    )
+    stock = Equipment.objects.filter(pk=OuterRef('equipment_id')).values('stock')
+
+    try:
+        with transaction.atomic():
+            for quantity, ids in groups.items():
+                window = _window(date, start_time, end_time).filter(equipment_id__in=ids)
+                updated = window.filter(reserved__lte=Subquery(stock) - quantity).update(reserved=F('reserved') + quantity)
+                if updated < len(ids) * len(slots):
+                    raise InsufficientStock([])
+    except InsufficientStock:
+        short = set()
+        for quantity, ids in groups.items():
+            window = _window(date, start_time, end_time).filter(equipment_id__in=ids)
+            short.update(window.filter(reserved__gt=Subquery(stock) - quantity).values_list('equipment_id', flat=True))
+        raise InsufficientStock(sorted(short))
+
+
+def release(units, date, start_time, end_time):
+    for quantity, ids in _by_quantity(units).items():
+        _window(date, start_time, end_time).filter(equipment_id__in=ids).update(reserved=F('reserved') - quantity)
+
+
+# Peak units reserved for the item on any slot from the given day on
+def peak_reserved(equipment, since):
+    return EquipmentOccupancy.objects.filter(equipment=equipment, date__gte=since).aggregate(
+        peak=Coalesce(Max('reserved'), 0)
+    )['peak']
+
+
+# Peak units reserved per item id on any slot from the given day on, in one
+# grouped query; items with nothing reserved are left out
+def peak_reserved_by_item(equipment_ids, since):
+    return dict(
+        EquipmentOccupancy.objects.filter(equipment_id__in=equipment_ids, date__gte=since)
+        .values('equipment_id').annotate(peak=Max('reserved')).values_list('equipment_id', 'peak')
+    )
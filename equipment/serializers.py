@@ -1,7 +1,44 @@
+from django.utils import timezone
 from rest_framework import serializers
 from backend.models import Equipment
+from .availability import peak_reserved, peak_reserved_by_item
 
 class EquipmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Equipment
         fields = '__all__'
+
+    def validate_stock(self, value):
+        if self.instance is not None and value < self.instance.stock:
+            reserved = self.reserved_units()
+            if value < reserved:
+                raise serializers.ValidationError(f"Cannot be lower than the {reserved} units already reserved.")
+        return value
+
+    # Imports load the reserved units of a whole chunk in one query, see
+    # import_context
+    def reserved_units(self):
+        if 'reserved' in self.context:
+            return self.context['reserved'].get(self.instance.pk, 0)
+        return peak_reserved(self.instance, timezone.localdate())
+
+    @classmethod
+    def import_context(cls, ids):
+        return {'reserved': peak_reserved_by_item(ids, timezone.localdate())}
+
+
+class AvailableEquipmentSerializer(EquipmentSerializer):
+    # Units free for the whole of the requested window
+    available = serializers.IntegerField(read_only=True)
+
+
+# Without times the whole day is checked
+class AvailabilityQuerySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+
+    def validate(self, attrs):
+        if 'start_time' in attrs and 'end_time' in attrs and attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError({'end_time': 'Must be later than start_time.'})
+        return attrs
@@ -1,3 +1,95 @@
-from django.test import TestCase
+import datetime
+import json
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from backend.models import Equipment, EquipmentOccupancy
 
-# Create your tests here.
+
+class EquipmentBulkTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.speaker = Equipment.objects.create(name='Speaker', type='audio', rental_price=20)
+
+    def upload(self, name, content, **extra):
+        data = {'file': SimpleUploadedFile(name, content.encode()), **extra}
+        return self.client.post(reverse('import_equipment'), data, format='multipart')
+
+    def test_csv_import_creates_and_updates_rows(self):
+        content = (
+            'id,name,type,rental_price\n'
+            f'{self.speaker.id},Speaker XL,audio,35.00\n'
+            ',Projector,video,50.00\n'
+            ',Broken,video,not-a-price\n'
+        )
+        response = self.upload('equipment.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 4)
+        self.speaker.refresh_from_db()
+        self.assertEqual(self.speaker.name, 'Speaker XL')
+        self.assertTrue(Equipment.objects.filter(name='Projector').exists())
+
+    def test_import_cannot_drop_stock_below_reserved_units(self):
+        Equipment.objects.filter(pk=self.speaker.pk).update(stock=4)
+        EquipmentOccupancy.objects.create(
+            equipment=self.speaker, date=datetime.date.today() + datetime.timedelta(days=7), slot=40, reserved=3
+        )
+        content = (
+            'id,name,type,rental_price,stock\n'
+            f'{self.speaker.id},Speaker,audio,20.00,1\n'
+        )
+        response = self.upload('equipment.csv', content)
+
+        self.assertEqual(response.data['imported'], 0)
+        self.assertIn('3 units', str(response.data['errors'][0]['errors']['stock']))
+
+        response = self.upload('equipment.csv', content.replace(',1\n', ',3\n'))
+        self.assertEqual(response.data['imported'], 1)
+        self.speaker.refresh_from_db()
+        self.assertEqual(self.speaker.stock, 3)
+
+    def test_import_only_updates_the_columns_it_carries(self):
+        Equipment.objects.filter(pk=self.speaker.pk).update(stock=10, description='Two-way, 300 W')
+        response = self.upload('equipment.csv', f'id,rental_price\n{self.speaker.id},25.00\n')
+
+        self.assertEqual(response.data['imported'], 1)
+        self.speaker.refresh_from_db()
+        self.assertEqual(
+            (self.speaker.name, self.speaker.stock, self.speaker.description, self.speaker.rental_price),
+            ('Speaker', 10, 'Two-way, 300 W', Decimal('25.00')),
+        )
+
+    def test_import_rejects_ids_of_rows_that_do_not_exist(self):
+        content = 'id,name,type,rental_price\n' + ''.join(f'{record_id},Ghost,audio,1.00\n' for record_id in (-5, 0, 99999))
+        response = self.upload('equipment.csv', content)
+
+        self.assertEqual((response.data['imported'], response.data['error_count']), (0, 3))
+        response = self.upload('upload.jsonl', '{"id": 0, "name": "Ghost", "type": "audio", "rental_price": "1.00"}\n')
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(Equipment.objects.count(), 1)
+
+    def test_jsonl_import_reports_malformed_lines(self):
+        content = '{"name": "Mixer", "type": "audio", "rental_price": "15.00"}\n{not json}\n'
+        response = self.upload('upload.txt', content, file_format='jsonl')
+
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+
+    def test_export_streams_every_row(self):
+        Equipment.objects.create(name='Mixer', type='audio', rental_price=15)
+        response = self.client.get(reverse('export_equipment'), {'file_format': 'jsonl'})
+
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Speaker', 'Mixer'])
+
+    def test_import_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='pass'))
+        response = self.upload('equipment.csv', 'name,type,rental_price\n')
+        self.assertEqual(response.status_code, 403)
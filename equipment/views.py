@@ -1,10 +1,15 @@
+from django.db.models import ProtectedError
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from backend.models import Equipment
-from .serializers import EquipmentSerializer
+from .serializers import EquipmentSerializer, AvailableEquipmentSerializer, AvailabilityQuerySerializer
+from .availability import available_equipment
 from users.authentication import BearerTokenAuthentication
+from backend.caching import bump_catalog_version, cached_catalog_response
+from backend.bulk import CONTENT_TYPES, FORMAT_PARAM, FORMATS, export_fields, guess_format, import_records, iter_records, stream_records
 
 
 # Create equipment (Admin only)
@@ -15,6 +20,7 @@ def create_equipment(request):
     serializer = EquipmentSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_catalog_version('equipment')
         return Response({"detail": "Equipment created successfully."}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -32,6 +38,7 @@ def update_equipment(request, pk):
     serializer = EquipmentSerializer(equipment, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        bump_catalog_version('equipment')
         return Response({"detail": "Equipment updated successfully."}, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -46,7 +53,11 @@ def delete_equipment(request, pk):
     except Equipment.DoesNotExist:
         return Response({'detail': 'Equipment not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-    equipment.delete()
+    try:
+        equipment.delete()
+    except ProtectedError:
+        return Response({'detail': 'Equipment is booked by one or more events and cannot be deleted.'}, status=status.HTTP_409_CONFLICT)
+    bump_catalog_version('equipment')
     return Response({'detail': 'Equipment deleted successfully.'}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -55,7 +66,56 @@ def delete_equipment(request, pk):
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([AllowAny])
 def list_equipment(request):
-    equipment = Equipment.objects.all()
-    serializer = EquipmentSerializer(equipment, many=True)
+    return cached_catalog_response(
+        request, 'equipment', lambda: EquipmentSerializer(Equipment.objects.all(), many=True).data
+    )
+
+
+# List equipment with units free in a time window or on a day, and how many
+# (Accessible to all users)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([AllowAny])
+def list_available_equipment(request):
+    query = AvailabilityQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    equipment = available_equipment(**query.validated_data)
+    serializer = AvailableEquipmentSerializer(equipment, many=True)
     return Response(serializer.data)
 
+
+# Bulk create/update equipment from a CSV or JSON Lines upload (Admin only)
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def import_equipment(request):
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': 'A CSV or JSON Lines file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    file_format = request.data.get(FORMAT_PARAM) or guess_format(upload.name)
+    if file_format not in FORMATS:
+        return Response({'detail': f"Unsupported file format: {file_format}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = import_records(iter_records(upload.file, file_format), EquipmentSerializer)
+    if result['imported']:
+        bump_catalog_version('equipment')
+    return Response(result, status=status.HTTP_200_OK)
+
+
+# Export all equipment as CSV or JSON Lines (Admin only)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def export_equipment(request):
+    file_format = request.query_params.get(FORMAT_PARAM, 'csv')
+    if file_format not in FORMATS:
+        return Response({'detail': f"Unsupported file format: {file_format}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = export_fields(Equipment)
+    rows = Equipment.objects.order_by('id').values(*fields).iterator(chunk_size=2000)
+    response = StreamingHttpResponse(stream_records(rows, fields, file_format), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="equipment.{file_format}"'
+    return response
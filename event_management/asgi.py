@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'event_management.urls_async')
 
 application = get_asgi_application()
@@ -0,0 +1,70 @@
+"""
+Database settings profiles, selected with the DJANGO_DB_PROFILE environment
+variable:
+
+sqlite (default)
+    A local SQLite file (DB_NAME, default db.sqlite3 in the project root).
+    backend.db applies SQLITE_PRAGMAS to every new connection; run
+    `manage.py enable_wal` once to switch the file to WAL.
+
+postgres
+    PostgreSQL at DB_HOST/DB_PORT with DB_NAME, DB_USER and DB_PASSWORD.
+    Connections persist for DB_CONN_MAX_AGE seconds (default 60), or, with
+    DB_POOL=1, come from a psycopg connection pool sized by DB_POOL_MIN_SIZE
+    and DB_POOL_MAX_SIZE (needs psycopg[pool]). Django does not allow both at
+    once, so pooling forces CONN_MAX_AGE to 0.
+"""
+import os
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_flag(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_profile(base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', base_dir / 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction begins. A deferred
+            # transaction that reads before it writes cannot wait for the lock
+            # and fails with "database is locked" under concurrent writers.
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # File-backed so the concurrency tests run against real SQLite locking;
+        # in-memory shared-cache databases fail fast instead of waiting.
+        'TEST': {
+            'NAME': base_dir / 'test_db.sqlite3',
+        },
+    }
+
+
+def postgres_profile():
+    pooled = env_flag('DB_POOL')
+    options = {}
+    if pooled:
+        options['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'ems'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': 0 if pooled else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': not pooled,
+        'OPTIONS': options,
+    }
+
+
+def database_profile(base_dir):
+    profile = os.environ.get('DJANGO_DB_PROFILE', 'sqlite')
+    if profile == 'sqlite':
+        return sqlite_profile(base_dir)
+    if profile == 'postgres':
+        return postgres_profile()
+    raise ImproperlyConfigured(f"Unknown DJANGO_DB_PROFILE: {profile!r} (expected 'sqlite' or 'postgres').")
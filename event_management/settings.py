@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
+from .db_profiles import database_profile, env_flag
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,11 +52,13 @@ INSTALLED_APPS = [
     'equipment',
     'wallets',
     'events',
+    'reports',
     
 
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,7 +72,9 @@ MIDDLEWARE = [
 
 ]
 
-ROOT_URLCONF = 'event_management.urls'
+# asgi.py points this at event_management.urls_async, which serves the
+# read endpoints with async views
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'event_management.urls')
 
 TEMPLATES = [
     {
@@ -93,10 +99,18 @@ WSGI_APPLICATION = 'event_management.wsgi.application'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_profile(BASE_DIR),
+}
+
+# Applied to every new SQLite connection by backend.db. WAL, which lets
+# readers run alongside a writer, is stored in the database file instead and
+# is switched on once per deployment with `manage.py enable_wal`; with it,
+# synchronous=NORMAL only syncs at checkpoints. busy_timeout (ms) is how long
+# a writer waits for the lock before failing.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -151,6 +165,51 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Default and maximum page sizes for the cursor-paginated list endpoints
+API_PAGE_SIZE = 50
+
+API_MAX_PAGE_SIZE = 200
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Lifetime (seconds) of cached catalog payloads, and how long a process reuses
+# a catalog's version token before reading it from the database again, which
+# is the longest it can serve a catalog another process has changed.
+CATALOG_CACHE_TIMEOUT = 300
+
+CATALOG_VERSION_TTL = 5
+
+# Bearer token lifetime, and how often (at most) a token's last_used timestamp
+# is written back while it is in use; both in seconds.
+AUTH_TOKEN_TTL = 36000
+
+AUTH_TOKEN_LAST_USED_INTERVAL = 300
+
+# Bearer token authentication cache (see users.token_cache). BACKEND is the
+# alias of a Django cache shared between workers, or None for in-process only.
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'BACKEND': None,
+}
+
+# Per-request metrics (backend.middleware.RequestMetricsMiddleware). With
+# SERVER_TIMING the timings are also returned in a Server-Timing header.
+METRICS = {
+    'SERVER_TIMING': env_flag('METRICS_SERVER_TIMING'),
+}
+
+# How long (seconds) a completed Idempotency-Key response is replayed, and
+# after how long a request that never finished stops blocking retries.
+IDEMPOTENCY_KEY_TTL = 86400
+
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = 60
+
 
 CORS_ALLOW_ALL_ORIGINS = True
 
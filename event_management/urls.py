@@ -1,14 +1,17 @@
 from django.contrib import admin
 from django.urls import path
 from users.views import userRegistration, userAuthTokenLogin, userLogout, updateUserInfo, passwordResetRequest, passwordResetCodeCheck, passwordResetConfirm, myDetails
-from category.views import create_category, update_category, delete_category, list_categories
-from equipment.views import create_equipment, update_equipment, delete_equipment, list_equipment
-from wallets.views import myTransactionLog, viewWallet, addFunds
-from events.views import list_all_events, list_my_events, create_event, update_event, cancel_event
+from category.views import create_category, update_category, delete_category, list_categories, import_categories, export_categories
+from equipment.views import create_equipment, update_equipment, delete_equipment, list_equipment, list_available_equipment, import_equipment, export_equipment
+from wallets.views import myTransactionLog, viewWallet, addFunds, exportTransactionLogs
+from reports.views import revenue_report, refund_rate_report, top_equipment_report, capacity_report
+from backend.views import metrics
+from events.views import list_all_events, list_my_events, create_event, update_event, cancel_event, register_for_event, cancel_ticket, list_my_tickets, leave_waitlist, set_waitlist_priority
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics, name='metrics'),
 
     #User Management APIs:
     path('api/register/', userRegistration, name='register'),
@@ -25,12 +28,17 @@ urlpatterns = [
     path('api/categories/update/<int:pk>/', update_category, name='update_category'),
     path('api/categories/delete/<int:pk>/', delete_category, name='delete_category'),
     path('api/categories/list/', list_categories, name='list_categories'),
+    path('api/categories/import/', import_categories, name='import_categories'),
+    path('api/categories/export/', export_categories, name='export_categories'),
 
     #Equipment Management APIs:
     path('api/equipment/create/', create_equipment, name='create_equipment'),
     path('api/equipment/update/<int:pk>/', update_equipment, name='update_equipment'),
     path('api/equipment/delete/<int:pk>/', delete_equipment, name='delete_equipment'),
     path('api/equipment/list/', list_equipment, name='list_equipment'),    
+    path('api/equipment/available/', list_available_equipment, name='list_available_equipment'),
+    path('api/equipment/import/', import_equipment, name='import_equipment'),
+    path('api/equipment/export/', export_equipment, name='export_equipment'),
 
     #Events APIs:
     path('api/events/create/', create_event, name='create_event'),
@@ -39,10 +47,24 @@ urlpatterns = [
     path('api/events/list/', list_all_events, name='list_all_events'),
     path('api/events/my-events/', list_my_events, name='list_my_events'),
 
+    #Ticketing APIs:
+    path('api/events/register/<int:pk>/', register_for_event, name='register_for_event'),
+    path('api/tickets/cancel/<int:pk>/', cancel_ticket, name='cancel_ticket'),
+    path('api/tickets/my-tickets/', list_my_tickets, name='list_my_tickets'),
+    path('api/waitlist/leave/<int:pk>/', leave_waitlist, name='leave_waitlist'),
+    path('api/waitlist/priority/<int:pk>/', set_waitlist_priority, name='set_waitlist_priority'),
+
     #Wallet APIs:
     path('api/wallets/my-wallet/', viewWallet, name='viewWallet'),
     path('api/wallets/add-funds/', addFunds, name='addFunds'),
     path('api/wallets/my-transactions/', myTransactionLog, name='myTransactions'),
+    path('api/wallets/transactions/export/', exportTransactionLogs, name='exportTransactionLogs'),
+
+    #Reporting APIs:
+    path('api/reports/revenue/', revenue_report, name='revenue_report'),
+    path('api/reports/refund-rate/', refund_rate_report, name='refund_rate_report'),
+    path('api/reports/top-equipment/', top_equipment_report, name='top_equipment_report'),
+    path('api/reports/capacity/', capacity_report, name='capacity_report'),
 
 
 ]
@@ -0,0 +1,24 @@
+"""
+URL configuration for the ASGI deployment.
+
+The read-heavy endpoints are served by native async views at the same paths
+and names; every other route falls through to event_management.urls.
+asgi.py selects this module through the DJANGO_ROOT_URLCONF variable.
+"""
+from django.urls import path
+from category import async_views as category_views
+from equipment import async_views as equipment_views
+from users import async_views as users_views
+from wallets import async_views as wallets_views
+from events import async_views as events_views
+from .urls import urlpatterns as sync_urlpatterns
+
+
+urlpatterns = [
+    path('api/my-profile/', users_views.myDetails, name='my_profile'),
+    path('api/categories/list/', category_views.list_categories, name='list_categories'),
+    path('api/equipment/list/', equipment_views.list_equipment, name='list_equipment'),
+    path('api/events/my-events/', events_views.list_my_events, name='list_my_events'),
+    path('api/wallets/my-wallet/', wallets_views.viewWallet, name='viewWallet'),
+    path('api/wallets/my-transactions/', wallets_views.myTransactionLog, name='myTransactions'),
+] + sync_urlpatterns
@@ -0,0 +1,26 @@
+from rest_framework.permissions import IsAuthenticated
+from backend.async_api import async_api_view, render
+from backend.caching import aget_catalog_versions
+from backend.conditional import aconditional_get, user_validators
+from backend.models import Event
+from .serializers import EventSerializer
+from .pagination import EventCursorPagination
+
+
+async def my_events_validators(request):
+    return (
+        await Event.objects.filter(user=request.user).avalidators(),
+        user_validators(request.user),
+        *await aget_catalog_versions('categories', 'equipment'),
+    )
+
+
+# List my events (Customer)
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+@aconditional_get(my_events_validators)
+async def list_my_events(request):
+    events = Event.objects.filter(user=request.user).with_listing_relations().with_current_status()
+    paginator = EventCursorPagination()
+    page = await paginator.apaginate_queryset(events, request)
+    serializer = EventSerializer(page, many=True)
+    return render(paginator.get_paginated_data(serializer.data))
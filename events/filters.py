@@ -0,0 +1,62 @@
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import serializers
+from backend.fts import EVENT_FTS_TABLE, event_fts_installed, fts_match_query
+from backend.models import Event
+
+
+class EventFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Event.STATUS_CHOICES, required=False)
+    category = serializers.IntegerField(required=False)
+    owner = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    location = serializers.CharField(required=False)
+    search = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if 'date_from' in attrs and 'date_to' in attrs and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Must not be earlier than date_from.'})
+        return attrs
+
+
+def filter_events(queryset, filters):
+    if 'status' in filters:
+        queryset = filter_by_status(queryset, filters['status'])
+    if 'category' in filters:
+        queryset = queryset.filter(category_id=filters['category'])
+    if 'owner' in filters:
+        queryset = queryset.filter(user_id=filters['owner'])
+    if 'date_from' in filters:
+        queryset = queryset.filter(date__gte=filters['date_from'])
+    if 'date_to' in filters:
+        queryset = queryset.filter(date__lte=filters['date_to'])
+    if 'location' in filters:
+        queryset = queryset.filter(location__icontains=filters['location'])
+    if 'search' in filters:
+        queryset = search_events(queryset, filters['search'])
+    return queryset
+
+
+# Status is derived from date and times (see EventQuerySet.with_current_status),
+# so filter on the same predicates rather than on the computed annotation;
+# those stay sargable on the date indexes.
+def filter_by_status(queryset, status):
+    if status == 'canceled':
+        return queryset.filter(status='canceled')
+    condition = Event.objects.status_conditions()[status]
+    return queryset.exclude(status='canceled').filter(condition)
+
+
+def search_events(queryset, text):
+    if not text.split():
+        return queryset
+    if event_fts_installed(queryset.db):
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {EVENT_FTS_TABLE} WHERE {EVENT_FTS_TABLE} MATCH %s', (fts_match_query(text),)
+        ))
+
+    condition = Q()
+    for term in text.split():
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from backend.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Persist event statuses derived from their date and times (run periodically, e.g. from cron).'
+
+    def handle(self, *args, **options):
+        updated = Event.objects.transition_statuses()
+        for status, count in updated.items():
+            self.stdout.write(f"{count} event(s) moved to '{status}'.")
@@ -0,0 +1,9 @@
+from backend.pagination import KeysetPagination
+
+
+class EventCursorPagination(KeysetPagination):
+    ordering = ('-date', 'id')
+
+
+class TicketCursorPagination(KeysetPagination):
+    ordering = ('-created', 'id')
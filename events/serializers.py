@@ -1,7 +1,13 @@
-from rest_framework import serializers
-from backend.models import Event, EventEquipment, Equipment, Wallet, TransactionLog, Category
+from rest_framework import exceptions, serializers, status
+from backend.models import Event, EventEquipment, Equipment, Category, Ticket
 from django.contrib.auth.models import User
+from django.db import transaction
+from collections import Counter
 from decimal import Decimal
+from wallets import services as wallet_services
+from equipment import availability
+from reports import rollups
+from . import ticketing
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,16 +36,24 @@ class EventSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     equipment = serializers.SerializerMethodField()
+    status = serializers.CharField(source='current_status', read_only=True)
 
     class Meta:
         model = Event
         fields = '__all__'
 
     def get_equipment(self, obj):
-        event_equipment = EventEquipment.objects.filter(event=obj)
+        # Served from the prefetch cache when the queryset uses with_listing_relations()
+        event_equipment = obj.eventequipment_set.all()
         return EventEquipmentSerializer(event_equipment, many=True).data
 
 
+class EventCanceled(exceptions.APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Canceled events cannot be updated.'
+    default_code = 'event_canceled'
+
+
 class EventCreationSerializer(serializers.ModelSerializer):
     equipment = serializers.ListField(
         child=serializers.IntegerField(), write_only=True
@@ -47,91 +61,198 @@ class EventCreationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = ['name', 'description', 'date', 'start_time', 'end_time', 'location', 'capacity', 'category', 'status', 'equipment']
+        fields = ['name', 'description', 'date', 'start_time', 'end_time', 'location', 'capacity', 'ticket_price', 'category', 'status', 'equipment']
+        # Events are only canceled through cancel_event, which refunds and
+        # releases everything the event holds
+        read_only_fields = ['status']
+        # Equipment is reserved in slots of this grid
+        extra_kwargs = {
+            'start_time': {'validators': [availability.validate_slot_time]},
+            'end_time': {'validators': [availability.validate_slot_time]},
+        }
 
-    def create(self, validated_data):
-        equipment_ids = validated_data.pop('equipment')
-        event = Event.objects.create(**validated_data)
+    # Fields written when an event is edited; tickets_sold and status are left
+    # to the conditional UPDATEs in events.ticketing and cancel_event, which a
+    # full save would undo
+    update_fields = [
+        field.name for field in Event._meta.concrete_fields
+        if not field.primary_key and field.name not in ('tickets_sold', 'status')
+    ]
 
-        total_price = Decimal('0.00')
-        for equipment_id in equipment_ids:
-            equipment = Equipment.objects.get(id=equipment_id)
-            total_price += equipment.rental_price
-            EventEquipment.objects.create(event=event, equipment=equipment)
+    # Checked again in update() against the locked row, since tickets can be
+    # sold between validation and the write
+    def validate_capacity(self, value):
+        if self.instance is not None and value < self.instance.tickets_sold:
+            raise serializers.ValidationError(self.capacity_error(self.instance.tickets_sold))
+        return value
 
-        event.total_price = total_price
-        event.save()
+    @staticmethod
+    def capacity_error(tickets_sold):
+        return f"Cannot be lower than the {tickets_sold} tickets already sold."
 
-        wallet = Wallet.objects.get(customer=event.user)
-        if wallet.balance < total_price:
-            raise serializers.ValidationError("Insufficient balance in wallet.")
+    def validate_equipment(self, value):
+        # One query for every requested item; unknown ids are reported together
+        equipment = Equipment.objects.in_bulk(set(value))
+        missing = sorted(set(value) - equipment.keys())
+        if missing:
+            raise serializers.ValidationError(f"Equipment not found: {', '.join(map(str, missing))}.")
+        return [equipment[equipment_id] for equipment_id in value]
 
-        wallet.balance -= total_price
-        wallet.save()
+    def create(self, validated_data):
+        equipment = validated_data.pop('equipment')
+        # An item listed several times is booked as that many units
+        units = Counter(item.id for item in equipment)
+        items = {item.id: item for item in equipment}
+        bookings = [
+            EventEquipment(equipment=items[equipment_id], unit_price=items[equipment_id].rental_price, quantity=quantity)
+            for equipment_id, quantity in units.items()
+        ]
+        total_price = sum((booking.line_total for booking in bookings), Decimal('0.00'))
 
-        TransactionLog.objects.create(
-            customer=event.user,
-            amount=total_price,
-            transaction_type='purchase',
-            description=f"Purchase for event: {event.name}"
-        )
+        with transaction.atomic():
+            event = Event(**validated_data, total_price=total_price, item_count=sum(units.values()))
+            event.save()
+            availability.reserve(units, event.date, event.start_time, event.end_time)
+            wallet_services.debit(
+                event.user,
+                total_price,
+                transaction_type='purchase',
+                description=f"Purchase for event: {event.name}",
+                event=event
+            )
+            for booking in bookings:
+                booking.event, booking.date, booking.start_time, booking.end_time = (
+                    event, event.date, event.start_time, event.end_time
+                )
+            EventEquipment.objects.bulk_create(bookings)
+            rollups.record_rentals(units)
+            rollups.record_capacity(None, rollups.capacity_booking(event))
 
         return event
 
     def update(self, instance, validated_data):
-        new_equipment_ids = validated_data.pop('equipment', None)
-        
-        # Get current equipment for the event
-        current_event_equipment = EventEquipment.objects.filter(event=instance)
-        current_equipment_ids = set(current_event_equipment.values_list('equipment_id', flat=True))
-
-        # Calculate total price for new equipment list
-        new_total_price = Decimal('0.00')
-        for equipment_id in new_equipment_ids:
-            equipment = Equipment.objects.get(id=equipment_id)
-            new_total_price += equipment.rental_price
-
-        # Determine equipment to add and remove
-        new_equipment_ids_set = set(new_equipment_ids)
-        to_add = new_equipment_ids_set - current_equipment_ids
-        to_remove = current_equipment_ids - new_equipment_ids_set
-
-        # Calculate price changes
-        price_change = Decimal('0.00')
-        for equipment_id in to_add:
-            equipment = Equipment.objects.get(id=equipment_id)
-            price_change += equipment.rental_price
-            EventEquipment.objects.create(event=instance, equipment=equipment)
-        
-        for equipment_id in to_remove:
-            equipment = Equipment.objects.get(id=equipment_id)
-            price_change -= equipment.rental_price
-            EventEquipment.objects.filter(event=instance, equipment=equipment).delete()
-
-        # Adjust the wallet balance
-        wallet = Wallet.objects.get(customer=instance.user)
-        if price_change > Decimal('0.00') and wallet.balance < price_change:
-            raise serializers.ValidationError("Insufficient balance in wallet.")
-
-        wallet.balance -= price_change
-        wallet.save()
-
-        # Log the transaction
-        transaction_type = 'refund' if price_change < Decimal('0.00') else 'purchase'
-        TransactionLog.objects.create(
-            customer=instance.user,
-            amount=abs(price_change),
-            transaction_type=transaction_type,
-            description=f"Price adjustment for event: {instance.name}"
-        )
-
-        # Update the event's total price
-        instance.total_price = new_total_price
-
-        # Update other fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
-        instance.save()
+        new_equipment = validated_data.pop('equipment', None)
+
+        with transaction.atomic():
+            # Everything below works from the row as it is now, locked, so
+            # concurrent edits, ticket sales and cancels are not lost or missed
+            current = Event.objects.select_for_update().get(pk=instance.pk)
+            if current.status == 'canceled':
+                raise EventCanceled()
+            if validated_data.get('capacity', current.capacity) < current.tickets_sold:
+                raise serializers.ValidationError({'capacity': [self.capacity_error(current.tickets_sold)]})
+            for field in Event._meta.concrete_fields:
+                setattr(instance, field.attname, getattr(current, field.attname))
+
+            booked_before = rollups.capacity_booking(instance)
+            capacity_before = instance.capacity
+            window_before = (instance.date, instance.start_time, instance.end_time)
+
+            # Update other fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            window = (instance.date, instance.start_time, instance.end_time)
+
+            if window != window_before:
+                # Bookings follow the event's time window, and their units are
+                # reserved again for it
+                bookings = EventEquipment.objects.filter(event=instance)
+                units = dict(bookings.values_list('equipment_id', 'quantity'))
+                availability.release(units, *window_before)
+                if new_equipment is not None:
+                    self.replace_equipment(instance, new_equipment)
+                    units = Counter(item.id for item in new_equipment)
+                bookings.update(date=instance.date, start_time=instance.start_time, end_time=instance.end_time)
+                availability.reserve(units, *window)
+            elif new_equipment is not None:
+                rented, returned = self.replace_equipment(instance, new_equipment)
+                availability.release(returned, *window)
+                availability.reserve(rented, *window)
+
+            instance.save(update_fields=self.update_fields)
+            rollups.record_capacity(booked_before, rollups.capacity_booking(instance))
+
+            # New seats go to the waitlist first
+            if instance.capacity > capacity_before:
+                ticketing.promote_waitlist(instance)
         return instance
 
+    # Deltas come from the booked rows and their price snapshots; only items
+    # new to the event are priced from the catalog, using the rows that
+    # validate_equipment already loaded
+    def replace_equipment(self, instance, new_equipment):
+        current = {booking.equipment_id: booking for booking in EventEquipment.objects.filter(event=instance)}
+        units = Counter(item.id for item in new_equipment)
+        items = {item.id: item for item in new_equipment}
+
+        price_change = Decimal('0.00')
+        rented, returned = Counter(), Counter()
+        to_update, to_delete = [], []
+        for equipment_id, booking in current.items():
+            change = units.get(equipment_id, 0) - booking.quantity
+            if not change:
+                continue
+            price_change += change * booking.unit_price
+            if change > 0:
+                rented[equipment_id] = change
+            else:
+                returned[equipment_id] = -change
+
+            booking.quantity += change
+            if booking.quantity:
+                to_update.append(booking)
+            else:
+                to_delete.append(booking.pk)
+
+        to_create = [
+            EventEquipment(
+                event=instance, equipment=items[equipment_id], unit_price=items[equipment_id].rental_price,
+                quantity=quantity, date=instance.date, start_time=instance.start_time, end_time=instance.end_time
+            )
+            for equipment_id, quantity in units.items() if equipment_id not in current
+        ]
+        for booking in to_create:
+            price_change += booking.line_total
+            rented[booking.equipment_id] = booking.quantity
+
+        # Adjust the wallet balance and log the transaction
+        if price_change > Decimal('0.00'):
+            wallet_services.debit(
+                instance.user,
+                price_change,
+                transaction_type='purchase',
+                description=f"Price adjustment for event: {instance.name}",
+                event=instance
+            )
+        elif price_change < Decimal('0.00'):
+            wallet_services.credit(
+                instance.user,
+                -price_change,
+                transaction_type='refund',
+                description=f"Price adjustment for event: {instance.name}",
+                event=instance
+            )
+
+        EventEquipment.objects.bulk_create(to_create)
+        if to_update:
+            EventEquipment.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            EventEquipment.objects.filter(pk__in=to_delete).delete()
+        rollups.record_rentals(rented)
+        rollups.record_rentals(returned, delta=-1)
+
+        instance.total_price += price_change
+        instance.item_count += sum(rented.values()) - sum(returned.values())
+        return rented, returned
+
+
+class TicketSerializer(serializers.ModelSerializer):
+    event_name = serializers.CharField(source='event.name', read_only=True)
+
+    class Meta:
+        model = Ticket
+        fields = ['id', 'event', 'event_name', 'price', 'status', 'created']
+
+
+class WaitlistPrioritySerializer(serializers.Serializer):
+    priority = serializers.IntegerField(min_value=0, max_value=100)
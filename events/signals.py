@@ -0,0 +1,18 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from backend.models import Event, EventEquipment
+from equipment import availability
+from reports import rollups
+
+
+# Deleting an event, directly or through its category or owner, deletes its
+# bookings too; what they held in occupancy and the rollups is released as
+# cancel_event does. A canceled event has released everything already.
+@receiver(pre_delete, sender=Event)
+def release_deleted_event(sender, instance, **kwargs):
+    if instance.status == 'canceled':
+        return
+    units = dict(EventEquipment.objects.filter(event=instance).values_list('equipment_id', 'quantity'))
+    rollups.record_rentals(units, delta=-1)
+    availability.release(units, instance.date, instance.start_time, instance.end_time)
+    rollups.record_capacity(rollups.capacity_booking(instance), None)
@@ -1,3 +1,856 @@
-from django.test import TestCase
+import datetime
+import io
+import threading
+from unittest import mock
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import close_old_connections, connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient, APITestCase
+from backend.models import Category, Equipment, EquipmentOccupancy, Event, EventEquipment, Ticket, TransactionLog, WaitlistEntry, Wallet
+from . import ticketing
+from .serializers import EventCreationSerializer
 
-# Create your tests here.
+
+class EventListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True, is_superuser=True)
+        self.category = Category.objects.create(name='Conference')
+        self.equipment = [
+            Equipment.objects.create(name=f'Item {i}', type='audio', rental_price=Decimal('10.00'))
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.admin)
+
+    def create_events(self, count):
+        for i in range(count):
+            event = Event.objects.create(
+                user=self.admin,
+                name=f'Event {i}',
+                date=datetime.date(2030, 1, 1) + datetime.timedelta(days=i),
+                start_time=datetime.time(10, 0),
+                end_time=datetime.time(12, 0),
+                location='Hall',
+                capacity=100,
+                category=self.category,
+            )
+            for equipment in self.equipment:
+                EventEquipment.objects.create(
+                    event=event, equipment=equipment, unit_price=equipment.rental_price,
+                    date=event.date, start_time=event.start_time, end_time=event.end_time
+                )
+
+    def count_list_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_event_count(self):
+        for url_name in ('list_all_events', 'list_my_events'):
+            with self.subTest(url_name=url_name):
+                Event.objects.all().delete()
+                self.create_events(2)
+                small = self.count_list_queries(url_name)
+                self.create_events(20)
+                large = self.count_list_queries(url_name)
+                self.assertEqual(small, large)
+
+    def test_listing_does_not_write(self):
+        self.create_events(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('list_all_events'))
+        statements = [query['sql'].split()[0].upper() for query in queries]
+        self.assertEqual(set(statements), {'SELECT'})
+
+
+class EventStatusTests(APITestCase):
+    NOW = datetime.datetime(2030, 6, 1, 12, 0)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.category = Category.objects.create(name='Conference')
+        # name: (date, start_time, end_time, stored status), around NOW
+        self.events = {
+            'tomorrow': ('2030-06-02', '09:00', '10:00', 'upcoming'),
+            'starts_later_today': ('2030-06-01', '12:05', '13:00', 'upcoming'),
+            'starts_now': ('2030-06-01', '12:00', '13:00', 'upcoming'),
+            'ends_now': ('2030-06-01', '10:00', '12:00', 'upcoming'),
+            'ended_today': ('2030-06-01', '10:00', '11:55', 'ongoing'),
+            'yesterday': ('2030-05-31', '10:00', '23:00', 'ongoing'),
+            'canceled': ('2030-06-02', '09:00', '10:00', 'canceled'),
+        }
+        for name, (date, start_time, end_time, status) in self.events.items():
+            Event.objects.create(
+                user=self.user, name=name, date=date, start_time=start_time, end_time=end_time,
+                location='Hall', capacity=10, category=self.category, status=status,
+            )
+
+    def now(self):
+        return timezone.make_aware(self.NOW)
+
+    def expected(self):
+        return {
+            'tomorrow': 'upcoming',
+            'starts_later_today': 'upcoming',
+            'starts_now': 'ongoing',
+            'ends_now': 'ongoing',
+            'ended_today': 'completed',
+            'yesterday': 'completed',
+            'canceled': 'canceled',
+        }
+
+    def test_current_status_at_the_boundaries(self):
+        statuses = dict(Event.objects.with_current_status(self.now()).values_list('name', 'current_status'))
+        self.assertEqual(statuses, self.expected())
+
+    def test_command_persists_statuses_with_one_update_per_status(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.now()):
+            with CaptureQueriesContext(connection) as queries:
+                call_command('update_event_statuses', stdout=io.StringIO())
+            self.assertEqual(len(queries), 3)
+            self.assertEqual(dict(Event.objects.values_list('name', 'status')), self.expected())
+            self.assertEqual(Event.objects.transition_statuses(), {'upcoming': 0, 'ongoing': 0, 'completed': 0})
+
+
+class EventListPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        category = Category.objects.create(name='Party')
+        for i in range(7):
+            Event.objects.create(
+                user=self.user,
+                name=f'Event {i}',
+                # Pairs of events share a date so the id tie-breaker is exercised
+                date=datetime.date(2030, 1, 1) + datetime.timedelta(days=i // 2),
+                start_time=datetime.time(18, 0),
+                end_time=datetime.time(22, 0),
+                location='Garden',
+                capacity=20,
+                category=category,
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_walks_every_event_once_in_order(self):
+        seen = []
+        url = reverse('list_my_events') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend((item['date'], item['id']) for item in response.data['results'])
+            url = response.data['next']
+
+        expected = [
+            (event.date.isoformat(), event.id)
+            for event in Event.objects.order_by('-date', 'id')
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('list_my_events'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class EventCreationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.category = Category.objects.create(name='Wedding')
+        self.equipment = [
+            Equipment.objects.create(name=f'Item {i}', type='light', rental_price=Decimal('2.50'), stock=5)
+            for i in range(4)
+        ]
+        Wallet.objects.create(customer=self.user, balance=Decimal('100.00'))
+        self.client.force_authenticate(user=self.user)
+
+    def payload(self, equipment_ids, date='2030-06-01'):
+        return {
+            'name': 'Reception',
+            'date': date,
+            'start_time': '17:00',
+            'end_time': '23:00',
+            'location': 'Villa',
+            'capacity': 80,
+            'category': self.category.id,
+            'equipment': equipment_ids,
+        }
+
+    def test_create_charges_total_of_booked_equipment(self):
+        ids = [item.id for item in self.equipment]
+        response = self.client.post(reverse('create_event'), self.payload(ids + ids[:1]), format='json')
+        self.assertEqual(response.status_code, 201)
+
+        event = Event.objects.get()
+        self.assertEqual((event.total_price, event.item_count), (Decimal('12.50'), 5))
+        bookings = EventEquipment.objects.filter(event=event)
+        self.assertEqual(sorted(bookings.values_list('quantity', flat=True)), [1, 1, 1, 2])
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('87.50'))
+
+    def test_create_query_count_does_not_grow_with_equipment(self):
+        # Creates today's revenue rollup row, which costs two extra queries once
+        self.client.post(reverse('create_event'), self.payload([self.equipment[0].id], '2030-05-31'), format='json')
+        counts = []
+        for date, ids in (('2030-06-01', [self.equipment[0].id]), ('2030-06-02', [item.id for item in self.equipment] * 5)):
+            # SQLite inserts about 250 occupancy slot rows per statement; a
+            # two-hour window keeps the four items' rows within one
+            payload = {**self.payload(ids, date), 'start_time': '17:00', 'end_time': '19:00'}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('create_event'), payload, format='json')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_equipment_ids_are_reported_together(self):
+        response = self.client.post(
+            reverse('create_event'), self.payload([self.equipment[0].id, 9998, 9999]), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('9998, 9999', str(response.data['equipment']))
+        self.assertFalse(Event.objects.exists())
+
+    def test_edits_work_from_the_current_row_not_the_loaded_one(self):
+        ids = [item.id for item in self.equipment]
+        self.client.post(reverse('create_event'), self.payload(ids[:1]), format='json')
+        stale = Event.objects.get()
+        response = self.client.put(reverse('update_event', args=[stale.pk]), {'equipment': ids[:2]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        serializer = EventCreationSerializer(instance=stale, data={'equipment': ids[:3]}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        event = Event.objects.get()
+        self.assertEqual((event.total_price, event.item_count), (Decimal('7.50'), 3))
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('92.50'))
+
+        # Tickets sold after the event was loaded still bound the capacity
+        Event.objects.update(tickets_sold=50)
+        serializer = EventCreationSerializer(instance=stale, data={'capacity': 40}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(serializers.ValidationError):
+            serializer.save()
+        self.assertEqual(Event.objects.get().capacity, 80)
+
+    def test_insufficient_balance_leaves_nothing_behind(self):
+        Wallet.objects.filter(customer=self.user).update(balance=Decimal('1.00'))
+        response = self.client.post(reverse('create_event'), self.payload([self.equipment[0].id]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(EventEquipment.objects.exists())
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('1.00'))
+
+
+class BookingPriceSnapshotTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.category = Category.objects.create(name='Wedding')
+        self.speaker = Equipment.objects.create(name='Speaker', type='audio', rental_price=Decimal('10.00'), stock=2)
+        self.light = Equipment.objects.create(name='Light', type='light', rental_price=Decimal('4.00'))
+        Wallet.objects.create(customer=self.user, balance=Decimal('100.00'))
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('create_event'), {
+            'name': 'Reception', 'date': '2030-06-01', 'start_time': '17:00', 'end_time': '23:00', 'location': 'Villa',
+            'capacity': 80, 'category': self.category.id, 'equipment': [self.speaker.id, self.speaker.id, self.light.id],
+        }, format='json')
+        self.event = Event.objects.get()
+
+    def balance(self):
+        return Wallet.objects.get(customer=self.user).balance
+
+    def reprice(self, equipment, price):
+        self.client.force_authenticate(user=self.admin)
+        self.client.put(reverse('update_equipment', args=[equipment.id]), {'rental_price': price}, format='json')
+        self.client.force_authenticate(user=self.user)
+
+    def test_edits_and_refunds_use_the_booked_price(self):
+        self.assertEqual(self.balance(), Decimal('76.00'))
+        self.reprice(self.speaker, '50.00')
+
+        # One speaker fewer refunds the 10.00 it was booked at
+        response = self.client.put(
+            reverse('update_event', args=[self.event.id]), {'equipment': [self.speaker.id, self.light.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.total_price, self.event.item_count), (Decimal('14.00'), 2))
+        self.assertEqual(self.balance(), Decimal('86.00'))
+
+        # A second speaker added now is new to the booking only in quantity, so it keeps the booked price too
+        self.client.put(
+            reverse('update_event', args=[self.event.id]),
+            {'equipment': [self.speaker.id, self.speaker.id, self.light.id]}, format='json'
+        )
+        self.assertEqual(self.balance(), Decimal('76.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('cancel_event', args=[self.event.id]))
+        self.assertFalse(any('"backend_equipment"' in query['sql'] for query in queries))
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+    def test_items_new_to_the_event_are_charged_at_the_current_price(self):
+        other = Equipment.objects.create(name='Mixer', type='audio', rental_price=Decimal('7.00'))
+        self.reprice(other, '9.00')
+
+        self.client.put(
+            reverse('update_event', args=[self.event.id]), {'equipment': [self.light.id, other.id]}, format='json'
+        )
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.total_price, self.event.item_count), (Decimal('13.00'), 2))
+        self.assertEqual(self.balance(), Decimal('87.00'))
+        self.assertEqual(EventEquipment.objects.get(event=self.event, equipment=other).unit_price, Decimal('9.00'))
+
+    def test_booked_equipment_cannot_be_deleted(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.delete(reverse('delete_equipment', args=[self.speaker.id]))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Equipment.objects.filter(pk=self.speaker.pk).exists())
+
+
+class EventListFilterTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.music = Category.objects.create(name='Music')
+        self.sport = Category.objects.create(name='Sport')
+        common = {'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0), 'capacity': 10}
+        Event.objects.create(user=self.owner, name='Jazz night', description='Live saxophone', date=datetime.date(2030, 3, 1),
+                             location='Old Town Hall', category=self.music, **common)
+        Event.objects.create(user=self.admin, name='City marathon', description='Run through the park', date=datetime.date(2030, 4, 1),
+                             location='Central Park', category=self.sport, **common)
+        Event.objects.create(user=self.owner, name='Rock festival', date=datetime.date(2020, 5, 1),
+                             location='Stadium', category=self.music, status='canceled', **common)
+        self.client.force_authenticate(user=self.admin)
+
+    def names(self, **params):
+        response = self.client.get(reverse('list_all_events'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.data['results'])
+
+    def test_filters(self):
+        self.assertEqual(self.names(status='canceled'), ['Rock festival'])
+        self.assertEqual(self.names(status='upcoming'), ['City marathon', 'Jazz night'])
+        self.assertEqual(self.names(category=self.music.id), ['Jazz night', 'Rock festival'])
+        self.assertEqual(self.names(owner=self.admin.id), ['City marathon'])
+        self.assertEqual(self.names(date_from='2030-03-15', date_to='2030-12-31'), ['City marathon'])
+        self.assertEqual(self.names(location='town'), ['Jazz night'])
+
+    def test_search_matches_name_and_description(self):
+        self.assertEqual(self.names(search='saxo'), ['Jazz night'])
+        self.assertEqual(self.names(search='park run'), ['City marathon'])
+        with mock.patch('events.filters.event_fts_installed', return_value=False):
+            self.assertEqual(self.names(search='saxo'), ['Jazz night'])
+            self.assertEqual(self.names(search='park run'), ['City marathon'])
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse('list_all_events'), {'status': 'unknown', 'date_from': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'status', 'date_from'})
+
+
+class EquipmentAvailabilityTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.category = Category.objects.create(name='Conference')
+        self.speaker, self.projector = (
+            Equipment.objects.create(name=name, type='av', rental_price=Decimal('5.00'))
+            for name in ('Speaker', 'Projector')
+        )
+        Wallet.objects.create(customer=self.user, balance=Decimal('100.00'))
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, equipment, start_time, end_time, date='2030-09-01'):
+        return self.client.post(reverse('create_event'), {
+            'name': 'Talk',
+            'date': date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'location': 'Room 1',
+            'capacity': 30,
+            'category': self.category.id,
+            'equipment': [item.id for item in equipment],
+        }, format='json')
+
+    def available(self, start_time, end_time, date='2030-09-01'):
+        response = self.client.get(reverse('list_available_equipment'), {
+            'date': date, 'start_time': start_time, 'end_time': end_time,
+        })
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book([self.speaker], '10:00', '12:00').status_code, 201)
+
+        response = self.book([self.speaker, self.projector], '11:00', '13:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.speaker.id), str(response.data['equipment']))
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('95.00'))
+
+        self.assertEqual(self.book([self.speaker], '12:00', '14:00').status_code, 201)
+        self.assertEqual(self.book([self.speaker], '11:00', '13:00', date='2030-09-02').status_code, 201)
+
+    def test_back_to_back_bookings_do_not_conflict(self):
+        self.assertEqual(self.book([self.speaker], '10:00', '10:20').status_code, 201)
+        self.assertEqual(self.book([self.speaker], '10:20', '10:40').status_code, 201)
+        self.assertEqual(self.book([self.speaker], '10:35', '10:50').status_code, 400)
+
+    def test_event_times_must_be_on_the_slot_grid(self):
+        response = self.book([self.speaker], '10:07', '11:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_time', response.data)
+
+    def test_available_endpoint_excludes_booked_equipment(self):
+        self.book([self.speaker], '10:00', '12:00')
+        self.assertEqual(self.available('11:30', '15:00'), ['Projector'])
+        self.assertEqual(self.available('12:00', '15:00'), ['Speaker', 'Projector'])
+
+    def test_moving_an_event_onto_a_booked_window_is_rejected(self):
+        self.book([self.speaker], '10:00', '12:00')
+        self.book([self.speaker], '14:00', '16:00')
+        later = Event.objects.get(start_time=datetime.time(14, 0))
+
+        response = self.client.put(reverse('update_event', args=[later.pk]), {'start_time': '11:00'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        later.refresh_from_db()
+        self.assertEqual(later.start_time, datetime.time(14, 0))
+
+    def test_canceled_event_releases_equipment(self):
+        self.book([self.speaker], '10:00', '12:00')
+        self.client.post(reverse('cancel_event', args=[Event.objects.get().pk]))
+        self.assertEqual(self.book([self.speaker], '10:00', '12:00').status_code, 201)
+
+    def test_cancel_refunds_and_releases_an_edit_made_after_the_event_was_loaded(self):
+        self.book([self.speaker], '10:00', '12:00')
+        event = Event.objects.get()
+        atomic = transaction.atomic
+
+        def edit_then_atomic():
+            response = self.client.put(reverse('update_event', args=[event.pk]), {
+                'start_time': '14:00', 'end_time': '16:00', 'equipment': [self.speaker.id, self.projector.id],
+            }, format='json')
+            self.assertEqual(response.status_code, 200)
+            return atomic()
+
+        with mock.patch('events.views.transaction', mock.Mock(atomic=edit_then_atomic)):
+            self.assertEqual(self.client.post(reverse('cancel_event', args=[event.pk])).status_code, 200)
+
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('100.00'))
+        self.assertFalse(EquipmentOccupancy.objects.exclude(reserved=0).exists())
+
+    def test_bookings_share_the_stock_of_an_item(self):
+        Equipment.objects.filter(pk=self.speaker.pk).update(stock=3)
+
+        self.assertEqual(self.book([self.speaker, self.speaker], '10:00', '12:00').status_code, 201)
+        self.assertEqual(self.book([self.speaker, self.speaker], '11:00', '13:00').status_code, 400)
+        self.assertEqual(self.book([self.speaker], '11:00', '13:00').status_code, 201)
+        self.assertEqual(self.book([self.speaker], '11:45', '12:15').status_code, 400)
+
+        response = self.client.get(
+            reverse('list_available_equipment'), {'date': '2030-09-01', 'start_time': '12:00', 'end_time': '14:00'}
+        )
+        self.assertEqual([(item['name'], item['available']) for item in response.data], [('Speaker', 2), ('Projector', 1)])
+
+    def test_whole_day_is_checked_without_times(self):
+        Equipment.objects.filter(pk=self.speaker.pk).update(stock=2)
+        self.book([self.speaker], '10:00', '12:00')
+        self.book([self.speaker], '15:00', '16:00')
+
+        response = self.client.get(reverse('list_available_equipment'), {'date': '2030-09-01'})
+        self.assertEqual([(item['name'], item['available']) for item in response.data], [('Speaker', 1), ('Projector', 1)])
+
+    def test_moving_an_event_frees_its_old_window(self):
+        self.book([self.speaker], '10:00', '12:00')
+        event = Event.objects.get()
+
+        response = self.client.put(
+            reverse('update_event', args=[event.pk]), {'start_time': '14:00', 'end_time': '16:00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.available('10:00', '12:00'), ['Speaker', 'Projector'])
+        self.assertEqual(self.available('15:00', '17:00'), ['Projector'])
+
+    def test_stock_cannot_drop_below_reserved_units(self):
+        Equipment.objects.filter(pk=self.speaker.pk).update(stock=3)
+        self.book([self.speaker, self.speaker], '10:00', '12:00')
+        self.client.force_authenticate(user=User.objects.create_user(username='admin', password='pass', is_staff=True))
+
+        response = self.client.put(reverse('update_equipment', args=[self.speaker.pk]), {'stock': 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('2 units', str(response.data['stock']))
+        self.assertEqual(
+            self.client.put(reverse('update_equipment', args=[self.speaker.pk]), {'stock': 2}, format='json').status_code, 200
+        )
+
+
+class IdempotentEventWriteTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.category = Category.objects.create(name='Wedding')
+        self.equipment = Equipment.objects.create(name='Speaker', type='audio', rental_price=Decimal('20.00'))
+        Wallet.objects.create(customer=self.user, balance=Decimal('100.00'))
+        self.client.force_authenticate(user=self.user)
+
+    def create_event(self, key):
+        return self.client.post(reverse('create_event'), {
+            'name': 'Reception', 'date': '2030-06-01', 'start_time': '17:00', 'end_time': '23:00', 'location': 'Villa',
+            'capacity': 80, 'category': self.category.id, 'equipment': [self.equipment.id],
+        }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_create_charges_once(self):
+        self.assertEqual(self.create_event('create-1').status_code, 201)
+        retry = self.create_event('create-1')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('80.00'))
+
+    def test_canceling_twice_refunds_once(self):
+        self.create_event('create-1')
+        url = reverse('cancel_event', args=[Event.objects.get().id])
+
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('100.00'))
+
+    def test_canceled_event_cannot_be_reopened_and_canceled_again(self):
+        self.create_event('create-1')
+        event = Event.objects.get()
+        cancel_url, update_url = reverse('cancel_event', args=[event.id]), reverse('update_event', args=[event.id])
+        self.assertEqual(self.client.post(cancel_url).status_code, 200)
+
+        reopen = self.client.put(update_url, {'status': 'upcoming'}, format='json')
+        self.assertEqual(reopen.status_code, 400)
+        rebook = self.client.put(update_url, {'equipment': [self.equipment.id]}, format='json')
+        self.assertEqual(rebook.status_code, 400)
+        self.assertEqual(self.client.post(cancel_url).status_code, 400)
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.total_price), ('canceled', Decimal('20.00')))
+        self.assertEqual(Wallet.objects.get(customer=self.user).balance, Decimal('100.00'))
+        self.assertFalse(EventEquipment.objects.filter(event=event).exists())
+
+    def test_status_is_not_writable_through_updates(self):
+        self.create_event('create-1')
+        event = Event.objects.get()
+
+        response = self.client.put(reverse('update_event', args=[event.id]), {'status': 'canceled', 'name': 'Gala'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.name), ('upcoming', 'Gala'))
+
+
+def create_ticketed_event(organizer, capacity, ticket_price=Decimal('15.00')):
+    return Event.objects.create(
+        user=organizer, category=Category.objects.create(name='Concert'), name='Gig', location='Arena',
+        capacity=capacity, ticket_price=ticket_price, date=datetime.date(2030, 6, 1),
+        start_time=datetime.time(20), end_time=datetime.time(23),
+    )
+
+
+class TicketingTests(APITestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='pass')
+        self.attendee = User.objects.create_user(username='attendee', password='pass')
+        Wallet.objects.create(customer=self.attendee, balance=Decimal('100.00'))
+        self.event = create_ticketed_event(self.organizer, capacity=2)
+        self.client.force_authenticate(user=self.attendee)
+
+    def register(self, event=None):
+        return self.client.post(reverse('register_for_event', args=[(event or self.event).id]))
+
+    def balance(self, user=None):
+        return Wallet.objects.get(customer=user or self.attendee).balance
+
+    def test_registration_takes_a_seat_and_charges_the_wallet(self):
+        response = self.register()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['price'], '15.00')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_sold, 1)
+        self.assertEqual(self.balance(), Decimal('85.00'))
+        self.assertTrue(TransactionLog.objects.filter(customer=self.attendee, transaction_type='ticket', event=self.event).exists())
+
+        listing = self.client.get(reverse('list_my_tickets'))
+        self.assertEqual([ticket['event_name'] for ticket in listing.data['results']], ['Gig'])
+
+    def test_one_active_ticket_per_attendee(self):
+        self.register()
+        response = self.register()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(self.balance(), Decimal('85.00'))
+
+    def test_sold_out_event_puts_buyers_on_the_waitlist(self):
+        for username in ('first', 'second'):
+            Ticket.objects.create(event=self.event, attendee=User.objects.create_user(username=username), price=0)
+        Event.objects.filter(pk=self.event.pk).update(tickets_sold=2)
+
+        response = self.register()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['position'], 1)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertEqual(self.register().status_code, 409)
+
+    def test_insufficient_balance_releases_the_seat(self):
+        Wallet.objects.filter(customer=self.attendee).update(balance=Decimal('1.00'))
+
+        self.assertEqual(self.register().status_code, 400)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_sold, 0)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_past_and_canceled_events_are_closed(self):
+        past = create_ticketed_event(self.organizer, capacity=10)
+        Event.objects.filter(pk=past.pk).update(date=datetime.date(2020, 1, 1))
+        self.assertEqual(self.register(past).status_code, 400)
+
+        Event.objects.filter(pk=self.event.pk).update(status='canceled')
+        self.assertEqual(self.register().status_code, 400)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+    def test_canceling_a_ticket_refunds_it_and_frees_the_seat(self):
+        ticket_id = self.register().data['id']
+        url = reverse('cancel_ticket', args=[ticket_id])
+
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_sold, 0)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertEqual(self.register().status_code, 201)
+
+    def test_tickets_of_a_canceled_event_can_still_be_refunded(self):
+        ticket_id = self.register().data['id']
+        # An event canceled without refunding its tickets, e.g. before cancel_event did so
+        Event.objects.filter(pk=self.event.pk).update(status='canceled')
+
+        self.assertEqual(self.client.post(reverse('cancel_ticket', args=[ticket_id])).status_code, 200)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertEqual(Ticket.objects.get(pk=ticket_id).status, 'canceled')
+
+    def test_canceling_the_event_refunds_every_ticket(self):
+        self.register()
+        Wallet.objects.create(customer=self.organizer, balance=Decimal('0.00'))
+        self.client.force_authenticate(user=self.organizer)
+
+        self.assertEqual(self.client.post(reverse('cancel_event', args=[self.event.id])).status_code, 200)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertFalse(Ticket.objects.filter(status='active').exists())
+
+    def test_refunding_an_event_costs_constant_queries(self):
+        counts = []
+        for attendees in (2, 10):
+            event = create_ticketed_event(self.organizer, capacity=attendees)
+            users = User.objects.bulk_create([User(username=f'fan-{attendees}-{i}') for i in range(attendees)])
+            # Prices differ between tickets bought before and after a price change
+            Ticket.objects.bulk_create([
+                Ticket(event=event, attendee=user, price=Decimal('15.00') if i % 2 else Decimal('12.50'))
+                for i, user in enumerate(users)
+            ])
+            Event.objects.filter(pk=event.pk).update(tickets_sold=attendees)
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(ticketing.refund_tickets(event), attendees)
+            counts.append(len(queries))
+            self.assertEqual(
+                sorted(Wallet.objects.filter(customer__in=users).values_list('balance', flat=True)),
+                [Decimal('12.50')] * (attendees // 2) + [Decimal('15.00')] * (attendees // 2),
+            )
+        self.assertEqual(counts[0], counts[1])
+
+    def test_capacity_cannot_drop_below_tickets_sold_and_edits_keep_the_count(self):
+        self.register()
+        self.client.force_authenticate(user=self.organizer)
+        url = reverse('update_event', args=[self.event.id])
+
+        self.assertEqual(self.client.put(url, {'capacity': 0}, format='json').status_code, 400)
+        self.assertEqual(self.client.put(url, {'name': 'Encore'}, format='json').status_code, 200)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.name, self.event.tickets_sold), ('Encore', 1))
+
+
+class WaitlistTests(APITestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='organizer', password='pass')
+        self.event = create_ticketed_event(self.organizer, capacity=1)
+        self.holder = self.customer('holder')
+        self.client.force_authenticate(user=self.holder)
+        self.ticket_id = self.client.post(reverse('register_for_event', args=[self.event.id])).data['id']
+
+    def customer(self, username, balance=Decimal('100.00')):
+        user = User.objects.create_user(username=username)
+        Wallet.objects.create(customer=user, balance=balance)
+        return user
+
+    def join(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(reverse('register_for_event', args=[self.event.id]))
+        self.assertEqual(response.status_code, 202)
+        return response.data
+
+    def ticket_holders(self):
+        return set(Ticket.objects.filter(event=self.event, status='active').values_list('attendee__username', flat=True))
+
+    def test_positions_follow_priority_then_join_order(self):
+        first, second, vip = (self.customer(name) for name in ('first', 'second', 'vip'))
+        self.assertEqual(self.join(first)['position'], 1)
+        self.assertEqual(self.join(second)['position'], 2)
+        vip_entry = self.join(vip)['waitlist_entry']
+
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.put(reverse('set_waitlist_priority', args=[vip_entry]), {'priority': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ticketing.waitlist_position(WaitlistEntry.objects.get(pk=vip_entry)), 1)
+
+        # A canceled ticket goes to the head of the queue and is charged
+        self.client.force_authenticate(user=self.holder)
+        self.assertEqual(self.client.post(reverse('cancel_ticket', args=[self.ticket_id])).status_code, 200)
+        self.assertEqual(self.ticket_holders(), {'vip'})
+        self.assertEqual(Wallet.objects.get(customer=vip).balance, Decimal('85.00'))
+        self.assertEqual(WaitlistEntry.objects.count(), 2)
+
+    def grow(self, capacity):
+        Event.objects.filter(pk=self.event.pk).update(capacity=capacity)
+        return ticketing.promote_waitlist(self.event)
+
+    def test_promoting_a_batch_costs_constant_queries(self):
+        for i in range(22):
+            self.join(self.customer(f'waiting{i}'))
+
+        counts = []
+        for capacity in (3, 23):
+            with CaptureQueriesContext(connection) as queries:
+                self.grow(capacity)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(len(self.ticket_holders()), 23)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_sold, 23)
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(TransactionLog.objects.filter(event=self.event, transaction_type='ticket').count(), 23)
+
+    def test_entries_that_cannot_pay_are_dropped_and_the_next_fill_the_seats(self):
+        self.join(self.customer('broke', balance=Decimal('1.00')))
+        for name in ('first', 'second', 'third'):
+            self.join(self.customer(name))
+
+        self.assertEqual(self.grow(3), 2)
+
+        self.assertEqual(self.ticket_holders(), {'holder', 'first', 'second'})
+        self.assertEqual(list(WaitlistEntry.objects.values_list('attendee__username', flat=True)), ['third'])
+        self.assertEqual(Wallet.objects.get(customer__username='broke').balance, Decimal('1.00'))
+
+    def test_update_event_capacity_promotes_from_the_waitlist(self):
+        self.join(self.customer('waiting'))
+        self.client.force_authenticate(user=self.organizer)
+
+        response = self.client.put(reverse('update_event', args=[self.event.id]), {'capacity': 2}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ticket_holders(), {'holder', 'waiting'})
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_leaving_and_event_cancellation_clear_entries(self):
+        entry = self.join(self.customer('leaver'))['waitlist_entry']
+        self.assertEqual(self.client.post(reverse('leave_waitlist', args=[entry])).status_code, 200)
+        self.assertEqual(self.client.post(reverse('leave_waitlist', args=[entry])).status_code, 404)
+
+        self.join(self.customer('stayer'))
+        Wallet.objects.create(customer=self.organizer, balance=Decimal('0.00'))
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(reverse('cancel_event', args=[self.event.id]))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+class EquipmentStockConcurrencyTests(TransactionTestCase):
+    customers = 12
+    stock = 4
+
+    def test_concurrent_bookings_never_oversubscribe_stock(self):
+        category = Category.objects.create(name='Festival')
+        speaker = Equipment.objects.create(name='Speaker', type='audio', rental_price=Decimal('5.00'), stock=self.stock)
+        customers = [User.objects.create_user(username=f'customer{i}', password='pass') for i in range(self.customers)]
+        Wallet.objects.bulk_create([Wallet(customer=customer, balance=Decimal('100.00')) for customer in customers])
+        barrier = threading.Barrier(self.customers)
+        outcomes, errors = [], []
+
+        def book(customer):
+            try:
+                client = APIClient()
+                client.force_authenticate(user=customer)
+                barrier.wait()
+                response = client.post(reverse('create_event'), {
+                    'name': 'Stage', 'date': '2030-07-01', 'start_time': '18:00', 'end_time': '22:00', 'location': 'Park',
+                    'capacity': 50, 'category': category.id, 'equipment': [speaker.id],
+                }, format='json')
+                outcomes.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(customer,)) for customer in customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes.count(201), self.stock)
+        self.assertEqual(outcomes.count(400), self.customers - self.stock)
+        self.assertEqual(EventEquipment.objects.filter(equipment=speaker).count(), self.stock)
+        self.assertEqual(
+            set(EquipmentOccupancy.objects.filter(equipment=speaker).values_list('reserved', flat=True)), {self.stock}
+        )
+
+
+class TicketDropConcurrencyTests(TransactionTestCase):
+    buyers = 24
+    capacity = 10
+
+    def test_concurrent_buyers_never_oversell(self):
+        organizer = User.objects.create_user(username='organizer', password='pass')
+        event = create_ticketed_event(organizer, capacity=self.capacity)
+        buyers = [User.objects.create_user(username=f'buyer{i}', password='pass') for i in range(self.buyers)]
+        Wallet.objects.bulk_create([Wallet(customer=buyer, balance=Decimal('100.00')) for buyer in buyers])
+        barrier = threading.Barrier(self.buyers)
+        outcomes, errors = [], []
+
+        def buy(buyer):
+            try:
+                barrier.wait()
+                ticketing.purchase_ticket(Event.objects.get(pk=event.pk), buyer)
+                outcomes.append('sold')
+            except ticketing.SoldOut:
+                outcomes.append('sold_out')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes.count('sold'), self.capacity)
+        event.refresh_from_db()
+        self.assertEqual(event.tickets_sold, self.capacity)
+        self.assertEqual(Ticket.objects.filter(event=event, status='active').count(), self.capacity)
+        spent = sum(Decimal('100.00') - wallet.balance for wallet in Wallet.objects.filter(customer__in=buyers))
+        self.assertEqual(spent, self.capacity * event.ticket_price)
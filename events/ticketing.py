@@ -0,0 +1,186 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import exceptions, status
+from backend.models import Event, Ticket, WaitlistEntry
+from wallets import services as wallet_services
+
+
+class SoldOut(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This event is sold out.'
+    default_code = 'sold_out'
+
+
+class RegistrationClosed(exceptions.APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Registration is closed for this event.'
+    default_code = 'registration_closed'
+
+
+class AlreadyRegistered(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'You already hold a ticket for this event.'
+    default_code = 'already_registered'
+
+
+class AlreadyWaitlisted(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'You are already on the waitlist for this event.'
+    default_code = 'already_waitlisted'
+
+
+# Seats are taken with one conditional UPDATE of the event row
+# (tickets_sold < capacity), so capacity cannot be exceeded however many
+# buyers race, and only that event's row is locked, never the table. The
+# buyer's own rows (ticket, wallet debit) are written first and the contended
+# event row last, so it stays locked only for the commit. If the seat is not
+# available, the whole purchase rolls back, including the debit.
+#
+# Once an event is full the check on the already loaded row turns further
+# buyers away without taking any write lock.
+def purchase_ticket(event, attendee):
+    if event.tickets_sold >= event.capacity:
+        raise SoldOut()
+
+    with transaction.atomic():
+        ticket = Ticket(event=event, attendee=attendee, price=event.ticket_price)
+        try:
+            with transaction.atomic():
+                ticket.save()
+        except IntegrityError:
+            raise AlreadyRegistered()
+
+        if ticket.price:
+            wallet_services.debit(
+                attendee,
+                ticket.price,
+                transaction_type='ticket',
+                description=f"Ticket for event: {event.name}",
+                event=event
+            )
+
+        taken = (
+            Event.objects.filter(pk=event.pk, tickets_sold__lt=F('capacity'))
+            .exclude(status='canceled')
+            .update(tickets_sold=F('tickets_sold') + 1, updated_at=timezone.now())
+        )
+        if not taken:
+            if Event.objects.filter(pk=event.pk, status='canceled').exists():
+                raise RegistrationClosed()
+            raise SoldOut()
+
+    return ticket
+
+
+# Releases the seat and refunds the ticket. Only the request that flips the
+# ticket's status does so; a repeated cancel returns False.
+def cancel_ticket(ticket):
+    with transaction.atomic():
+        if not Ticket.objects.filter(pk=ticket.pk, status='active').update(status='canceled'):
+            return False
+        ticket.status = 'canceled'
+
+        Event.objects.filter(pk=ticket.event_id).update(tickets_sold=F('tickets_sold') - 1, updated_at=timezone.now())
+        if ticket.price:
+            wallet_services.credit(
+                ticket.attendee,
+                ticket.price,
+                transaction_type='ticket_refund',
+                description=f"Ticket refund for event: {ticket.event.name}",
+                event=ticket.event
+            )
+        promote_waitlist(ticket.event)
+    return True
+
+
+# Called when the organizer cancels the event: every active ticket is
+# canceled and refunded, and the waitlist is dropped
+def refund_tickets(event):
+    event.waitlist.all().delete()
+    tickets = list(event.tickets.filter(status='active').values_list('pk', 'attendee_id', 'price'))
+    if not tickets:
+        return 0
+
+    with transaction.atomic():
+        Ticket.objects.filter(pk__in=[pk for pk, _, _ in tickets]).update(status='canceled')
+        Event.objects.filter(pk=event.pk).update(tickets_sold=0)
+
+        # Each ticket is refunded the price it was bought at
+        wallet_services.bulk_credit(
+            [(attendee_id, price) for _, attendee_id, price in tickets],
+            transaction_type='ticket_refund',
+            description=f"Ticket refund for canceled event: {event.name}",
+            event=event
+        )
+    return len(tickets)
+
+
+def join_waitlist(event, attendee, priority=0):
+    if Ticket.objects.filter(event=event, attendee=attendee, status='active').exists():
+        raise AlreadyRegistered()
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(event=event, attendee=attendee, priority=priority)
+    except IntegrityError:
+        raise AlreadyWaitlisted()
+
+
+# 1-based place in the queue; a count over a range of waitlist_head_idx
+def waitlist_position(entry):
+    ahead = WaitlistEntry.objects.filter(event_id=entry.event_id).filter(
+        Q(priority__gt=entry.priority)
+        | Q(priority=entry.priority, joined_at__lt=entry.joined_at)
+        | Q(priority=entry.priority, joined_at=entry.joined_at, id__lt=entry.id)
+    )
+    return ahead.count() + 1
+
+
+# Fills the event's free seats from the head of its waitlist. Called when
+# seats are freed or capacity grows. The whole batch costs a fixed
+# number of statements in one transaction, however many entries are promoted:
+# a range read of the head, one bulk wallet debit, one bulk ticket insert and
+# one delete. An entry whose holder cannot pay when their turn comes, or who
+# meanwhile got a ticket, is removed from the queue, and the next batch
+# fills what they left.
+def promote_waitlist(event):
+    promoted = 0
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        if event.status == 'canceled':
+            return 0
+
+        free = event.capacity - event.tickets_sold
+        while free > 0:
+            entries = list(event.waitlist.order_by(*WaitlistEntry.PROMOTION_ORDER).values_list('id', 'attendee_id')[:free])
+            if not entries:
+                break
+
+            attendee_ids = [attendee_id for _, attendee_id in entries]
+            holders = set(
+                Ticket.objects.filter(event=event, status='active', attendee_id__in=attendee_ids)
+                .values_list('attendee_id', flat=True)
+            )
+            candidates = [attendee_id for attendee_id in attendee_ids if attendee_id not in holders]
+            if event.ticket_price and candidates:
+                charged = set(wallet_services.bulk_debit(
+                    candidates,
+                    event.ticket_price,
+                    transaction_type='ticket',
+                    description=f"Ticket for event: {event.name}",
+                    event=event
+                ))
+            else:
+                charged = set(candidates)
+
+            Ticket.objects.bulk_create([
+                Ticket(event=event, attendee_id=attendee_id, price=event.ticket_price)
+                for attendee_id in candidates if attendee_id in charged
+            ])
+            WaitlistEntry.objects.filter(pk__in=[entry_id for entry_id, _ in entries]).delete()
+            free -= len(charged)
+            promoted += len(charged)
+
+        if promoted:
+            Event.objects.filter(pk=event.pk).update(tickets_sold=F('tickets_sold') + promoted, updated_at=timezone.now())
+    return promoted
@@ -2,68 +2,78 @@ from ast import Not
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from backend.models import Event
-from .serializers import EventSerializer, EventCreationSerializer
+from backend.models import Event, Ticket, WaitlistEntry
+from .serializers import EventSerializer, EventCreationSerializer, TicketSerializer, WaitlistPrioritySerializer
+from .pagination import EventCursorPagination, TicketCursorPagination
+from . import ticketing
+from .filters import EventFilterSerializer, filter_events
 from users.authentication import BearerTokenAuthentication
 from rest_framework import status
+from backend.models import EventEquipment
+from django.db import transaction
+from wallets import services as wallet_services
+from reports import rollups
+from equipment import availability
+from backend.caching import get_catalog_versions
+from backend.conditional import conditional_get, user_validators
+from backend.idempotency import idempotent
 from django.utils import timezone
-from backend.models import Wallet, TransactionLog, Equipment, EventEquipment
 
 
-# Helper function to update event status
-def update_event_status(event):
-    now = timezone.now()
-    
-    # Combine date and time, and make them timezone-aware
-    event_start = timezone.make_aware(timezone.datetime.combine(event.date, event.start_time), timezone.get_current_timezone())
-    event_end = timezone.make_aware(timezone.datetime.combine(event.date, event.end_time), timezone.get_current_timezone())
+# Helper functions computing HTTP validators for the event listings, which also
+# embed users, categories and equipment
+def all_events_validators(request):
+    return (
+        Event.objects.validators(),
+        *get_catalog_versions('users', 'categories', 'equipment'),
+    )
 
-    if event.status == 'canceled':
-        event.status == 'canceled'
-    elif now < event_start:
-        event.status = 'upcoming'
-    elif event_start <= now <= event_end:
-        event.status = 'ongoing'
-    else:
-        event.status = 'completed'
-    event.save()
+
+def my_events_validators(request):
+    return (
+        Event.objects.filter(user=request.user).validators(),
+        user_validators(request.user),
+        *get_catalog_versions('categories', 'equipment'),
+    )
 
 
 # List all events (Admin only)
 @api_view(['GET'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated, IsAdminUser])
+@conditional_get(all_events_validators)
 def list_all_events(request):
-    events = Event.objects.all().order_by('-date')
+    filters = EventFilterSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    # Update the status of each event based on the current time
-    for event in events:
-        update_event_status(event)
-        
-    serializer = EventSerializer(events, many=True)
-    return Response(serializer.data)
+    events = filter_events(Event.objects.all(), filters.validated_data)
+    events = events.with_listing_relations().with_current_status()
+    paginator = EventCursorPagination()
+    page = paginator.paginate_queryset(events, request)
+    serializer = EventSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 # List my events (Customer)
 @api_view(['GET'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_get(my_events_validators)
 def list_my_events(request):
     user = request.user
-    events = Event.objects.filter(user=user).order_by('-date')
-
-    # Update the status of each event based on the current time
-    for event in events:
-        update_event_status(event)
-        
-    serializer = EventSerializer(events, many=True)
-    return Response(serializer.data)
+    events = Event.objects.filter(user=user).with_listing_relations().with_current_status()
+    paginator = EventCursorPagination()
+    page = paginator.paginate_queryset(events, request)
+    serializer = EventSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 # Create event 
 @api_view(['POST'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_event(request):
     serializer = EventCreationSerializer(data=request.data)
     if serializer.is_valid():
@@ -76,6 +86,7 @@ def create_event(request):
 @api_view(['PUT'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_event(request, pk):
     try:
         event = Event.objects.get(pk=pk, user=request.user)
@@ -97,29 +108,129 @@ def update_event(request, pk):
 @api_view(['POST'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@idempotent
 def cancel_event(request, pk):
     try:
         event = Event.objects.get(pk=pk, user=request.user)
     except Event.DoesNotExist:
         return Response({'detail': 'Event not found or you do not have permission to cancel this event.'}, status=status.HTTP_404_NOT_FOUND)
     
-    wallet = Wallet.objects.get(customer=event.user)
-    wallet.balance += event.total_price
-    wallet.save()
-
-    # Log the refund transaction
-    TransactionLog.objects.create(
-        customer=event.user,
-        amount=event.total_price,
-        transaction_type='refund',
-        description=f"Refund for canceled event: {event.name}"
-    )
+    with transaction.atomic():
+        # Only the request that flips the status refunds; a concurrent or
+        # repeated cancel updates nothing and stops here
+        canceled = Event.objects.filter(pk=event.pk).exclude(status='canceled').update(
+            status='canceled', updated_at=timezone.now()
+        )
+        if not canceled:
+            return Response({'detail': 'Event is already canceled.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Reloaded now that edits are locked out, so the refund and the
+        # released window match the last committed edit
+        event = Event.objects.select_related('user').get(pk=event.pk)
+
+        # Refund the event price and log the transaction
+        wallet_services.credit(
+            event.user,
+            event.total_price,
+            transaction_type='refund',
+            description=f"Refund for canceled event: {event.name}",
+            event=event
+        )
+
+        # The refund above is the event's stored total; the bookings only
+        # matter for the rental counts and the units they hold
+        bookings = EventEquipment.objects.filter(event=event)
+        units = dict(bookings.values_list('equipment_id', 'quantity'))
+        rollups.record_rentals(units, delta=-1)
+        availability.release(units, event.date, event.start_time, event.end_time)
+        bookings.delete()
+
+        rollups.record_capacity((event.date, event.capacity), None)
+
+        ticketing.refund_tickets(event)
 
-    EventEquipment.objects.filter(event=event).delete()
-    
-    event.status = 'canceled'
-    event.save()
-    
     return Response({'detail': 'Event has been canceled and a refund has been issued.'}, status=status.HTTP_200_OK)
 
 
+# Register for an event and pay for the ticket from the wallet; when the
+# event is full the customer joins its waitlist instead (Customer)
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@idempotent
+def register_for_event(request, pk):
+    try:
+        event = Event.objects.with_current_status().get(pk=pk)
+    except Event.DoesNotExist:
+        return Response({'detail': 'Event not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    if event.current_status != 'upcoming':
+        raise ticketing.RegistrationClosed()
+
+    try:
+        ticket = ticketing.purchase_ticket(event, request.user)
+    except ticketing.SoldOut:
+        entry = ticketing.join_waitlist(event, request.user)
+        return Response({
+            'detail': 'This event is sold out; you have been added to the waitlist.',
+            'waitlist_entry': entry.id,
+            'position': ticketing.waitlist_position(entry),
+        }, status=status.HTTP_202_ACCEPTED)
+    return Response(TicketSerializer(ticket).data, status=status.HTTP_201_CREATED)
+
+
+# Cancel a ticket and refund it (Customer)
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@idempotent
+def cancel_ticket(request, pk):
+    try:
+        ticket = Ticket.objects.select_related('event', 'attendee').get(pk=pk, attendee=request.user)
+    except Ticket.DoesNotExist:
+        return Response({'detail': 'Ticket not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    # Tickets of a canceled event can always be handed back for a refund
+    if Event.objects.with_current_status().get(pk=ticket.event_id).current_status not in ('upcoming', 'canceled'):
+        return Response({'detail': 'Tickets can only be canceled before the event starts.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not ticketing.cancel_ticket(ticket):
+        return Response({'detail': 'Ticket is already canceled.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'detail': 'Ticket has been canceled and a refund has been issued.'}, status=status.HTTP_200_OK)
+
+
+# List my tickets (Customer)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def list_my_tickets(request):
+    tickets = Ticket.objects.filter(attendee=request.user).select_related('event')
+    paginator = TicketCursorPagination()
+    page = paginator.paginate_queryset(tickets, request)
+    serializer = TicketSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+# Leave an event's waitlist (Customer)
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def leave_waitlist(request, pk):
+    deleted, _ = WaitlistEntry.objects.filter(pk=pk, attendee=request.user).delete()
+    if not deleted:
+        return Response({'detail': 'Waitlist entry not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'detail': 'You have left the waitlist.'}, status=status.HTTP_200_OK)
+
+
+# Move a waitlist entry to another priority tier (Admin only)
+@api_view(['PUT'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def set_waitlist_priority(request, pk):
+    serializer = WaitlistPrioritySerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    if not WaitlistEntry.objects.filter(pk=pk).update(priority=serializer.validated_data['priority']):
+        return Response({'detail': 'Waitlist entry not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'detail': 'Waitlist priority updated.'}, status=status.HTTP_200_OK)
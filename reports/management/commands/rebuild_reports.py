@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from backend.models import (
+    DailyCapacity, DailyRevenue, Event, EventEquipment, EquipmentOccupancy, EquipmentRentalStats, TransactionLog,
+)
+from equipment.availability import occupancy_from_bookings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the reporting rollup and equipment occupancy tables from transactions, bookings and events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        purchases = Q(transaction_type='purchase')
+        refunds = Q(transaction_type='refund')
+
+        revenue = (
+            TransactionLog.objects.filter(event__isnull=False, transaction_type__in=('purchase', 'refund'))
+            .annotate(day=TruncDate('timestamp'))
+            .values('day', 'event__category_id')
+            .annotate(
+                revenue=Sum('amount', filter=purchases, default=0),
+                refunds=Sum('amount', filter=refunds, default=0),
+                purchase_count=Count('id', filter=purchases),
+                refund_count=Count('id', filter=refunds),
+            )
+            .order_by()
+        )
+        rentals = EventEquipment.objects.values('equipment_id').annotate(rentals=Sum('quantity')).order_by()
+        capacity = (
+            Event.objects.exclude(status='canceled').values('date')
+            .annotate(capacity=Sum('capacity'), events=Count('id')).order_by()
+        )
+        # Bookings left on canceled events hold no units
+        bookings = EventEquipment.objects.exclude(event__status='canceled').values_list(
+            'equipment_id', 'date', 'start_time', 'end_time', 'quantity'
+        )
+
+        with transaction.atomic():
+            for model in (DailyRevenue, EquipmentRentalStats, DailyCapacity, EquipmentOccupancy):
+                model.objects.all().delete()
+
+            DailyRevenue.objects.bulk_create(
+                (DailyRevenue(
+                    date=row['day'], category_id=row['event__category_id'], revenue=row['revenue'], refunds=row['refunds'],
+                    purchase_count=row['purchase_count'], refund_count=row['refund_count'],
+                ) for row in revenue.iterator()),
+                batch_size=batch_size,
+            )
+            EquipmentRentalStats.objects.bulk_create(
+                (EquipmentRentalStats(**row) for row in rentals.iterator()), batch_size=batch_size
+            )
+            DailyCapacity.objects.bulk_create(
+                (DailyCapacity(**row) for row in capacity.iterator()), batch_size=batch_size
+            )
+            EquipmentOccupancy.objects.bulk_create(
+                (
+                    EquipmentOccupancy(equipment_id=equipment_id, date=date, slot=slot, reserved=reserved)
+                    for (equipment_id, date, slot), reserved in occupancy_from_bookings(bookings.iterator()).items()
+                ),
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(
+            f"Rebuilt {DailyRevenue.objects.count()} revenue, {EquipmentRentalStats.objects.count()} equipment, "
+            f"{DailyCapacity.objects.count()} capacity and {EquipmentOccupancy.objects.count()} occupancy row(s)."
+        )
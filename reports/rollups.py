@@ -0,0 +1,60 @@
+from collections import Counter
+from django.db.models import F
+from django.utils import timezone
+from backend.models import DailyCapacity, DailyRevenue, EquipmentRentalStats
+from backend.money import Money
+
+
+# Adds deltas to the rollup row identified by lookup. The common case is one
+# UPDATE; a missing row is inserted with ignore_conflicts so that concurrent
+# first writers do not fail, then the UPDATE is repeated.
+def increment(model, lookup, **deltas):
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if not model.objects.filter(**lookup).update(**changes):
+        model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_transaction(log):
+    if log.event is None or log.transaction_type not in ('purchase', 'refund'):
+        return
+
+    lookup = {'date': timezone.localdate(log.timestamp), 'category_id': log.event.category_id}
+    if log.transaction_type == 'purchase':
+        increment(DailyRevenue, lookup, revenue=Money(log.amount), purchase_count=1)
+    else:
+        increment(DailyRevenue, lookup, refunds=Money(log.amount), refund_count=1)
+
+
+# equipment_ids may repeat, or map each id to its number of units (e.g. a
+# Counter); items booked the same number of times share one UPDATE
+def record_rentals(equipment_ids, delta=1):
+    by_count = {}
+    for equipment_id, count in Counter(equipment_ids).items():
+        by_count.setdefault(count, []).append(equipment_id)
+    if not by_count:
+        return
+
+    EquipmentRentalStats.objects.bulk_create(
+        [EquipmentRentalStats(equipment_id=equipment_id) for ids in by_count.values() for equipment_id in ids],
+        ignore_conflicts=True,
+    )
+    for count, ids in by_count.items():
+        EquipmentRentalStats.objects.filter(equipment_id__in=ids).update(rentals=F('rentals') + count * delta)
+
+
+# What an event contributes to the capacity rollup: (date, capacity), or None
+# once it is canceled. Take it before and after a change and pass both here.
+def capacity_booking(event):
+    if event.status == 'canceled':
+        return None
+    return event.date, event.capacity
+
+
+def record_capacity(before, after):
+    if before == after:
+        return
+    if before is not None:
+        increment(DailyCapacity, {'date': before[0]}, capacity=-before[1], events=-1)
+    if after is not None:
+        increment(DailyCapacity, {'date': after[0]}, capacity=after[1], events=1)
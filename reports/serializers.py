@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+
+class ReportRangeSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'date_from' in attrs and 'date_to' in attrs and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'Must not be earlier than date_from.'})
+        return attrs
+
+
+class RevenueReportSerializer(ReportRangeSerializer):
+    category = serializers.IntegerField(required=False)
+
+
+class TopEquipmentSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+def filter_range(queryset, filters):
+    if 'date_from' in filters:
+        queryset = queryset.filter(date__gte=filters['date_from'])
+    if 'date_to' in filters:
+        queryset = queryset.filter(date__lte=filters['date_to'])
+    if 'category' in filters:
+        queryset = queryset.filter(category_id=filters['category'])
+    return queryset
+
+
+class DailyRevenueSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    category_id = serializers.IntegerField()
+    category_name = serializers.CharField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refunds = serializers.DecimalField(max_digits=14, decimal_places=2)
+    purchase_count = serializers.IntegerField()
+    refund_count = serializers.IntegerField()
+
+
+class RefundRateSerializer(serializers.Serializer):
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refunds = serializers.DecimalField(max_digits=14, decimal_places=2)
+    purchase_count = serializers.IntegerField()
+    refund_count = serializers.IntegerField()
+    refund_rate = serializers.DecimalField(max_digits=7, decimal_places=4, allow_null=True)
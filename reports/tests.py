@@ -0,0 +1,99 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from backend.models import (
+    Category, DailyCapacity, DailyRevenue, Equipment, EquipmentOccupancy, EquipmentRentalStats, Event, Wallet,
+)
+
+
+class ReportRollupTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pass')
+        Wallet.objects.create(customer=self.customer, balance=Decimal('100.00'))
+        self.category = Category.objects.create(name='Wedding')
+        self.speaker = Equipment.objects.create(name='Speaker', type='audio', rental_price=Decimal('20.00'))
+        self.light = Equipment.objects.create(name='Light', type='light', rental_price=Decimal('5.00'))
+
+        self.client.force_authenticate(user=self.customer)
+        for date, equipment in (('2030-06-01', [self.speaker, self.light]), ('2030-06-02', [self.speaker])):
+            response = self.client.post(reverse('create_event'), {
+                'name': 'Reception', 'date': date, 'start_time': '17:00', 'end_time': '23:00', 'location': 'Villa',
+                'capacity': 80, 'category': self.category.id, 'equipment': [item.id for item in equipment],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        event_id = self.customer.event_set.get(date='2030-06-02').id
+        self.client.post(reverse('cancel_event', args=[event_id]))
+        self.client.force_authenticate(user=self.admin)
+
+    def test_rollups_follow_purchases_bookings_and_cancellations(self):
+        revenue = self.client.get(reverse('revenue_report')).json()
+        self.assertEqual(len(revenue), 1)
+        self.assertEqual(revenue[0]['date'], str(timezone.localdate()))
+        self.assertEqual((revenue[0]['revenue'], revenue[0]['refunds']), ('45.00', '20.00'))
+
+        rate = self.client.get(reverse('refund_rate_report'), {'category': self.category.id}).json()
+        self.assertEqual(rate['refund_rate'], '0.4444')
+
+        top = self.client.get(reverse('top_equipment_report')).json()
+        self.assertEqual([(row['name'], row['rentals']) for row in top], [('Speaker', 1), ('Light', 1)])
+
+        capacity = self.client.get(reverse('capacity_report'), {'date_from': '2030-06-01', 'date_to': '2030-06-30'}).json()
+        self.assertEqual(capacity, [{'date': '2030-06-01', 'capacity': 80, 'events': 1}])
+
+    def test_rebuild_matches_incremental_rollups(self):
+        def snapshot():
+            return (
+                list(DailyRevenue.objects.values_list('date', 'category_id', 'revenue', 'refunds', 'purchase_count', 'refund_count')),
+                sorted(EquipmentRentalStats.objects.values_list('equipment_id', 'rentals')),
+                list(DailyCapacity.objects.filter(events__gt=0).values_list('date', 'capacity', 'events')),
+                sorted(EquipmentOccupancy.objects.filter(reserved__gt=0).values_list('equipment_id', 'date', 'slot', 'reserved')),
+            )
+
+        incremental = snapshot()
+        call_command('rebuild_reports', stdout=open('/dev/null', 'w'))
+        self.assertEqual(snapshot(), incremental)
+
+    def test_deleting_a_category_or_owner_releases_its_events(self):
+        def assert_released():
+            self.assertFalse(EquipmentOccupancy.objects.exclude(reserved=0).exists())
+            self.assertFalse(EquipmentRentalStats.objects.exclude(rentals=0).exists())
+            self.assertFalse(DailyCapacity.objects.exclude(events=0).exists())
+
+        self.category.delete()
+        assert_released()
+
+        other = Category.objects.create(name='Gala')
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(reverse('create_event'), {
+            'name': 'Gala', 'date': '2030-07-01', 'start_time': '18:00', 'end_time': '22:00', 'location': 'Hall',
+            'capacity': 50, 'category': other.id, 'equipment': [self.speaker.id],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.customer.delete()
+        assert_released()
+
+    def test_rebuild_frees_units_booked_by_canceled_events(self):
+        # An event canceled without releasing its bookings, as updates could once do
+        Event.objects.filter(date='2030-06-01').update(status='canceled')
+        call_command('rebuild_reports', stdout=open('/dev/null', 'w'))
+        self.assertFalse(EquipmentOccupancy.objects.filter(reserved__gt=0).exists())
+
+    def test_reports_read_only_the_rollup_tables(self):
+        for name in ('revenue_report', 'refund_rate_report', 'top_equipment_report', 'capacity_report'):
+            with self.subTest(report=name), CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(name))
+            sql = ' '.join(query['sql'] for query in queries)
+            self.assertNotIn('backend_transactionlog', sql)
+            self.assertNotIn('backend_eventequipment', sql)
+            self.assertNotIn('"backend_event"', sql)
+
+    def test_reports_require_admin(self):
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get(reverse('revenue_report')).status_code, 403)
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.db.models import F, Sum
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from backend.models import DailyCapacity, DailyRevenue, EquipmentRentalStats
+from users.authentication import BearerTokenAuthentication
+from .serializers import (
+    DailyRevenueSerializer, RefundRateSerializer, ReportRangeSerializer, RevenueReportSerializer, TopEquipmentSerializer,
+    filter_range,
+)
+
+
+# Revenue per Day and Category (Admin)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def revenue_report(request):
+    filters = RevenueReportSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+
+    rows = (
+        filter_range(DailyRevenue.objects.all(), filters.validated_data)
+        .order_by('date', 'category_id')
+        .values('date', 'category_id', 'revenue', 'refunds', 'purchase_count', 'refund_count', category_name=F('category__name'))
+    )
+    return Response(DailyRevenueSerializer(rows, many=True).data)
+
+
+# Refund Rate (Admin)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def refund_rate_report(request):
+    filters = RevenueReportSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+
+    totals = filter_range(DailyRevenue.objects.all(), filters.validated_data).aggregate(
+        revenue=Sum('revenue'), refunds=Sum('refunds'), purchase_count=Sum('purchase_count'), refund_count=Sum('refund_count')
+    )
+    totals = {
+        'revenue': totals['revenue'] or Decimal('0.00'),
+        'refunds': totals['refunds'] or Decimal('0.00'),
+        'purchase_count': totals['purchase_count'] or 0,
+        'refund_count': totals['refund_count'] or 0,
+    }
+    totals['refund_rate'] = (totals['refunds'] / totals['revenue']).quantize(Decimal('0.0001')) if totals['revenue'] else None
+    return Response(RefundRateSerializer(totals).data)
+
+
+# Top Equipment by Rental Count (Admin)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def top_equipment_report(request):
+    params = TopEquipmentSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+
+    rows = (
+        EquipmentRentalStats.objects.filter(rentals__gt=0)
+        .order_by('-rentals', 'equipment_id')
+        .values('equipment_id', 'rentals', name=F('equipment__name'), type=F('equipment__type'))
+        [:params.validated_data['limit']]
+    )
+    return Response(list(rows))
+
+
+# Capacity Booked per Day (Admin)
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def capacity_report(request):
+    filters = ReportRangeSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+
+    rows = (
+        filter_range(DailyCapacity.objects.filter(events__gt=0), filters.validated_data)
+        .order_by('date')
+        .values('date', 'capacity', 'events')
+    )
+    return Response(list(rows))
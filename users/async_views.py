@@ -0,0 +1,15 @@
+from rest_framework.permissions import IsAuthenticated
+from backend.async_api import async_api_view, render
+from backend.conditional import aconditional_get, user_validators
+from .serializers import CustomUserSerializer
+
+
+async def my_details_validators(request):
+    return user_validators(request.user)
+
+
+# User Details by token API
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+@aconditional_get(my_details_validators)
+async def myDetails(request):
+    return render(CustomUserSerializer(request.user).data)
@@ -1,19 +1,93 @@
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.authtoken.models import Token
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils.translation import gettext_lazy as _
+from backend.models import AuthToken
+from .token_cache import token_cache
 
 class BearerTokenAuthentication(TokenAuthentication):
     keyword = 'Bearer'
+    model = AuthToken
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    # Async counterpart used by the async views (see backend.async_api); it
+    # shares the token cache, so a warm cache costs no database round trip.
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    def get_key(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
 
-    def authenticate_credentials(self, key):
-        model = self.get_model()
         try:
-            token = model.objects.select_related('user').get(key=key)
-        except model.DoesNotExist:
-            raise AuthenticationFailed(_('Invalid token.'))
+            return auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
 
+    def authenticate_credentials(self, key):
+        key_hash = AuthToken.hash_key(key)
+        cached = token_cache.get(key_hash)
+        if cached is None:
+            try:
+                token = AuthToken.objects.select_related('user').get(key_hash=key_hash)
+            except AuthToken.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            cached = self.cache_token(key_hash, token)
+
+        user, token = cached
+        now = timezone.now()
+        self.check_expiry(token, now)
+        if self.needs_touch(token, now):
+            AuthToken.objects.filter(pk=token.pk).update(last_used=now)
+        return (user, token)
+
+    async def aauthenticate_credentials(self, key):
+        key_hash = AuthToken.hash_key(key)
+        cached = token_cache.get(key_hash)
+        if cached is None:
+            try:
+                token = await AuthToken.objects.select_related('user').aget(key_hash=key_hash)
+            except AuthToken.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            cached = self.cache_token(key_hash, token)
+
+        user, token = cached
+        now = timezone.now()
+        self.check_expiry(token, now)
+        if self.needs_touch(token, now):
+            await AuthToken.objects.filter(pk=token.pk).aupdate(last_used=now)
+        return (user, token)
+
+    def cache_token(self, key_hash, token):
         if not token.user.is_active:
             raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token_cache.set(key_hash, token.user, token)
+
+    def check_expiry(self, token, now):
+        if token.is_expired(now):
+            raise AuthenticationFailed(_('Token has expired.'))
 
-        return (token.user, token)
+    # last_used is written at most once per AUTH_TOKEN_LAST_USED_INTERVAL, so
+    # authentication does not turn every request into a write
+    def needs_touch(self, token, now):
+        interval = timedelta(seconds=settings.AUTH_TOKEN_LAST_USED_INTERVAL)
+        if token.last_used is None or now - token.last_used >= interval:
+            token.last_used = now
+            return True
+        return False
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from backend.bulk import delete_in_batches
+from backend.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired bearer tokens in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = AuthToken.expiry_cutoff()
+        expired = AuthToken.objects.filter(created__lte=cutoff).order_by('created')
+        total = delete_in_batches(expired, options['batch_size'])
+        self.stdout.write(f"Deleted {total} expired token(s).")
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from backend.caching import bump_catalog_version
+from backend.models import AuthToken
+from .token_cache import token_cache
+
+
+# Any change to a user (profile update, password reset, deactivation) drops the
+# cached snapshots for all of their tokens. Login only stamps last_login,
+# which neither the snapshots nor the admin listings show, so it is skipped.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_tokens(sender, instance, update_fields=None, **kwargs):
+    if update_fields == {'last_login'}:
+        return
+    keys = ()
+    if token_cache.shared_cache is not None:
+        keys = list(AuthToken.objects.filter(user_id=instance.pk).values_list('key_hash', flat=True))
+    token_cache.invalidate_user(instance.pk, keys)
+    # Admin event listings embed user details
+    bump_catalog_version('users')
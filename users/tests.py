@@ -1,3 +1,165 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from io import StringIO
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from backend.caching import get_catalog_version
+from backend.models import AuthToken, Category, Equipment, Event, EventEquipment
+from wallets import services as wallet_services
+from .token_cache import token_cache
 
-# Create your tests here.
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='customer', email='c@example.com', password='pass')
+        self.token, self.key = AuthToken.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.key}')
+
+    def test_repeated_requests_authenticate_from_cache(self):
+        self.assertEqual(self.client.get(reverse('my_profile')).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('my_profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(reverse('my_profile'))
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('my_profile')).status_code, 401)
+
+    def test_user_changes_invalidate_cached_snapshot(self):
+        self.client.get(reverse('my_profile'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('my_profile')).status_code, 401)
+
+    def test_login_keeps_cached_tokens_and_catalog_version(self):
+        self.client.get(reverse('my_profile'))
+        version = get_catalog_version('users')
+        self.client.credentials()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('login'), {'username_or_email': 'customer', 'password': 'pass'})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(get_catalog_version('users'), version)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.key}')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('my_profile')).status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_profile_update_is_visible_on_next_request(self):
+        self.client.get(reverse('my_profile'))
+        self.client.put(reverse('updateUserInfo'), {'first_name': 'Updated'}, format='json')
+        self.assertEqual(self.client.get(reverse('my_profile')).data['first_name'], 'Updated')
+
+
+class AuthTokenTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='customer', password='pass')
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username_or_email': 'customer', 'password': 'pass'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['access_token']
+
+    def test_login_issues_a_new_hashed_token_each_time(self):
+        first, second = self.login(), self.login()
+        self.assertNotEqual(first, second)
+        self.assertEqual(
+            set(AuthToken.objects.values_list('key_hash', flat=True)),
+            {AuthToken.hash_key(first), AuthToken.hash_key(second)},
+        )
+
+    @override_settings(AUTH_TOKEN_TTL=60)
+    def test_expired_token_is_rejected_even_when_cached(self):
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {key}')
+        self.assertEqual(self.client.get(reverse('my_profile')).status_code, 200)
+
+        AuthToken.objects.update(created=timezone.now() - timedelta(seconds=61))
+        token_cache.clear()
+        self.assertEqual(self.client.get(reverse('my_profile')).status_code, 401)
+
+    def test_last_used_is_written_lazily(self):
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {key}')
+        self.client.get(reverse('my_profile'))
+        first_use = AuthToken.objects.get().last_used
+        self.assertIsNotNone(first_use)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('my_profile'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(AuthToken.objects.get().last_used, first_use)
+
+    @override_settings(AUTH_TOKEN_TTL=60)
+    def test_purge_command_deletes_only_expired_tokens(self):
+        for _ in range(5):
+            AuthToken.issue(self.user)
+        AuthToken.objects.filter(pk__in=AuthToken.objects.values('pk')[:3]).update(
+            created=timezone.now() - timedelta(seconds=120)
+        )
+        call_command('purge_expired_tokens', batch_size=2, stdout=StringIO())
+        self.assertEqual(AuthToken.objects.count(), 2)
+
+
+class AsyncReadEndpointTests(APITestCase):
+    endpoints = ['my_profile', 'list_categories', 'list_equipment', 'list_my_events', 'viewWallet', 'myTransactions']
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='customer', email='c@example.com', password='pass')
+        category = Category.objects.create(name='Wedding')
+        speaker = Equipment.objects.create(name='Speaker', type='audio', rental_price=Decimal('20.00'))
+        wallet_services.credit(self.user, Decimal('50.00'))
+        event = Event.objects.create(
+            user=self.user, category=category, name='Reception', date=datetime.date(2030, 6, 1),
+            start_time=datetime.time(17), end_time=datetime.time(23), location='Villa', capacity=80,
+        )
+        EventEquipment.objects.create(
+            event=event, equipment=speaker, unit_price=speaker.rental_price,
+            date=event.date, start_time=event.start_time, end_time=event.end_time
+        )
+        self.token, key = AuthToken.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {key}')
+
+    def get(self, name, urlconf, **extra):
+        with self.settings(ROOT_URLCONF=urlconf):
+            return self.client.get(reverse(name), **extra)
+
+    def test_async_views_return_the_same_payloads(self):
+        for name in self.endpoints:
+            with self.subTest(endpoint=name):
+                sync_response = self.get(name, 'event_management.urls')
+                async_response = self.get(name, 'event_management.urls_async')
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(async_response.json(), sync_response.json())
+                self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+    def test_async_views_answer_conditional_requests(self):
+        for name in self.endpoints:
+            with self.subTest(endpoint=name):
+                etag = self.get(name, 'event_management.urls_async')['ETag']
+                response = self.get(name, 'event_management.urls_async', HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_async_authentication_rejects_bad_credentials(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        response = self.get('my_profile', 'event_management.urls_async')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
+        self.client.credentials()
+        self.assertEqual(self.get('viewWallet', 'event_management.urls_async').status_code, 401)
+        self.assertEqual(self.get('list_categories', 'event_management.urls_async').status_code, 200)
@@ -0,0 +1,102 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+
+# In-process LRU of token key hash -> (user, token) snapshots with a TTL, optionally
+# backed by a shared Django cache so that other workers benefit from a lookup.
+# Entries are invalidated explicitly on logout, password change and user
+# updates (see users.signals), the TTL only bounds how stale a missed
+# invalidation can get.
+class TokenCache:
+    key_prefix = 'auth-token:'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config(self):
+        return settings.AUTH_TOKEN_CACHE
+
+    @property
+    def shared_cache(self):
+        alias = self.config.get('BACKEND')
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._snapshot(entry[1])
+            if entry is not None:
+                del self._entries[key]
+
+        if self.shared_cache is not None:
+            value = self.shared_cache.get(self.key_prefix + key)
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.hits += 1
+                return self._snapshot(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, user, token):
+        value = (copy.copy(user), token)
+        self._store(key, value)
+        if self.shared_cache is not None:
+            self.shared_cache.set(self.key_prefix + key, value, self.config['TTL'])
+        return self._snapshot(value)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared_cache is not None and keys:
+            self.shared_cache.delete_many([self.key_prefix + key for key in keys])
+
+    def invalidate_user(self, user_id, keys=()):
+        # Local entries are matched by user; shared entries need the token keys
+        with self._lock:
+            stale = [key for key, (_, (user, _)) in self._entries.items() if user.pk == user_id]
+            for key in stale:
+                del self._entries[key]
+        self.invalidate(*keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _store(self, key, value):
+        expires_at = time.monotonic() + self.config['TTL']
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config['MAX_SIZE']:
+                self._entries.popitem(last=False)
+
+    # Views may modify request.user, so every caller gets its own copy
+    @staticmethod
+    def _snapshot(value):
+        user, token = value
+        return copy.copy(user), token
+
+
+token_cache = TokenCache()
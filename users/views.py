@@ -4,7 +4,8 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.authtoken.models import Token
+from django.conf import settings
+from backend.models import AuthToken
 from .serializers import (
     UserRegistrationSerializer,
     CustomAuthTokenSerializer,
@@ -13,6 +14,8 @@ from .serializers import (
     UserInfoUpdateSerializer
 )
 from .authentication import BearerTokenAuthentication
+from .token_cache import token_cache
+from backend.conditional import conditional_get, user_validators
 
 
 # Register API
@@ -35,7 +38,7 @@ def userAuthTokenLogin(request):
     serializer.is_valid(raise_exception=True)
     user = serializer.validated_data['user']
     
-    token, created = Token.objects.get_or_create(user=user)
+    token, key = AuthToken.issue(user)
     
     user.last_login = timezone.now()
     user.save(update_fields=['last_login'])
@@ -48,9 +51,9 @@ def userAuthTokenLogin(request):
     
     # Customize the response data
     response_data = {
-        'access_token': token.key,
+        'access_token': key,
         'token_type': 'bearer',
-        'expires_in': 36000,  # token expiration time (in seconds)
+        'expires_in': settings.AUTH_TOKEN_TTL,  # token expiration time (in seconds)
         'user': {
             'id': user.id,
             'first_name': user.first_name,
@@ -81,12 +84,12 @@ def userLogout(request):
     except IndexError:
         return Response({'detail': 'Invalid authorization header format.'}, status=status.HTTP_401_UNAUTHORIZED)
     
-    try:
-        token = Token.objects.get(key=auth_token)
-    except Token.DoesNotExist:
+    key_hash = AuthToken.hash_key(auth_token)
+    deleted, _ = AuthToken.objects.filter(key_hash=key_hash).delete()
+    if not deleted:
         return Response({'detail': 'Invalid token.'}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    token.delete()
+
+    token_cache.invalidate(key_hash)
 
     return Response({'detail': 'Logged out successfully.'}, status=status.HTTP_200_OK)
 
@@ -166,6 +169,7 @@ def passwordResetConfirm(request):
 @api_view(['GET'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated]) 
+@conditional_get(lambda request: user_validators(request.user))
 def myDetails(request):
     user = request.user
     serializer = CustomUserSerializer(user)
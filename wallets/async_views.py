@@ -0,0 +1,36 @@
+from django.db.models import Max
+from rest_framework.permissions import IsAuthenticated
+from backend.async_api import async_api_view, render
+from backend.conditional import aconditional_get, user_validators
+from backend.models import Wallet, TransactionLog
+from .serializers import WalletSerializer, TransactionLogSerializer
+from .pagination import TransactionLogCursorPagination
+
+
+async def wallet_validators(request):
+    version = await Wallet.objects.filter(customer=request.user).values_list('version', flat=True).afirst()
+    return user_validators(request.user), version
+
+
+async def transaction_log_validators(request):
+    latest = await TransactionLog.objects.filter(customer=request.user).aaggregate(latest=Max('timestamp'))
+    return user_validators(request.user), latest['latest']
+
+
+# View My Wallet API
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+@aconditional_get(wallet_validators)
+async def viewWallet(request):
+    wallet, created = await Wallet.objects.select_related('customer').aget_or_create(customer=request.user)
+    return render(WalletSerializer(wallet).data)
+
+
+# My Transaction Log API
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+@aconditional_get(transaction_log_validators)
+async def myTransactionLog(request):
+    transaction_logs = TransactionLog.objects.filter(customer=request.user).select_related('customer')
+    paginator = TransactionLogCursorPagination()
+    page = await paginator.apaginate_queryset(transaction_logs, request)
+    serializer = TransactionLogSerializer(page, many=True)
+    return render(paginator.get_paginated_data(serializer.data))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from wallets.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Snapshot ledger balances for customers with new transactions and flag wallets that drifted from the ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settle-seconds', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--fail-on-drift', action='store_true')
+
+    def handle(self, *args, **options):
+        drifted = reconcile(settle_seconds=options['settle_seconds'], batch_size=options['batch_size'])
+        for snapshot in drifted:
+            self.stderr.write(
+                f"Customer {snapshot.customer_id}: wallet differs from ledger by {snapshot.drift} "
+                f"(ledger balance {snapshot.balance} at transaction #{snapshot.last_transaction_id})."
+            )
+
+        self.stdout.write(f"{len(drifted)} wallet(s) drifted from the ledger.")
+        if drifted and options['fail_on_drift']:
+            raise CommandError('Wallet balances drifted from the ledger.')
@@ -0,0 +1,5 @@
+from backend.pagination import KeysetPagination
+
+
+class TransactionLogCursorPagination(KeysetPagination):
+    ordering = ('-timestamp', 'id')
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery, Sum
+from django.utils import timezone
+from backend.models import TransactionLog, Wallet, WalletSnapshot
+
+
+# Reconciliation is incremental: every customer with ledger activity gets a
+# snapshot of their ledger-derived balance, so the next run only has to sum
+# log rows after the newest snapshot's last_transaction_id (the watermark).
+# The first run has no watermark and reads the whole ledger once.
+#
+# Rows younger than settle_seconds are left for the next run. Ids are
+# allocated before commit, so a slow transaction could otherwise commit a row
+# below a watermark that has already moved past it.
+def reconcile(settle_seconds=60, batch_size=500, now=None):
+    now = now or timezone.now()
+    watermark = WalletSnapshot.objects.aggregate(watermark=Max('last_transaction_id'))['watermark'] or 0
+    upper = (
+        TransactionLog.objects.filter(timestamp__lte=now - timedelta(seconds=settle_seconds))
+        .order_by('-timestamp', '-id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    if upper is None or upper <= watermark:
+        return []
+
+    activity = {
+        row['customer_id']: row
+        for row in TransactionLog.objects.filter(id__gt=watermark, id__lte=upper)
+        .values('customer_id')
+        .annotate(delta=Sum(TransactionLog.signed_amount()), last_id=Max('id'))
+    }
+
+    drifted = []
+    customer_ids = sorted(activity)
+    for offset in range(0, len(customer_ids), batch_size):
+        batch = customer_ids[offset:offset + batch_size]
+        drifted.extend(_reconcile_batch(batch, activity, upper, now))
+    return drifted
+
+
+def _reconcile_batch(customer_ids, activity, upper, now):
+    with transaction.atomic():
+        # Locking the wallets holds back concurrent debits and credits, so
+        # the balances and the not-yet-settled rows below are read together
+        balances = dict(
+            Wallet.objects.select_for_update()
+            .filter(customer_id__in=customer_ids)
+            .order_by('customer_id')
+            .values_list('customer_id', 'balance')
+        )
+        pending = dict(
+            TransactionLog.objects.filter(customer_id__in=customer_ids, id__gt=upper)
+            .values('customer_id')
+            .annotate(delta=Sum(TransactionLog.signed_amount()))
+            .values_list('customer_id', 'delta')
+        )
+        latest = WalletSnapshot.objects.filter(customer=OuterRef('customer')).order_by('-last_transaction_id')
+        previous = dict(
+            WalletSnapshot.objects.filter(
+                customer_id__in=customer_ids, id=Subquery(latest.values('id')[:1])
+            ).values_list('customer_id', 'balance')
+        )
+
+        snapshots = []
+        for customer_id in customer_ids:
+            ledger_balance = previous.get(customer_id, Decimal('0.00')) + activity[customer_id]['delta']
+            expected = ledger_balance + pending.get(customer_id, Decimal('0.00'))
+            drift = balances.get(customer_id, Decimal('0.00')) - expected
+            snapshots.append(WalletSnapshot(
+                customer_id=customer_id,
+                as_of=now,
+                balance=ledger_balance,
+                last_transaction_id=activity[customer_id]['last_id'],
+                drift=drift,
+            ))
+        WalletSnapshot.objects.bulk_create(snapshots)
+
+    return [snapshot for snapshot in snapshots if snapshot.drift]
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import F
+from rest_framework import serializers
+from backend.models import Wallet, TransactionLog
+from backend.money import Money
+from reports import rollups
+
+
+class InsufficientBalance(serializers.ValidationError):
+    default_detail = 'Insufficient balance in wallet.'
+    default_code = 'insufficient_balance'
+
+
+# Every balance change is a single conditional UPDATE on the customer's wallet
+# row, committed together with its TransactionLog entry. The database applies
+# the arithmetic (on integer cents, see backend.money), so concurrent writers
+# cannot lose updates, and only the wallet being changed is locked.
+def debit(customer, amount, transaction_type='purchase', description=None, event=None):
+    with transaction.atomic():
+        updated = Wallet.objects.filter(customer=customer, balance__gte=amount).update(
+            balance=F('balance') - Money(amount), version=F('version') + 1
+        )
+        if not updated:
+            raise InsufficientBalance()
+
+        return _log(customer, amount, transaction_type, description, event)
+
+
+# Charges the same amount to many customers with one UPDATE and one INSERT,
+# for batch jobs such as waitlist promotion. Wallets that cannot cover the
+# amount are skipped; returns the ids of the customers that were charged.
+def bulk_debit(customer_ids, amount, transaction_type='purchase', description=None, event=None):
+    with transaction.atomic():
+        # The locked balances cannot drop below amount before the UPDATE
+        charged = list(
+            Wallet.objects.select_for_update()
+            .filter(customer_id__in=customer_ids, balance__gte=amount)
+            .order_by('customer_id')
+            .values_list('customer_id', flat=True)
+        )
+        if not charged:
+            return []
+
+        Wallet.objects.filter(customer_id__in=charged).update(balance=F('balance') - Money(amount), version=F('version') + 1)
+        logs = TransactionLog.objects.bulk_create([
+            TransactionLog(
+                customer_id=customer_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                description=description,
+                event=event,
+            )
+            for customer_id in charged
+        ])
+        for log in logs:
+            rollups.record_transaction(log)
+
+    return charged
+
+
+def credit(customer, amount, transaction_type='deposit', description=None, event=None):
+    with transaction.atomic():
+        changes = {'balance': F('balance') + Money(amount), 'version': F('version') + 1}
+        if not Wallet.objects.filter(customer=customer).update(**changes):
+            Wallet.objects.get_or_create(customer=customer)
+            Wallet.objects.filter(customer=customer).update(**changes)
+
+        return _log(customer, amount, transaction_type, description, event)
+
+
+# Credits many customers with one UPDATE per distinct amount and one INSERT,
+# for batch jobs such as refunding a canceled event's tickets. credits are
+# (customer id, amount) pairs, each logged as its own entry; missing wallets
+# are created. Returns the log entries.
+def bulk_credit(credits, transaction_type='refund', description=None, event=None):
+    credits = [(customer_id, amount) for customer_id, amount in credits if amount]
+    if not credits:
+        return []
+
+    totals = {}
+    for customer_id, amount in credits:
+        totals[customer_id] = totals.get(customer_id, 0) + amount
+    by_amount = {}
+    for customer_id, total in totals.items():
+        by_amount.setdefault(total, []).append(customer_id)
+
+    with transaction.atomic():
+        Wallet.objects.bulk_create([Wallet(customer_id=customer_id) for customer_id in totals], ignore_conflicts=True)
+        for amount, customer_ids in by_amount.items():
+            Wallet.objects.filter(customer_id__in=customer_ids).update(
+                balance=F('balance') + Money(amount), version=F('version') + 1
+            )
+        logs = TransactionLog.objects.bulk_create([
+            TransactionLog(
+                customer_id=customer_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                description=description,
+                event=event,
+            )
+            for customer_id, amount in credits
+        ])
+        for log in logs:
+            rollups.record_transaction(log)
+
+    return logs
+
+
+def _log(customer, amount, transaction_type, description, event):
+    log = TransactionLog.objects.create(
+        customer=customer,
+        amount=amount,
+        transaction_type=transaction_type,
+        description=description,
+        event=event,
+    )
+    rollups.record_transaction(log)
+    return log
@@ -1,3 +1,238 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import threading
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from backend.models import IdempotencyKey, Wallet, TransactionLog, WalletSnapshot
+from . import services
+from .reconciliation import reconcile
 
-# Create your tests here.
+
+class WalletLedgerConcurrencyTests(TransactionTestCase):
+    writers = 32
+    operations_per_writer = 10
+
+    def run_concurrently(self, target):
+        barrier = threading.Barrier(self.writers)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for _ in range(self.operations_per_writer):
+                    target(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_credits_and_debits_keep_balance_exact(self):
+        customer = User.objects.create_user(username='customer', password='pass')
+        Wallet.objects.create(customer=customer, balance=Decimal('1000.00'))
+
+        def mutate(index):
+            if index % 2:
+                services.credit(customer, Decimal('1.25'))
+            else:
+                services.debit(customer, Decimal('0.75'))
+
+        errors = self.run_concurrently(mutate)
+
+        self.assertEqual(errors, [])
+        half = self.writers // 2 * self.operations_per_writer
+        expected = Decimal('1000.00') + half * Decimal('1.25') - half * Decimal('0.75')
+        self.assertEqual(Wallet.objects.get(customer=customer).balance, expected)
+        self.assertEqual(TransactionLog.objects.filter(customer=customer).count(), 2 * half)
+
+    def test_concurrent_debits_never_overdraw(self):
+        customer = User.objects.create_user(username='customer', password='pass')
+        Wallet.objects.create(customer=customer, balance=Decimal('100.00'))
+        successes = []
+
+        def spend(index):
+            try:
+                services.debit(customer, Decimal('1.00'))
+                successes.append(index)
+            except services.InsufficientBalance:
+                pass
+
+        errors = self.run_concurrently(spend)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(successes), 100)
+        self.assertEqual(Wallet.objects.get(customer=customer).balance, Decimal('0.00'))
+        self.assertEqual(TransactionLog.objects.filter(customer=customer).count(), 100)
+
+    def test_concurrent_retries_with_one_idempotency_key_credit_once(self):
+        admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        customer = User.objects.create_user(username='customer', password='pass')
+        statuses = []
+
+        def add_funds(index):
+            client = APIClient()
+            client.force_authenticate(user=admin)
+            response = client.post(
+                reverse('addFunds'), {'username': 'customer', 'amount': '5.00'}, HTTP_IDEMPOTENCY_KEY='topup-1'
+            )
+            statuses.append(response.status_code)
+
+        errors = self.run_concurrently(add_funds)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(set(statuses) - {200, 409}, set())
+        self.assertEqual(Wallet.objects.get(customer=customer).balance, Decimal('5.00'))
+        self.assertEqual(TransactionLog.objects.filter(customer=customer).count(), 1)
+
+
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pass')
+        self.client.force_authenticate(user=self.admin)
+
+    def add_funds(self, amount='5.00', key='topup-1'):
+        return self.client.post(reverse('addFunds'), {'username': 'customer', 'amount': amount}, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.add_funds()
+        retry = self.add_funds()
+
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Wallet.objects.get(customer=self.customer).balance, Decimal('5.00'))
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.add_funds()
+        self.assertEqual(self.add_funds(amount='7.00').status_code, 422)
+
+    def test_duplicate_of_a_request_in_progress_gets_conflict(self):
+        duplicates = []
+
+        # The retry arrives while the first request is still inside the view
+        def credit(*args, **kwargs):
+            duplicates.append(self.add_funds().status_code)
+
+        with mock.patch('wallets.services.credit', side_effect=credit):
+            self.assertEqual(self.add_funds().status_code, 200)
+        self.assertEqual(duplicates, [409])
+
+    def test_expired_keys_are_claimed_again_and_purged(self):
+        self.add_funds()
+        IdempotencyKey.objects.update(created=timezone.now() - datetime.timedelta(days=2))
+        self.assertNotIn('Idempotent-Replayed', self.add_funds())
+        self.assertEqual(Wallet.objects.get(customer=self.customer).balance, Decimal('10.00'))
+
+        IdempotencyKey.objects.update(created=timezone.now() - datetime.timedelta(days=2))
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='pass')
+        Wallet.objects.create(customer=self.customer, balance=Decimal('10.00'))
+        self.client.force_authenticate(user=self.customer)
+
+    def test_unchanged_wallet_and_ledger_return_not_modified(self):
+        for url_name in ('viewWallet', 'myTransactions'):
+            with self.subTest(url_name=url_name):
+                response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+                response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_balance_change_produces_a_new_etag(self):
+        etags = {name: self.client.get(reverse(name))['ETag'] for name in ('viewWallet', 'myTransactions')}
+        services.credit(self.customer, Decimal('5.00'))
+        for url_name, etag in etags.items():
+            with self.subTest(url_name=url_name):
+                response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+
+class TransactionExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        services.credit(self.alice, Decimal('50.00'))
+        services.debit(self.alice, Decimal('20.00'))
+        services.credit(self.bob, Decimal('5.00'))
+        self.client.force_authenticate(user=self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('exportTransactionLogs'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_includes_every_row(self):
+        lines = self.export().splitlines()
+        self.assertEqual(lines[0], 'id,timestamp,customer_id,customer_username,transaction_type,amount,description')
+        self.assertEqual(len(lines), 4)
+
+    def test_filters_by_customer_and_type(self):
+        content = self.export(file_format='jsonl', customer=self.alice.id, transaction_type='purchase')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['customer_username'], row['amount']) for row in rows], [('alice', '20.00')])
+
+    def test_date_range_is_inclusive_of_both_days(self):
+        today = timezone.localdate()
+        self.assertEqual(len(self.export(file_format='jsonl', date_from=today, date_to=today).splitlines()), 3)
+        yesterday = today - datetime.timedelta(days=1)
+        self.assertEqual(self.export(file_format='jsonl', date_to=yesterday), '')
+
+    def test_export_requires_admin(self):
+        self.client.force_authenticate(user=self.alice)
+        self.assertEqual(self.client.get(reverse('exportTransactionLogs')).status_code, 403)
+
+
+class ReconciliationTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        services.credit(self.alice, Decimal('50.00'))
+        services.debit(self.alice, Decimal('20.00'))
+        services.credit(self.bob, Decimal('5.00'))
+
+    def test_first_run_snapshots_ledger_balances(self):
+        self.assertEqual(reconcile(settle_seconds=0), [])
+        balances = dict(WalletSnapshot.objects.values_list('customer__username', 'balance'))
+        self.assertEqual(balances, {'alice': Decimal('30.00'), 'bob': Decimal('5.00')})
+
+    def test_later_runs_only_snapshot_customers_with_new_activity(self):
+        reconcile(settle_seconds=0)
+        services.credit(self.alice, Decimal('1.50'))
+        reconcile(settle_seconds=0)
+
+        self.assertEqual(WalletSnapshot.objects.filter(customer=self.bob).count(), 1)
+        latest = WalletSnapshot.objects.filter(customer=self.alice).latest('last_transaction_id')
+        self.assertEqual(latest.balance, Decimal('31.50'))
+        self.assertEqual(latest.last_transaction_id, TransactionLog.objects.latest('id').id)
+
+    def test_flags_wallets_that_drift_from_the_ledger(self):
+        reconcile(settle_seconds=0)
+        services.debit(self.bob, Decimal('1.00'))
+        Wallet.objects.filter(customer=self.bob).update(balance=Decimal('10.00'))
+
+        drifted = reconcile(settle_seconds=0)
+        self.assertEqual([(s.customer_id, s.drift, s.balance) for s in drifted], [(self.bob.id, Decimal('6.00'), Decimal('4.00'))])
+
+    def test_unsettled_rows_wait_for_the_next_run(self):
+        self.assertEqual(reconcile(settle_seconds=60), [])
+        self.assertFalse(WalletSnapshot.objects.exists())
@@ -5,14 +5,38 @@ from rest_framework import status
 from users.authentication import BearerTokenAuthentication
 from backend.models import Wallet, TransactionLog
 from .serializers import WalletSerializer, TransactionLogSerializer
+from .pagination import TransactionLogCursorPagination
+from .filters import TransactionExportFilterSerializer, filter_transactions
+from . import services
+from backend.conditional import conditional_get, user_validators
+from backend.idempotency import idempotent
 from django.contrib.auth.models import User
+from django.db.models import F, Max
+from django.http import StreamingHttpResponse
+from backend.bulk import CONTENT_TYPES, stream_records
 from decimal import Decimal
 
 
+EXPORT_FIELDS = ['id', 'timestamp', 'customer_id', 'customer_username', 'transaction_type', 'amount', 'description']
+
+
+# Helper functions computing HTTP validators for the wallet endpoints
+def wallet_validators(request):
+    version = Wallet.objects.filter(customer=request.user).values_list('version', flat=True).first()
+    return user_validators(request.user), version
+
+
+def transaction_log_validators(request):
+    # The ledger is append-only, so the latest timestamp identifies its state
+    latest = TransactionLog.objects.filter(customer=request.user).aggregate(latest=Max('timestamp'))['latest']
+    return user_validators(request.user), latest
+
+
 # View My Wallet API
 @api_view(['GET'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_get(wallet_validators)
 def viewWallet(request):
     wallet, created = Wallet.objects.get_or_create(customer=request.user)
     serializer = WalletSerializer(wallet)
@@ -23,6 +47,7 @@ def viewWallet(request):
 @api_view(['POST'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAdminUser])
+@idempotent
 def addFunds(request):
     username = request.data.get('username')
     amount = request.data.get('amount')
@@ -36,16 +61,7 @@ def addFunds(request):
         return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
     try:
-        wallet, created = Wallet.objects.get_or_create(customer=user)
-        wallet.balance += Decimal(amount)
-        wallet.save()
-
-        TransactionLog.objects.create(
-            customer=user,
-            amount=amount,
-            transaction_type='deposit',
-            description='Added funds to wallet'
-        )
+        services.credit(user, Decimal(amount), transaction_type='deposit', description='Added funds to wallet')
 
         return Response({"detail": "Funds added successfully"}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -56,9 +72,34 @@ def addFunds(request):
 @api_view(['GET'])
 @authentication_classes([BearerTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_get(transaction_log_validators)
 def myTransactionLog(request):
     user = request.user
-    transaction_logs = TransactionLog.objects.filter(customer=user).order_by('-timestamp')
-    serializer = TransactionLogSerializer(transaction_logs, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    transaction_logs = TransactionLog.objects.filter(customer=user).select_related('customer')
+    paginator = TransactionLogCursorPagination()
+    page = paginator.paginate_queryset(transaction_logs, request)
+    serializer = TransactionLogSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+# Export Transaction Logs API (Admin only)
+# Rows are streamed as flat values() dicts straight from a database iterator,
+# so memory use does not grow with the size of the export.
+@api_view(['GET'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def exportTransactionLogs(request):
+    filters = TransactionExportFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    file_format = filters.validated_data['file_format']
 
+    rows = (
+        filter_transactions(TransactionLog.objects.all(), filters.validated_data)
+        .order_by('timestamp', 'id')
+        .annotate(customer_username=F('customer__username'))
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+    response = StreamingHttpResponse(stream_records(rows, EXPORT_FIELDS, file_format), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+    return response